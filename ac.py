@@ -28,40 +28,27 @@ In order for an AC analysis to be performed, an OP has to be computed first,
 if there is any non-linear device in the circuit.
 """
 
-import sys
+import sys, itertools
 import numpy
-import dc_analysis, ticker, options, circuit, devices, printing, utilities, results
+import scipy.linalg, scipy.sparse
+import dc_analysis, linsolve, ticker, options, circuit, devices, printing, utilities, results
+import circuit_plan, parallel, mor
 
 def ac_analysis(circ, start, nsteps, stop, step_type, xop=None, mna=None,\
-	AC=None, Nac=None, J=None, data_filename="stdout", verbose=3):
+	AC=None, Nac=None, J=None, data_filename="stdout", workers=None, adaptive=None, verbose=3):
 	"""Performs an AC analysis of the circuit (described by circ).
+
+	workers: number of worker processes the frequency points are split
+	among (see options.ac_sweep_workers, which is used if workers is None)
+	adaptive: if set, the sweep is refined where the response is not
+	resolved, see _ac_adaptive_sweep() (options.ac_adaptive is used if 
+	adaptive is None). An adaptive sweep is solved in the calling process.
 	"""
 	
 	if data_filename == 'stdout':
 		verbose = 0
 
-	#check step/start/stop parameters
-	if start == 0:
-		printing.print_general_error("AC analysis has start frequency = 0")
-                sys.exit(5)
-	if start > stop:
-		printing.print_general_error("AC analysis has start > stop")
-		sys.exit(1)
-	if nsteps < 1:
-		printing.print_general_error("AC analysis has number of steps <= 1")
-		sys.exit(1)
-	if step_type == options.ac_log_step:
-		omega_iter = utilities.log_axis_iterator(stop, start, nsteps)
-	elif step_type == options.ac_lin_step:
-		omega_iter = utilities.lin_axis_iterator(stop, start, nsteps)
-	else:
-		printing.print_general_error("Unknown sweep type.") 
-		sys.exit(1)
-	
-	tmpstr = "Vea =", options.vea, "Ver =", options.ver, "Iea =", options.iea, "Ier =", \
-	options.ier, "max_ac_nr_iter =", options.ac_max_nr_iter
-	printing.print_info_line((tmpstr, 5), verbose)
-	del tmpstr
+	omegas = _get_omegas(start, nsteps, stop, step_type)
 	
 	printing.print_info_line(("Starting AC analysis: ", 3), verbose)
 	tmpstr = "w: start = %g Hz, stop = %g Hz, %d steps" % (start, stop, nsteps)
@@ -77,10 +64,107 @@ def ac_analysis(circ, start, nsteps, stop, step_type, xop=None, mna=None,\
 		Nac = generate_Nac(circ)
 		Nac = utilities.remove_row(Nac, rrow=0)
 	if AC is None:
-		AC = generate_AC(circ, [mna.shape[0], mna.shape[0]])
+		AC = generate_AC(circ, [mna.shape[0], mna.shape[0]], sparse=scipy.sparse.issparse(mna))
 		AC = utilities.remove_row_and_col(AC)
 
 	
+	J, xop = _get_J(circ, xop, J, mna, Nac, data_filename, verbose)
+	
+	printing.print_info_line(("MNA (reduced):", 5), verbose)
+	printing.print_info_line((str(mna), 5), verbose)
+	printing.print_info_line(("AC (reduced):", 5), verbose)
+	printing.print_info_line((str(AC), 5), verbose)
+	printing.print_info_line(("J (reduced):", 5), verbose)
+	printing.print_info_line((str(J), 5), verbose)
+	printing.print_info_line(("Nac (reduced):", 5), verbose)
+	printing.print_info_line((str(Nac), 5), verbose)
+	
+	sol = results.ac_solution(circ, ostart=start, ostop=stop, opoints=nsteps, stype=step_type, op=xop, outfile=data_filename)
+
+	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose, sparse=scipy.sparse.issparse(mna))
+
+	if workers is None:
+		workers = options.ac_sweep_workers
+	workers = min(parallel.get_n_of_workers(workers), len(omegas))
+
+	iter_n = 0  # contatore d'iterazione
+	#printing.print_results_header(circ, fdata, print_int_nodes=options.print_int_nodes, print_omega=True)
+	printing.print_info_line(("Solving... ", 3), verbose, print_nl=False)
+	tick = ticker.ticker(increments_for_step=1)
+	tick.display(verbose > 1)
+
+	if adaptive is None:
+		adaptive = options.ac_adaptive
+
+	if adaptive:
+		nv_1 = len(circ.nodes_dict) - 1
+		abstol = numpy.array([options.vea]*nv_1 + [options.iea]*(mna.shape[0] - nv_1))
+		solver = ac_solver(mna, AC, J, Nac, Gmin_matrix, omegas)
+		points = _ac_adaptive_sweep(solver, omegas, step_type == options.ac_log_step, abstol)
+	elif workers > 1:
+		# the frequency points are independent: every worker solves a 
+		# contiguous chunk of them, the chunks come back in order
+		jobs = [(mna, AC, J, Nac, Gmin_matrix, chunk) for chunk in parallel.split(omegas, workers)]
+		points = itertools.chain.from_iterable(parallel.imap(_ac_sweep_chunk, jobs, workers))
+	else:
+		points = _ac_sweep(mna, AC, J, Nac, Gmin_matrix, omegas)
+
+	solved = False
+	try:
+		for omega, x, solved in points:
+			if solved:
+				tick.step(verbose > 1)
+				iter_n = iter_n + 1
+				# hooray!
+				sol.add_line(omega, x)
+			else:
+				tick.hide(verbose > 1)
+				printing.print_general_error("AC: the system is singular at w = %g rad/s." % (omega,))
+				break
+	finally:
+		sol.lock()
+	
+	tick.hide(verbose > 1)
+	
+	if solved:
+		printing.print_info_line(("done.", 3), verbose)
+		if adaptive:
+			sol.opoints = iter_n
+			printing.print_info_line(("%d points." % (iter_n,), 3), verbose)
+		ret_value = sol
+	else:
+		print "failed."
+		ret_value =  None
+	
+	return ret_value
+
+def _get_omegas(start, nsteps, stop, step_type):
+	"""Checks the sweep parameters.
+	Returns: the list of the angular frequencies of the sweep.
+	"""
+	if start == 0:
+		printing.print_general_error("AC analysis has start frequency = 0")
+		sys.exit(5)
+	if start > stop:
+		printing.print_general_error("AC analysis has start > stop")
+		sys.exit(1)
+	if nsteps < 1:
+		printing.print_general_error("AC analysis has number of steps <= 1")
+		sys.exit(1)
+	if step_type == options.ac_log_step:
+		return list(utilities.log_axis_iterator(stop, start, nsteps))
+	elif step_type == options.ac_lin_step:
+		return list(utilities.lin_axis_iterator(stop, start, nsteps))
+	else:
+		printing.print_general_error("Unknown sweep type.") 
+		sys.exit(1)
+
+def _get_J(circ, xop, J, mna, Nac, data_filename, verbose):
+	"""Returns: (J, xop), the linearization matrix of the nonlinear
+	elements (0 if there are none) and the op it was computed at. 
+	If J is None, it is computed at xop, running an OP analysis first
+	if xop is None as well.
+	"""
 	if circ.is_nonlinear():
 		if J is not None:
 			pass
@@ -105,55 +189,366 @@ def ac_analysis(circ, start, nsteps, stop, step_type, xop=None, mna=None,\
 	else: #not circ.is_nonlinear()
 		# no J matrix is required.
 		J = 0
-	
-	printing.print_info_line(("MNA (reduced):", 5), verbose)
-	printing.print_info_line((str(mna), 5), verbose)
-	printing.print_info_line(("AC (reduced):", 5), verbose)
-	printing.print_info_line((str(AC), 5), verbose)
-	printing.print_info_line(("J (reduced):", 5), verbose)
-	printing.print_info_line((str(J), 5), verbose)
-	printing.print_info_line(("Nac (reduced):", 5), verbose)
-	printing.print_info_line((str(Nac), 5), verbose)
-	
-	sol = results.ac_solution(circ, ostart=start, ostop=stop, opoints=nsteps, stype=step_type, op=xop, outfile=data_filename)
+	return J, xop
 
-	# setup the initial values to start the iteration:
-	nv = len(circ.nodes_dict)
-	j = numpy.complex('j')
+def ac_transfer_analysis(circ, start, nsteps, stop, step_type, sources=None, xop=None, mna=None,\
+	AC=None, J=None, data_filename="stdout", verbose=3):
+	"""Computes the transfer matrix of the circuit from its AC sources 
+	to every variable: the response to a unit excitation (1 V or 1 A,
+	zero phase) of each source, the other sources being off.
 
-	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose)
+	The excitations are the right hand sides of a single system: the
+	matrix is factored once per frequency, whatever the number of
+	sources. The excitation of a current source gives the impedances
+	(transimpedances) seen from its terminals.
+
+	sources: the names of the sources (eg. ['V1', 'I2']). If None, every
+	source with an AC value set is used.
+
+	Returns: a results.ac_transfer_solution, which is also saved to 
+	data_filename unless it is 'stdout', or None if the system is 
+	singular at some frequency.
+	"""
+	omegas = _get_omegas(start, nsteps, stop, step_type)
+	source_elements = get_ac_sources(circ, sources)
+	if not len(source_elements):
+		printing.print_general_error("AC transfer analysis: no AC sources.")
+		sys.exit(1)
+
+	printing.print_info_line(("Starting AC transfer analysis: ", 3), verbose)
+	tmpstr = "w: start = %g Hz, stop = %g Hz, %d steps, %d sources" % (start, stop, nsteps, len(source_elements))
+	printing.print_info_line((tmpstr, 3), verbose)
+	del tmpstr
+
+	if mna is None:
+		(mna, N) = dc_analysis.generate_mna_and_N(circ)
+		del N
+		mna = utilities.remove_row_and_col(mna)
+	if AC is None:
+		AC = generate_AC(circ, [mna.shape[0], mna.shape[0]], sparse=scipy.sparse.issparse(mna))
+		AC = utilities.remove_row_and_col(AC)
+	Nac = utilities.remove_row(generate_Nac_unit(circ, source_elements), rrow=0)
+
+	J, xop = _get_J(circ, xop, J, mna, Nac, data_filename, verbose)
+
+	sol = results.ac_transfer_solution(circ, sources=source_elements, opoints=len(omegas), \
+		stype=step_type, op=xop, outfile=data_filename)
+
+	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose, sparse=scipy.sparse.issparse(mna))
 
-	iter_n = 0  # contatore d'iterazione
-	#printing.print_results_header(circ, fdata, print_int_nodes=options.print_int_nodes, print_omega=True)
 	printing.print_info_line(("Solving... ", 3), verbose, print_nl=False)
 	tick = ticker.ticker(increments_for_step=1)
 	tick.display(verbose > 1)
 
-	x = xop
-	for omega in omega_iter:
-		(x, error, solved, n_iter) = dc_analysis.dc_solve(mna=(mna + numpy.multiply(j*omega, AC) + J), \
-		Ndc=Nac,  Ntran=0, circ=circuit.circuit(title="Dummy circuit for AC", filename=None), Gmin=Gmin_matrix, x0=x, \
-		time=None, locked_nodes=None, MAXIT=options.ac_max_nr_iter, skip_Tt=True, verbose=0)
-		if solved:
-			tick.step(verbose > 1)
-			iter_n = iter_n + 1
-			# hooray!
-			sol.add_line(omega, x)
-		else:
+	solved = False
+	for omega, X, solved in _ac_sweep(mna, AC, J, Nac, Gmin_matrix, omegas):
+		if not solved:
+			tick.hide(verbose > 1)
+			printing.print_general_error("AC: the system is singular at w = %g rad/s." % (omega,))
 			break
-	
+		tick.step(verbose > 1)
+		sol.add_line(omega, X)
 	tick.hide(verbose > 1)
-	
-	if solved:
-		printing.print_info_line(("done.", 3), verbose)
-		ret_value = sol
-	else:
+
+	if not solved:
 		print "failed."
-		ret_value =  None
+		return None
+	printing.print_info_line(("done.", 3), verbose)
+	if data_filename != 'stdout':
+		sol.write_to_file()
+	return sol
+
+def get_ac_sources(circ, names=None):
+	"""Returns: the list of the source elements called names or, if names
+	is None, of the sources with an AC value set, in netlist order.
+	"""
+	if names is None:
+		return [elem for elem in circ.elements if (isinstance(elem, devices.vsource) or \
+			isinstance(elem, devices.isource)) and elem.abs_ac is not None]
+	sources = []
+	for name in names:
+		for elem in circ.elements:
+			if (isinstance(elem, devices.vsource) or isinstance(elem, devices.isource)) and \
+				(elem.letter_id + elem.descr).upper() == name.upper():
+				sources.append(elem)
+				break
+		else:
+			printing.print_general_error("AC transfer analysis: source %s not found." % (name,))
+			sys.exit(1)
+	return sources
+
+def _ac_sweep(mna, AC, J, Nac, Gmin, omegas):
+	"""Solves the AC system at every omega in omegas, see ac_solver.
+
+	Yields: (omega, x, solved) for every point, up to and including the 
+	first one that could not be solved (singular system or non finite
+	solution, x is None in that case).
+	"""
+	return ac_solver(mna, AC, J, Nac, Gmin, omegas).solve(omegas)
+
+class ac_solver:
+	"""Solves (mna + j*omega*AC + J + Gmin) x = -Nac, all the matrices
+	being REDUCED, for the omegas of a sweep. Nac may have more than
+	one column, x has the same number of columns.
+
+	The system is linear: it is factored and solved once per point, no
+	Newton iteration is needed. Otherwise:
+	- if options.ac_use_mor is set, a reduced order model is built and 
+	  solved instead (see get_prima_model()),
+	- if options.ac_use_hessenberg is set, the system is dense and well
+	  conditioned, the pencil is reduced once (see hessenberg_pencil) and
+	  the points are solved in O(n^2).
 	
-	return ret_value
+	omegas: the frequencies of the sweep, used to decide whether the 
+	reductions are worth it and to place the expansion points of the
+	reduced order model. solve() can be called for other frequencies in
+	the same range as well.
+	"""
+	def __init__(self, mna, AC, J, Nac, Gmin, omegas):
+		# only the imaginary part depends on omega
+		self.G = mna + J + Gmin
+		self.Nac = Nac
+		if scipy.sparse.issparse(self.G):
+			# the pattern of the system matrix is the same at every 
+			# frequency, the fill reducing ordering is computed only once
+			self._solve = linsolve.lu_cache().solve
+			self.AC = AC
+		else:
+			# nothing to be reused, the matrix is different at every point
+			self._solve = linsolve.solve
+			# numpy.matrix * scalar is a matrix product
+			self.AC = numpy.asarray(AC)
+
+		self.pencil = None
+		if Nac.shape[1] > 1:
+			# several right hand sides: the reductions handle one only
+			pass
+		elif options.ac_use_mor and len(omegas) > 1:
+			self.pencil = get_prima_model(self.G, self.AC, -Nac, omegas, self.direct)
+		if self.pencil is None and options.ac_use_hessenberg and not scipy.sparse.issparse(self.G) \
+			and len(omegas) > 1:
+			self.pencil = get_hessenberg_pencil(self.G, self.AC, -Nac)
+
+	def direct(self, omega):
+		"""Returns: the solution at omega found factoring the system or
+		None if it is singular.
+		"""
+		try:
+			x = self._solve(self.G + numpy.complex('j')*omega*self.AC, -self.Nac)
+		except numpy.linalg.linalg.LinAlgError:
+			return None
+		return x if numpy.isfinite(x).all() else None
+
+	def solve(self, omegas):
+		"""Yields: (omega, x, solved) for every omega in omegas, up to and
+		including the first one that could not be solved (x is None).
+		"""
+		if self.pencil is None:
+			for omega in omegas:
+				x = self.direct(omega)
+				if x is None:
+					yield omega, None, False
+					break
+				yield omega, x, True
+			return
+
+		for start in xrange(0, len(omegas), self.pencil.block_size):
+			block = omegas[start:start + self.pencil.block_size]
+			X = self.pencil.solve(numpy.complex('j')*numpy.array(block))
+			for index in xrange(len(block)):
+				x = X[:, index]
+				if not numpy.isfinite(x).all():
+					# a zero pivot: resonance, let the LU pivot on the whole matrix
+					x = self.direct(block[index])
+					if x is None:
+						yield block[index], None, False
+						return
+				yield block[index], x, True
+
+def get_prima_model(G, C, b, omegas, direct):
+	"""Builds the reduced order model (mor.prima_model) of the AC system
+	(G + j*omega*C) x = b, expanding it at options.ac_mor_expansion_points
+	real points, log-spaced over the sweep.
 
-def generate_AC(circ, shape):
+	The model is checked against the solution of the full system, found
+	with direct(omega), at options.ac_mor_check_points frequencies: a 
+	warning is printed if the relative error exceeds 
+	options.ac_mor_tolerance.
+
+	Returns: the model or None if it can't be built.
+	"""
+	s0_list = mor.get_expansion_points(min(omegas), max(omegas), options.ac_mor_expansion_points)
+	try:
+		model = mor.prima_model(G, C, b, s0_list, options.ac_mor_order)
+	except numpy.linalg.linalg.LinAlgError:
+		printing.print_warning("AC: the reduced order model can't be built, solving the full system.")
+		return None
+	if options.ac_mor_check_points > 0:
+		indices = numpy.unique(numpy.linspace(0, len(omegas) - 1, options.ac_mor_check_points).round().astype(int))
+		check = [omegas[index] for index in indices]
+		X = model.solve(numpy.complex('j')*numpy.array(check))
+		error = 0
+		for index in xrange(len(check)):
+			x = direct(check[index])
+			if x is not None:
+				error = max(error, numpy.linalg.norm(X[:, index] - x)/numpy.linalg.norm(x))
+		if error > options.ac_mor_tolerance:
+			printing.print_warning("AC: the reduced order model (%d unknowns) has a relative error of %g." % \
+				(model.size(), error))
+	return model
+
+def get_hessenberg_pencil(G, C, b):
+	"""Returns: the hessenberg_pencil of G, C, b or None if G is singular
+	or its condition number exceeds 1/options.ac_hessenberg_min_rcond.
+	"""
+	try:
+		lu = linsolve.factor(G)
+	except numpy.linalg.linalg.LinAlgError:
+		return None
+	if lu.rcond() < options.ac_hessenberg_min_rcond:
+		return None
+	return hessenberg_pencil(G, C, b, lu=lu)
+
+class hessenberg_pencil:
+	"""The AC system (G + s*C) x = b, reduced once so that it can be
+	solved in O(n^2) for any s (instead of the O(n^3) of a LU).
+
+	With G = LU, A = G^-1 C = Q H Q^T (H upper Hessenberg, Q orthogonal):
+		(I + s*H) y = Q^T G^-1 b, x = Q y
+	and a Hessenberg system is solved eliminating only the subdiagonal.
+
+	The reduction costs about six LU factorizations, it pays off for
+	sweeps with many more points than that. It is not accurate if G is 
+	ill conditioned: use get_hessenberg_pencil(), which checks it.
+
+	Dense matrices only.
+	"""
+	# the frequencies are solved together in blocks whose elimination
+	# matrices take at most this many bytes
+	block_bytes = 32*2**20
+
+	def __init__(self, G, C, b, lu=None):
+		if lu is None:
+			lu = linsolve.factor(G)
+		A = numpy.asarray(lu.solve_many(numpy.asarray(C)))
+		H, Q = scipy.linalg.hessenberg(A, calc_q=True)
+		self.H = H
+		self.Q = numpy.mat(Q)
+		self.c = numpy.asarray(self.Q.T*lu.solve(b)).ravel()
+		n = H.shape[0]
+		self.block_size = max(1, self.block_bytes/(16*n*n))
+
+	def solve(self, s):
+		"""Solves the system for every value in the array s, at once.
+
+		Returns: a (n, len(s)) numpy.matrix, one solution per column. The
+		columns of the points where a zero pivot was found are not finite.
+		"""
+		n = self.H.shape[0]
+		m = s.shape[0]
+		# the elimination of the subdiagonal with partial pivoting
+		# (between rows k and k+1) of I + s*H, all the s at once
+		M = s[:, None, None]*self.H[None, :, :]
+		M[:, numpy.arange(n), numpy.arange(n)] += 1.0
+		y = numpy.tile(self.c, (m, 1))
+		errstate = numpy.seterr(divide='ignore', invalid='ignore')
+		try:
+			for k in xrange(n - 1):
+				swap = numpy.nonzero(abs(M[:, k+1, k]) > abs(M[:, k, k]))[0]
+				if len(swap):
+					row = M[swap, k, k:].copy()
+					M[swap, k, k:] = M[swap, k+1, k:]
+					M[swap, k+1, k:] = row
+					row = y[swap, k].copy()
+					y[swap, k] = y[swap, k+1]
+					y[swap, k+1] = row
+				l = M[:, k+1, k]/M[:, k, k]
+				M[:, k+1, k:] -= l[:, None]*M[:, k, k:]
+				y[:, k+1] -= l*y[:, k]
+			# back substitution
+			for k in xrange(n - 1, -1, -1):
+				y[:, k] = (y[:, k] - (M[:, k, k+1:]*y[:, k+1:]).sum(axis=1))/M[:, k, k]
+		finally:
+			numpy.seterr(**errstate)
+		return self.Q*numpy.mat(y).T
+
+def _ac_adaptive_sweep(solver, omegas, log_axis, abstol):
+	"""Solves the AC system on the grid omegas, then refines it, halving
+	the intervals where the response is not resolved.
+
+	An interval is resolved if, at its middle point, every variable is
+	within options.ac_adaptive_mag_tol dB and options.ac_adaptive_phase_tol
+	degrees of the interpolation of the values at its ends (see
+	_ac_is_resolved()). The refinement stops when every interval is 
+	resolved, options.ac_adaptive_max_points points have been solved or
+	the intervals left are too narrow.
+
+	solver: the ac_solver of the system
+	omegas: the initial (coarse) grid
+	log_axis: if set, the middle points are taken on a logarithmic axis
+	abstol: array, the variables whose magnitude is below abstol at the
+	three points are not checked.
+
+	Yields: (omega, x, solved), in frequency order, once the refinement
+	is done, or up to the first point that could not be solved.
+	"""
+	points = []
+	for omega, x, solved in solver.solve(omegas):
+		if not solved:
+			yield omega, x, solved
+			return
+		points.append((omega, x))
+	intervals = zip(points[:-1], points[1:])
+	while intervals and len(points) < options.ac_adaptive_max_points:
+		intervals = intervals[:options.ac_adaptive_max_points - len(points)]
+		if log_axis:
+			middles = [numpy.sqrt(p1[0]*p2[0]) for p1, p2 in intervals]
+		else:
+			middles = [.5*(p1[0] + p2[0]) for p1, p2 in intervals]
+		new_intervals = []
+		for (omega, x, solved), (p1, p2) in zip(solver.solve(middles), intervals):
+			if not solved:
+				yield omega, x, solved
+				return
+			middle = (omega, x)
+			points.append(middle)
+			if (p2[0] - p1[0]) > 1e-6*p2[0] and not _ac_is_resolved(p1[1], x, p2[1], abstol):
+				new_intervals += [(p1, middle), (middle, p2)]
+		intervals = new_intervals
+	points.sort(key=lambda point: point[0])
+	for omega, x in points:
+		yield omega, x, True
+
+def _ac_is_resolved(x1, xm, x2, abstol):
+	"""Returns: True if the solution xm in the middle of an interval is
+	within options.ac_adaptive_mag_tol dB and options.ac_adaptive_phase_tol
+	degrees of the interpolation of the solutions x1 and x2 at its ends,
+	the interpolation being linear in dB and in phase.
+	Only the variables larger than abstol at one of the points at least
+	are checked.
+	"""
+	x1, xm, x2 = [numpy.asarray(x).ravel() for x in (x1, xm, x2)]
+	check = (abs(x1) > abstol) | (abs(xm) > abstol) | (abs(x2) > abstol)
+	x1, xm, x2 = x1[check], xm[check], x2[check]
+	if not len(x1):
+		return True
+	db = lambda x: 20*numpy.log10(numpy.maximum(abs(x), 1e-300))
+	if (abs(db(xm) - .5*(db(x1) + db(x2))) > options.ac_adaptive_mag_tol).any():
+		return False
+	# the phase half way from x1 to x2, taking the short way round
+	phase = numpy.angle(x1) + .5*numpy.angle(x2*x1.conjugate())
+	phase_error = abs(numpy.angle(xm*numpy.exp(-1j*phase)))
+	return not (phase_error > options.ac_adaptive_phase_tol*numpy.pi/180).any()
+
+def _ac_sweep_chunk(args):
+	"""Worker process job: solves a chunk of the AC sweep.
+	args: (mna, AC, J, Nac, Gmin, omegas), see _ac_sweep().
+
+	Returns: a list of (omega, x, solved) tuples.
+	"""
+	return list(_ac_sweep(*args))
+
+def generate_AC(circ, shape, sparse=False):
 	"""Generates the AC coefficients matrix. 
 	Shape is the REDUCED MNA shape, AC will be of the same shape.
 	
@@ -178,75 +573,39 @@ def generate_AC(circ, shape):
 	First are all voltage lines, then the current ones in the same order of 
 	the elements that introduce them.
 	
+	If sparse is set, AC is built as a scipy.sparse matrix.
+
 	Returns: the UNREDUCED AC matrix
 	"""
-	AC = numpy.matrix(numpy.zeros((shape[0]+1, shape[1]+1)))
-	nv = len(circ.nodes_dict)# - 1
-	i_eq = 0 #each time we find a vsource or vcvs or ccvs, we'll add one to this.
-	for elem in circ.elements:
-		if isinstance(elem, devices.vsource) or isinstance(elem, devices.evsource) or \
-		isinstance(elem, devices.hvsource):
-			#notice that hvsources aren't yet implemented now!
-			i_eq = i_eq + 1
-		elif isinstance(elem, devices.capacitor):
-			n1 = elem.n1
-			n2 = elem.n2
-			AC[n1, n1] = AC[n1, n1] + elem.C
-			AC[n1, n2] = AC[n1, n2] - elem.C
-			AC[n2, n2] = AC[n2, n2] + elem.C
-			AC[n2, n1] = AC[n2, n1] - elem.C
-		elif isinstance(elem, devices.inductor):
-			AC[nv + i_eq, nv + i_eq] = -1 * elem.L
-			if len(elem.coupling_devices):
-				for cd in elem.coupling_devices:
-					# get id+descr of the other inductor (eg. "L32")
-					other_id_wdescr = cd.get_other_inductor("L"+elem.descr)
-					# find its index to know which column corresponds to its current
-					other_index = circ.find_vde_index(other_id_wdescr, verbose=0)
-					# add the term.
-					AC[nv + i_eq, nv + other_index] += -1 * cd.M
-			i_eq = i_eq + 1
-		
-	if options.cmin > 0:
-		cmin_mat = numpy.matrix(numpy.eye(shape[0]+1-i_eq))
+	plan = circuit_plan.get_plan(circ)
+	AC = plan.reactive_matrix(sparse)
+	if options.cmin > 0 and sparse:
+		AC = AC + options.cmin*utilities.sparse_cmin_matrix(plan.n_of_nodes, plan.size)
+	elif options.cmin > 0:
+		cmin_mat = numpy.matrix(numpy.eye(plan.n_of_nodes))
 		cmin_mat[0, 1:] = 1
 		cmin_mat[1:, 0] = 1
 		cmin_mat[0, 0] = cmin_mat.shape[0]-1
-		AC[:-i_eq, :-i_eq] += options.cmin*cmin_mat
+		AC[:plan.n_of_nodes, :plan.n_of_nodes] += options.cmin*cmin_mat
 
 	return AC
 
 def generate_Nac(circ):
 	"""Generate the vector holding the contribution of AC sources.
 	"""
-	n_of_nodes = len(circ.nodes_dict)
-	Nac = numpy.mat(numpy.zeros((n_of_nodes, 1)), dtype=complex)
-	j = numpy.complex('j')
-	# process isources
-	for elem in circ.elements:
-		if isinstance(elem, devices.isource) and elem.abs_ac is not None:
-			#convenzione normale!
-			N[elem.n1, 0] = N[elem.n1, 0] + elem.abs_ac*numpy.exp(j*elem.arg_ac)
-			N[elem.n2, 0] = N[elem.n2, 0] - elem.abs_ac*numpy.exp(j*elem.arg_ac)
-	# process vsources
-	# for each vsource, introduce a new variable: the current flowing through it.
-	# then we introduce a KVL equation to be able to solve the circuit
-	for elem in circ.elements:
-		if circuit.is_elem_voltage_defined(elem):
-			index = Nac.shape[0] 
-			Nac = utilities.expand_matrix(Nac, add_a_row=True, add_a_col=False)
-			if isinstance(elem, devices.vsource) and elem.abs_ac is not None:
-				Nac[index, 0] = -1.0*elem.abs_ac*numpy.exp(j*elem.arg_ac)
-	return Nac
+	return circuit_plan.get_plan(circ).Nac()
+
+def generate_Nac_unit(circ, sources):
+	"""Generate the matrix holding, in every column, the contribution of 
+	a unit AC excitation of one of the sources.
+	"""
+	return circuit_plan.get_plan(circ).Nac_unit(sources)
 
 def generate_J(xop, circ, mna, Nac, data_filename, verbose=0):
 	# setup J
 	# build the linearized matrix (stored in J)
-	J = numpy.mat(numpy.zeros(mna.shape))
-	Tlin = numpy.mat(numpy.zeros(Nac.shape))
-        for elem in circ.elements:
-		if elem.is_nonlinear:
-			dc_analysis.update_J_and_Tx(J, Tlin, xop, elem, time=None)
+	J, Tlin = dc_analysis.build_J_and_Tx(xop, mna.shape[0], circ.elements, time=None, sparse=scipy.sparse.issparse(mna), \
+		table=circuit_plan.get_plan(circ).get_nl_table())
 	#del Tlin # not needed! **DC**!
 
 	return J
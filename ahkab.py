@@ -23,6 +23,7 @@
 
 import sys
 import numpy
+import scipy
 import sympy
 import matplotlib
 from optparse import OptionParser
@@ -34,6 +35,8 @@ import ac
 import shooting
 import bfpss
 import symbolic
+import sens
+import noise
 
 import netlist_parser
 
@@ -164,6 +167,15 @@ def process_analysis(an_list, circ, outfile, verbose, cli_tran_method=None, gues
 			sol = ac.ac_analysis(circ=circ, start=an['start'], nsteps=an['nsteps'], \
 				stop=an['stop'], step_type='LOG', xop=x0_op, mna=None,\
 			        data_filename=data_filename, verbose=verbose)
+		elif an["type"] == "actransfer":
+			sol = ac.ac_transfer_analysis(circ, start=an['start'], nsteps=an['nsteps'], stop=an['stop'], \
+				step_type='LOG', sources=an['sources'], xop=x0_op, data_filename=data_filename, verbose=verbose)
+		elif an["type"] == "sens":
+			sol = sens.sens_analysis(circ, output=an['output'], start=an['start'], stop=an['stop'], \
+				nsteps=an['nsteps'], step_type='LOG', xop=x0_op, data_filename=data_filename, verbose=verbose)
+		elif an["type"] == "noise":
+			sol = noise.noise_analysis(circ, output=an['output'], start=an['start'], stop=an['stop'], \
+				nsteps=an['nsteps'], step_type='LOG', xop=x0_op, data_filename=data_filename, verbose=verbose)
 		elif an["type"] == "temp":
 			constants.T = utilities.Celsius2Kelvin(an['temp'])
 		results.update({an["type"]:sol})
@@ -197,6 +209,7 @@ def main(filename, outfile="stdout", tran_method=transient.TRAP.lower(), no_step
 	printing.print_info_line(("This is ahkab %s running with:" %(__version__),6), verbose)
 	printing.print_info_line(("  Python %s" % (sys.version.split('\n')[0],),6), verbose)
 	printing.print_info_line(("  Numpy %s"  % (numpy.__version__),6), verbose)
+	printing.print_info_line(("  Scipy %s"  % (scipy.__version__),6), verbose)
 	printing.print_info_line(("  Sympy %s"  % (sympy.__version__),6), verbose)
 	printing.print_info_line(("  Matplotlib %s"  % (matplotlib.__version__),6), verbose)
 
@@ -247,7 +260,7 @@ if __name__ == "__main__":
 	parser.add_option("-p", "--print", action="store_true", dest="print_circuit", default=False, help="Print the parsed circuit")
 	parser.add_option("-o", "--outfile", action="store", type="string", dest="outfile", default="stdout", help="Data output file. Defaults to stdout.")
 	parser.add_option("", "--dc-guess", action="store", type="string", dest="dc_guess", default="guess", help="Guess to be used to start a op or dc analysis: none or guess. Defaults to guess.")
-	parser.add_option("-t", "--tran-method", action="store", type="string", dest="method", default=transient.TRAP.lower(), help="Method to be used in transient analysis: " +transient.IMPLICIT_EULER.lower()+", "+transient.TRAP.lower()+", "+transient.GEAR2.lower()+", "+transient.GEAR3.lower()+", "+transient.GEAR4.lower()+", "+transient.GEAR5.lower()+" or "+transient.GEAR6.lower()+". Defaults to TRAP.")
+	parser.add_option("-t", "--tran-method", action="store", type="string", dest="method", default=transient.TRAP.lower(), help="Method to be used in transient analysis: " +transient.IMPLICIT_EULER.lower()+", "+transient.TRAP.lower()+", "+transient.GEAR2.lower()+", "+transient.GEAR3.lower()+", "+transient.GEAR4.lower()+", "+transient.GEAR5.lower()+", "+transient.GEAR6.lower()+" or "+transient.EXPONENTIAL.lower()+" (linear circuits only). Defaults to TRAP.")
 	parser.add_option("", "--t-fixed-step", action="store_true", dest="no_step_control", default=False, help="Disables the step control in transient analysis. Useful if you want to perform a FFT on the results.")
 	parser.add_option("", "--v-absolute-tolerance", action="store", type="string", dest="vea", default=None, help="Voltage absolute tolerance. Default: "+str(options.vea)+" V")
 	parser.add_option("", "--v-relative-tolerance", action="store", type="string", dest="ver", default=None, help="Voltage relative tolerance. Default: "+str(options.ver))
@@ -260,6 +273,11 @@ if __name__ == "__main__":
 	parser.add_option("", "--s-max-nr", action="store", type="string", dest="shooting_max_nr_iter", default=None, help="Maximum nr of NR iterations during shooting analysis. Setting it to 0 (zero) disables the limit. Default: "+str(options.shooting_max_nr_iter))
 	parser.add_option("", "--gmin", action="store", type="string", dest="gmin", default=None, help="The minimum conductance to ground. Inserted when requested. Default: "+str(options.gmin))
 	parser.add_option("", "--cmin", action="store", type="string", dest="cmin", default=None, help="The minimum capacitance to ground. Default: "+str(options.cmin))
+	parser.add_option("", "--sparse", action="store_true", dest="sparse", default=False, help="Use sparse matrices and a sparse LU solver for circuits with at least "+str(options.sparse_threshold)+" unknowns.")
+	parser.add_option("", "--dc-workers", action="store", type="string", dest="dc_sweep_workers", default=None, help="Number of worker processes a DC sweep is split among, 0 means one per CPU. Default: "+str(options.dc_sweep_workers))
+	parser.add_option("", "--ac-workers", action="store", type="string", dest="ac_sweep_workers", default=None, help="Number of worker processes the points of an AC analysis are split among, 0 means one per CPU. Default: "+str(options.ac_sweep_workers))
+	parser.add_option("", "--ac-adaptive", action="store_true", dest="ac_adaptive", default=False, help="Refine the AC sweep where the response changes faster than the frequency grid resolves.")
+	parser.add_option("", "--bin-results", action="store_true", dest="bin_results", default=False, help="Write the DC, AC and TRAN results to binary files (see binlib.py) instead of CSV files.")
 	parser.add_option("", "--eps", action="store_true", dest="eps", default=False, help="Calculate the machine precision. The machine precision defaults to "+str(utilities.EPS))
 	
 	(cli_options, remaning_args) = parser.parse_args()
@@ -289,6 +307,16 @@ if __name__ == "__main__":
 		options.gmin = float(cli_options.gmin)
 	if cli_options.cmin is not None:
 		options.cmin = float(cli_options.cmin)
+	if cli_options.sparse:
+		options.use_sparse = True
+	if cli_options.dc_sweep_workers is not None:
+		options.dc_sweep_workers = int(cli_options.dc_sweep_workers)
+	if cli_options.ac_sweep_workers is not None:
+		options.ac_sweep_workers = int(cli_options.ac_sweep_workers)
+	if cli_options.ac_adaptive:
+		options.ac_adaptive = True
+	if cli_options.bin_results:
+		options.results_format = 'bin'
 	if cli_options.eps:
 		utilities.EPS = utilities.calc_eps()
 		print "Detected machine precision: " + str(utilities.EPS)
@@ -0,0 +1,92 @@
+# -*- coding: iso-8859-1 -*-
+# ac_adaptive.py
+# Benchmark: adaptive vs uniform frequency grids for the AC analysis
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Sweeps a cascade of high Q resonators with an adaptive grid, refined
+from a coarse one, and with uniform log grids of increasing size.
+
+Usage: python benchmarks/ac_adaptive.py [coarse_points]
+
+The error of a sweep is the largest error, in dB, of the output voltage
+interpolated (linearly in dB vs log f) from the points of the sweep, on
+a dense reference grid. The uniform grid is refined until its error is
+below the error of the adaptive sweep.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, circuit, ac, options, utilities
+from ac_direct import reduced_matrices
+
+def notches(n_of_notches):
+	circ = circuit.circuit(title="%d notch filters" % (n_of_notches,))
+	circ.add_vsource("V1", "in", "0", vdc=0.0, vac=1.0)
+	circ.add_resistor("RS", "in", "out", R=50.0)
+	for index in xrange(n_of_notches):
+		# series RLC to ground, notch at 1, 1.3, 1.69... MHz, Q = 300
+		f0 = 1e6*1.3**index
+		L = 1e-3
+		C = 1./((2*numpy.pi*f0)**2*L)
+		circ.add_resistor("R%d" % index, "out", "m%d" % index, R=2*numpy.pi*f0*L/300)
+		circ.add_inductor("L%d" % index, "m%d" % index, "p%d" % index, L=L)
+		circ.add_capacitor("C%d" % index, "p%d" % index, "0", C=C)
+	return circ
+
+def output(points, node):
+	points = list(points)
+	omegas = numpy.array([omega for omega, x, solved in points])
+	return omegas, numpy.array([x[node, 0] for omega, x, solved in points])
+
+def db_error(omegas, values, ref_omegas, ref_values):
+	db = lambda x: 20*numpy.log10(abs(x))
+	interp = numpy.interp(numpy.log(ref_omegas), numpy.log(omegas), db(values))
+	return abs(interp - db(ref_values)).max()
+
+if __name__ == '__main__':
+	coarse_points = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+	circ = notches(3)
+	mna, AC, Nac, Gmin = reduced_matrices(circ)
+	node = circ.nodes_dict.keys()[circ.nodes_dict.values().index("out")] - 1
+	wstart, wstop = 2*numpy.pi*1e5, 2*numpy.pi*1e7
+	abstol = numpy.array([options.vea]*(len(circ.nodes_dict) - 1) + [options.iea]*(mna.shape[0] - len(circ.nodes_dict) + 1))
+
+	omegas = list(utilities.log_axis_iterator(wstop, wstart, coarse_points))
+	ref_omegas = list(utilities.log_axis_iterator(omegas[-1], omegas[0], 50000))
+	ref_omegas, ref_values = output(ac._ac_sweep(mna, AC, 0, Nac, Gmin, ref_omegas), node)
+
+	start = time.time()
+	solver = ac.ac_solver(mna, AC, 0, Nac, Gmin, omegas)
+	points = list(ac._ac_adaptive_sweep(solver, omegas, True, abstol))
+	tadaptive = time.time() - start
+	adaptive_error = db_error(*(output(points, node) + (ref_omegas, ref_values)))
+	print "%-10s %8s %10s %14s" % ("grid", "points", "time [s]", "max err [dB]")
+	print "%-10s %8d %10.3f %14g" % ("adaptive", len(points), tadaptive, adaptive_error)
+
+	n_of_points = coarse_points
+	while True:
+		omegas = list(utilities.log_axis_iterator(wstop, wstart, n_of_points))
+		start = time.time()
+		points = list(ac._ac_sweep(mna, AC, 0, Nac, Gmin, omegas))
+		tuniform = time.time() - start
+		error = db_error(*(output(points, node) + (ref_omegas, ref_values)))
+		print "%-10s %8d %10.3f %14g" % ("uniform", n_of_points, tuniform, error)
+		if error <= adaptive_error or n_of_points > 50000:
+			break
+		n_of_points = 2*n_of_points
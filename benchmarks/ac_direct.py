@@ -0,0 +1,84 @@
+# -*- coding: iso-8859-1 -*-
+# ac_direct.py
+# Benchmark: time per frequency point of the AC analysis
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times the solution of the AC system of RC ladders of increasing size:
+ - with one complex factorization and solve per point (ac._ac_sweep),
+ - through the Newton solver, dc_analysis.dc_solve(), as the AC analysis
+   used to do.
+
+Usage: python benchmarks/ac_direct.py [n_of_points]
+
+The last column is the largest relative difference between the two.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy, scipy.sparse
+import dc_analysis, circuit, ac, options, utilities, linsolve
+
+def rc_ladder(n_of_stages):
+	circ = circuit.circuit(title="RC ladder, %d stages" % (n_of_stages,))
+	circ.add_vsource("V1", "n0", "0", vdc=1.0, vac=1.0)
+	for index in xrange(n_of_stages):
+		n1, n2 = "n%d" % index, "n%d" % (index + 1)
+		circ.add_resistor("R%d" % index, n1, n2, R=1e3)
+		circ.add_capacitor("C%d" % index, n2, "0", C=1e-12)
+	return circ
+
+def reduced_matrices(circ):
+	mna, N = dc_analysis.generate_mna_and_N(circ)
+	mna = utilities.remove_row_and_col(mna)
+	Nac = utilities.remove_row(ac.generate_Nac(circ), rrow=0)
+	AC = utilities.remove_row_and_col(ac.generate_AC(circ, [mna.shape[0]+1, mna.shape[0]+1], \
+		sparse=scipy.sparse.issparse(mna)))
+	Gmin = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], 0, sparse=scipy.sparse.issparse(mna))
+	return mna, AC, Nac, Gmin
+
+def direct(mna, AC, Nac, Gmin, omegas):
+	return [x for omega, x, solved in ac._ac_sweep(mna, AC, 0, Nac, Gmin, omegas)]
+
+def newton(mna, AC, Nac, Gmin, omegas):
+	j = numpy.complex('j')
+	x = None
+	xs = []
+	lu = linsolve.lu_cache()
+	for omega in omegas:
+		(x, error, solved, n_iter) = dc_analysis.dc_solve(mna=(mna + j*omega*AC), \
+		Ndc=Nac,  Ntran=0, circ=circuit.circuit(title="Dummy circuit for AC", filename=None), Gmin=Gmin, x0=x, \
+		time=None, locked_nodes=None, MAXIT=20, skip_Tt=True, lu=lu, verbose=0)
+		xs.append(x)
+	return xs
+
+def timeit(function, *args):
+	start = time.time()
+	ret = function(*args)
+	return time.time() - start, ret
+
+if __name__ == '__main__':
+	n_of_points = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+	omegas = list(utilities.log_axis_iterator(2*numpy.pi*1e10, 2*numpy.pi*1e3, n_of_points))
+	print "%8s %16s %16s %10s %12s" % ("unknowns", "direct [ms/pt]", "newton [ms/pt]", "ratio", "max rel diff")
+	for n_of_stages in (5, 20, 100, 400):
+		mna, AC, Nac, Gmin = reduced_matrices(rc_ladder(n_of_stages))
+		tdirect, xdirect = timeit(direct, mna, AC, Nac, Gmin, omegas)
+		tnewton, xnewton = timeit(newton, mna, AC, Nac, Gmin, omegas)
+		diff = max([abs(a - b).max()/abs(b).max() for a, b in zip(xdirect, xnewton)])
+		print "%8d %16.3f %16.3f %10.1f %12g" % (mna.shape[0], 1e3*tdirect/n_of_points, \
+			1e3*tnewton/n_of_points, tnewton/tdirect, diff)
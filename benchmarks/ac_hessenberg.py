@@ -0,0 +1,65 @@
+# -*- coding: iso-8859-1 -*-
+# ac_hessenberg.py
+# Benchmark: AC sweep with a Hessenberg reduced pencil vs direct solves
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times a wideband AC sweep of RLC ladders of increasing size, solving
+every point with a LU factorization and with the Hessenberg reduction of
+the pencil (options.ac_use_hessenberg).
+
+Usage: python benchmarks/ac_hessenberg.py [n_of_points]
+
+The last column is the largest relative difference between the two.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, circuit, ac, options, utilities
+from ac_direct import reduced_matrices
+
+def rlc_ladder(n_of_stages):
+	circ = circuit.circuit(title="RLC ladder, %d stages" % (n_of_stages,))
+	circ.add_vsource("V1", "n0", "0", vdc=1.0, vac=1.0)
+	for index in xrange(n_of_stages):
+		n1, n2 = "n%d" % index, "n%d" % (index + 1)
+		if index % 4:
+			circ.add_resistor("R%d" % index, n1, n2, R=1e3)
+		else:
+			circ.add_inductor("L%d" % index, n1, n2, L=1e-6)
+		circ.add_capacitor("C%d" % index, n2, "0", C=1e-12)
+	circ.add_resistor("RL", "n%d" % n_of_stages, "0", R=50.0)
+	return circ
+
+def sweep(mna, AC, Nac, Gmin, omegas, hessenberg):
+	options.ac_use_hessenberg = hessenberg
+	start = time.time()
+	xs = [x for omega, x, solved in ac._ac_sweep(mna, AC, 0, Nac, Gmin, omegas)]
+	return time.time() - start, xs
+
+if __name__ == '__main__':
+	n_of_points = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	omegas = list(utilities.log_axis_iterator(2*numpy.pi*1e10, 2*numpy.pi*1e3, n_of_points))
+	print "%d points" % (n_of_points,)
+	print "%8s %14s %16s %10s %12s" % ("unknowns", "direct [s]", "hessenberg [s]", "ratio", "max rel diff")
+	for n_of_stages in (10, 50, 200, 400):
+		mna, AC, Nac, Gmin = reduced_matrices(rlc_ladder(n_of_stages))
+		tdirect, xdirect = sweep(mna, AC, Nac, Gmin, omegas, False)
+		thess, xhess = sweep(mna, AC, Nac, Gmin, omegas, True)
+		diff = max([abs(a - b).max()/abs(b).max() for a, b in zip(xhess, xdirect)])
+		print "%8d %14.3f %16.3f %10.1f %12g" % (mna.shape[0], tdirect, thess, tdirect/thess, diff)
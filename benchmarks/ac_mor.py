@@ -0,0 +1,93 @@
+# -*- coding: iso-8859-1 -*-
+# ac_mor.py
+# Benchmark: AC sweep of a large RC mesh with a reduced order model
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times the AC sweep of a square RC mesh (a resistor between adjacent
+nodes and a capacitor to ground at every node, driven at a corner)
+solving a reduced order model (options.ac_use_mor) and, on a subset of
+the points, the full sparse system.
+
+Usage: python benchmarks/ac_mor.py [mesh_side [n_of_points]]
+
+The time of the full solution of the whole sweep is extrapolated from
+the subset. The error is the largest relative difference between the
+two solutions on the subset.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, circuit, devices, ac, options, utilities
+from ac_direct import reduced_matrices
+
+def rc_mesh(side):
+	circ = circuit.circuit(title="RC mesh, %dx%d nodes" % (side, side))
+	circ.nodes_dict.update({0:'0', 1:'in'})
+	node = lambda row, col: 2 + row*side + col
+	for row in xrange(side):
+		for col in xrange(side):
+			circ.nodes_dict.update({node(row, col):"n%d_%d" % (row, col)})
+	elements = []
+	source = devices.vsource(n1=1, n2=0, vdc=1.0, abs_ac=1.0)
+	source.descr = "1"
+	elements.append(source)
+	elem = devices.resistor(n1=1, n2=node(0, 0), R=50.0)
+	elem.descr = "S"
+	elements.append(elem)
+	for row in xrange(side):
+		for col in xrange(side):
+			if col + 1 < side:
+				elem = devices.resistor(n1=node(row, col), n2=node(row, col+1), R=10.0)
+				elem.descr = "H%d_%d" % (row, col)
+				elements.append(elem)
+			if row + 1 < side:
+				elem = devices.resistor(n1=node(row, col), n2=node(row+1, col), R=10.0)
+				elem.descr = "V%d_%d" % (row, col)
+				elements.append(elem)
+			elem = devices.capacitor(n1=node(row, col), n2=0, C=1e-15)
+			elem.descr = "%d_%d" % (row, col)
+			elements.append(elem)
+	circ.elements = elements
+	return circ
+
+def sweep(mna, AC, Nac, Gmin, omegas, use_mor, step=1):
+	"""Returns: the time taken and the solutions at every step-th point."""
+	options.ac_use_mor = use_mor
+	start = time.time()
+	xs = []
+	for index, (omega, x, solved) in enumerate(ac._ac_sweep(mna, AC, 0, Nac, Gmin, omegas)):
+		if not index % step:
+			xs.append(x)
+	return time.time() - start, xs
+
+if __name__ == '__main__':
+	side = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+	n_of_points = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+	options.use_sparse = True
+	omegas = list(utilities.log_axis_iterator(2*numpy.pi*1e12, 2*numpy.pi*1e6, n_of_points))
+	mna, AC, Nac, Gmin = reduced_matrices(rc_mesh(side))
+	print "%d unknowns, %d points" % (mna.shape[0], n_of_points)
+	step = max(1, n_of_points/20)
+	tmor, xmor = sweep(mna, AC, Nac, Gmin, omegas, True, step)
+	tfull, xfull = sweep(mna, AC, Nac, Gmin, omegas[::step], False)
+	tfull = tfull*n_of_points/len(xfull)
+	diff = max([abs(a - b).max()/abs(b).max() for a, b in zip(xmor, xfull)])
+	print "%-34s %10.3f s" % ("reduced order model", tmor)
+	print "%-34s %10.3f s" % ("full system (extrapolated)", tfull)
+	print "%-34s %10g" % ("max rel diff", diff)
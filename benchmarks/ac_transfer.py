@@ -0,0 +1,81 @@
+# -*- coding: iso-8859-1 -*-
+# ac_transfer.py
+# Benchmark: N-port characterization, AC transfer analysis vs N AC runs
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Computes the impedance matrix of an RC mesh with current source ports
+along its diagonal, at every frequency:
+ - solving the AC system once per port, with only that port excited, as
+   running one AC analysis per port does,
+ - solving it for all the ports at once, on one factorization per 
+   frequency, as the AC transfer analysis does.
+The matrices are built beforehand, only the solution is timed.
+
+Usage: python benchmarks/ac_transfer.py [mesh_side [n_of_ports [n_of_points]]]
+
+The last line is the largest relative difference between the two.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, devices, ac, options, utilities
+from ac_mor import rc_mesh
+from ac_direct import reduced_matrices
+
+def add_ports(circ, side, n_of_ports):
+	ports = []
+	for index in xrange(n_of_ports):
+		k = index*(side - 1)/max(1, n_of_ports - 1)
+		port = devices.isource(n1=0, n2=2 + k*side + k, idc=0.0, abs_ac=1.0)
+		port.descr = "P%d" % (index,)
+		ports.append(port)
+	circ.elements = circ.elements + ports
+	return ports
+
+def one_port_at_a_time(mna, AC, Nac, Gmin, omegas):
+	start = time.time()
+	Z = numpy.zeros((len(omegas), mna.shape[0], Nac.shape[1]), dtype=complex)
+	for k in xrange(Nac.shape[1]):
+		for index, (omega, x, solved) in enumerate(ac._ac_sweep(mna, AC, 0, Nac[:, k], Gmin, omegas)):
+			Z[index, :, k] = numpy.asarray(x).ravel()
+	return time.time() - start, Z
+
+def all_ports(mna, AC, Nac, Gmin, omegas):
+	start = time.time()
+	Z = numpy.zeros((len(omegas), mna.shape[0], Nac.shape[1]), dtype=complex)
+	for index, (omega, X, solved) in enumerate(ac._ac_sweep(mna, AC, 0, Nac, Gmin, omegas)):
+		Z[index, :, :] = X
+	return time.time() - start, Z
+
+if __name__ == '__main__':
+	side = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+	n_of_ports = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+	n_of_points = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+	options.use_sparse = True
+	circ = rc_mesh(side)
+	ports = add_ports(circ, side, n_of_ports)
+	omegas = list(utilities.log_axis_iterator(1e12, 1e6, n_of_points))
+	mna, AC, Nac, Gmin = reduced_matrices(circ)
+	Nac = utilities.remove_row(ac.generate_Nac_unit(circ, ports), rrow=0)
+	tports, Zports = one_port_at_a_time(mna, AC, Nac, Gmin, omegas)
+	tall, Zall = all_ports(mna, AC, Nac, Gmin, omegas)
+	print "%d unknowns, %d ports, %d points" % (mna.shape[0], n_of_ports, n_of_points)
+	print "%-34s %10.3f s" % ("one port at a time", tports)
+	print "%-34s %10.3f s" % ("all the ports at once", tall)
+	print "%-34s %10g" % ("max rel diff", abs(Zports - Zall).max()/abs(Zall).max())
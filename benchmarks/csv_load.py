@@ -0,0 +1,96 @@
+# -*- coding: iso-8859-1 -*-
+# csv_load.py
+# Benchmark: loading a CSV results file
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Loads a CSV results file with csvlib.load_csv:
+ - one variable, all the samples,
+ - a window of samples at the end of the file (the first time the
+   index of the file is built, then it is used),
+and, on a smaller file, compares the time taken to load one variable
+with the line by line loader csvlib had before (reimplemented here).
+
+Usage: python benchmarks/csv_load.py [n_of_samples [n_of_variables [n_of_samples_line_by_line]]]
+"""
+
+import sys, os, time, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import csvlib
+
+def load_line_by_line(filename, load_headers):
+	"""The loader csvlib had before: it grows the data one sample at a
+	time and parses one value at a time."""
+	fp = open(filename)
+	headers = fp.readline()[1:].strip().split(csvlib.SEPARATOR)
+	his = csvlib.get_headers_index(headers, load_headers)
+	data = None
+	for line in fp:
+		if data is None:
+			data = numpy.zeros((len(his), 1))
+		else:
+			data = numpy.concatenate((data, numpy.zeros((len(his), 1))), axis=1)
+		data_values = line.strip().split(csvlib.SEPARATOR)
+		for i in range(len(data_values)):
+			if his.count(i) > 0:
+				data[his.index(i), -1] = csvlib.parse_value(data_values[i])
+	fp.close()
+	return numpy.mat(data)
+
+def write_file(n_of_samples, n_of_variables):
+	filename = tempfile.mktemp(suffix=".csv")
+	headers = ["T"] + ["V%d" % (i,) for i in range(1, n_of_variables)]
+	writer = csvlib.csv_writer(filename, headers, buffer_rows=10000)
+	data = numpy.random.randn(n_of_variables, n_of_samples)
+	data[0, :] = numpy.arange(n_of_samples)
+	writer.write(data)
+	writer.close()
+	return filename
+
+def timed(function, *args):
+	start = time.time()
+	result = function(*args)
+	return time.time() - start, result
+
+if __name__ == '__main__':
+	n_of_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+	n_of_variables = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+	n_of_samples_lbl = int(sys.argv[3]) if len(sys.argv) > 3 else 100000
+
+	filename = write_file(n_of_samples, n_of_variables)
+	tall, (data, headers, pos, EOF) = timed(csvlib.load_csv, filename, ["V1"])
+	skip = n_of_samples - 1000
+	tfirst, (first, headers, pos, EOF) = timed(csvlib.load_csv, filename, ["T"], 100, skip)
+	tindexed, (window, headers, pos, EOF) = timed(csvlib.load_csv, filename, ["T"], 100, skip)
+	assert window[0, 0] == skip and numpy.array_equal(first, window)
+	os.remove(filename)
+	os.remove(filename + csvlib.INDEX_SUFFIX)
+
+	filename = write_file(n_of_samples_lbl, n_of_variables)
+	tlbl, old = timed(load_line_by_line, filename, ["V1"])
+	tnew, (new, headers, pos, EOF) = timed(csvlib.load_csv, filename, ["V1"])
+	assert numpy.array_equal(old, new)
+	os.remove(filename)
+
+	print "%d samples, %d variables" % (n_of_samples, n_of_variables)
+	print "%-34s %10.3f s" % ("one variable", tall)
+	print "%-34s %10.3f s" % ("window, building the index", tfirst)
+	print "%-34s %10.3f s" % ("window, with the index", tindexed)
+	print "%d samples, %d variables" % (n_of_samples_lbl, n_of_variables)
+	print "%-34s %10.3f s" % ("one variable, line by line", tlbl)
+	print "%-34s %10.3f s" % ("one variable", tnew)
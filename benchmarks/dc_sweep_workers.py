@@ -0,0 +1,81 @@
+# -*- coding: iso-8859-1 -*-
+# dc_sweep_workers.py
+# Benchmark: DC sweep time vs number of worker processes
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times the transfer curve sweep of a chain of CMOS inverters, solved
+serially and split among an increasing number of worker processes.
+
+Usage: python benchmarks/dc_sweep_workers.py [n_of_points [max_workers]]
+
+max_workers defaults to the number of CPUs. The last column is the
+largest difference between the results of the parallel and serial runs.
+
+The circuit is sent to the workers pickled: the script exits with status
+1 if it can't be pickled after an OP analysis.
+"""
+
+import sys, os, time, tempfile, multiprocessing, pickle
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dc_analysis, circuit, csvlib, options
+
+def inverter_chain(n_of_inverters):
+	circ = circuit.circuit(title="CMOS inverter chain, %d inverters" % (n_of_inverters,))
+	circ.add_model("ekv", "nch", {"TYPE":"n", "VTO":.4, "KP":10e-6})
+	circ.add_model("ekv", "pch", {"TYPE":"p", "VTO":-.4, "KP":25e-6})
+	circ.add_vsource("VDD", "dd", "0", vdc=3.3)
+	circ.add_vsource("VIN", "n0", "0", vdc=0)
+	for index in xrange(n_of_inverters):
+		n_in, n_out = "n%d" % index, "n%d" % (index + 1)
+		circ.add_mos("MN%d" % index, n_out, n_in, "0", "0", 10e-6, 1e-6, "nch")
+		circ.add_mos("MP%d" % index, n_out, n_in, "dd", "dd", 10e-6, 1e-6, "pch")
+		circ.add_capacitor("C%d" % index, n_out, "0", C=10e-15)
+	return circ
+
+def sweep(circ, n_of_points, workers, filename):
+	start = time.time()
+	dc_analysis.dc_analysis(circ, start=0, stop=3.3, step=3.3/n_of_points, type_descr=("vsource", "IN"), \
+		data_filename=filename, stype=options.dc_lin_step, workers=workers, verbose=0)
+	elapsed = time.time() - start
+	data = csvlib.load_csv(filename)[0]
+	return elapsed, data
+
+if __name__ == '__main__':
+	n_of_points = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+	max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else multiprocessing.cpu_count()
+	circ = inverter_chain(5)
+	dc_analysis.op_analysis(circ, verbose=0)
+	try:
+		pickle.dumps(circ, pickle.HIGHEST_PROTOCOL)
+	except (pickle.PicklingError, TypeError), e:
+		print "The circuit can't be pickled after an OP analysis: %s" % (e,)
+		sys.exit(1)
+	fd, filename = tempfile.mkstemp(suffix=".dc")
+	os.close(fd)
+	print "%d sweep points, %d CPUs" % (n_of_points, multiprocessing.cpu_count())
+	print "%8s %10s %10s %12s" % ("workers", "time [s]", "speedup", "max |diff|")
+	try:
+		serial, reference = sweep(circ, n_of_points, 1, filename)
+		print "%8d %10.3f %10.2f %12g" % (1, serial, 1.0, 0.0)
+		workers = 2
+		while workers <= max(max_workers, 2):
+			elapsed, data = sweep(circ, n_of_points, workers, filename)
+			print "%8d %10.3f %10.2f %12g" % (workers, elapsed, serial/elapsed, abs(data - reference).max())
+			workers = 2*workers
+	finally:
+		os.remove(filename)
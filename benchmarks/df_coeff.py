@@ -0,0 +1,102 @@
+# -*- coding: iso-8859-1 -*-
+# df_coeff.py
+# Benchmark: computing the coefficients of Gear's differentiation formulae
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Calls gear.get_df (with prediction), as a fixed step transient does
+at every step, with the cached coefficients of df_coeff and with the
+loops gear had before (reimplemented here), for every order.
+
+Usage: python benchmarks/df_coeff.py [n_of_steps [n_of_variables]]
+
+The last column is the largest relative difference between the values
+returned.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, gear, utilities
+
+def get_df_loops(pv_array, suggested_step, order):
+	"""gear.get_df as it was before, with predict=True."""
+	s = [0]
+	for index in range(1, order + 2):
+		s.append(suggested_step + pv_array[0][0] - pv_array[index - 1][0])
+	e = numpy.mat(numpy.zeros((order + 2, order + 2)))
+	for k_index in range(1, order + 2):
+		for i_index in range(1, order + 2):
+			if i_index == k_index:
+				e[k_index, i_index] = 1
+			else:
+				e[k_index, i_index] = s[i_index] / (s[i_index] -s[k_index])
+	alpha = numpy.mat(numpy.zeros((1, order + 2)))
+	for k_index in range(1, order + 2):
+		alpha[0, k_index] = 1.0
+		for j_index in range(order + 1):
+			alpha[0, k_index] = alpha[0, k_index] * e[k_index, j_index+1]
+	gamma = numpy.mat(numpy.zeros((1, order +1)))
+	for k_index in range(1, order + 1):
+		gamma[0, k_index] = alpha[0, k_index] * ((1.0/s[order+1]) - (1.0/s[k_index]))
+	gamma[0, 0] = 0
+	for index in range(1, order + 1):
+		gamma[0, 0] = gamma[0, 0] - gamma[0, index]
+	C1 = gamma[0, 0]
+	C0 = numpy.mat(numpy.zeros(pv_array[0][1].shape))
+	for index in range(order):
+		C0 = C0 + gamma[0, index + 1] * pv_array[index][1]
+	x_lte_coeff = 0
+	for k_index in range(1, order+1):
+		x_lte_coeff = x_lte_coeff + (s[k_index] ** (order + 1)) * (-1.0 * gamma[0, k_index] / gamma[0, 0]) 
+	x_lte_coeff = ((-1.0)**(order + 1)) *(1.0/utilities.fact(order + 1)) * x_lte_coeff
+	predict_x = numpy.mat(numpy.zeros(pv_array[0][1].shape))
+	for index in range(1, order + 2):
+		predict_x = predict_x + alpha[0, index] * pv_array[index - 1][1]
+	predict_lte_coeff = -1.0/(utilities.fact(order + 1))
+	for index in range(1, order + 2):
+		predict_lte_coeff = predict_lte_coeff * s[index]
+	return [C1, C0, x_lte_coeff, predict_x, predict_lte_coeff]
+
+def rel_diff(a, b):
+	if a is None:
+		return 0
+	return abs(numpy.asarray(a) - numpy.asarray(b)).max()/abs(numpy.asarray(b)).max()
+
+if __name__ == '__main__':
+	n_of_steps = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	n_of_variables = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+	step = 1e-9
+	print "%d steps, %d variables" % (n_of_steps, n_of_variables)
+	print "%-6s %12s %12s %12s" % ("order", "loops [s]", "cached [s]", "max rel diff")
+	for order in range(2, 7):
+		gear.order = order
+		# the history of a fixed step transient, the time accumulated
+		history = []
+		t = 0.0
+		for k in range(order + 2):
+			history.insert(0, (t, numpy.mat(numpy.random.randn(n_of_variables, 1)), None))
+			t = t + step
+		start = time.time()
+		for n in xrange(n_of_steps):
+			old = get_df_loops(history, step, order)
+		told = time.time() - start
+		start = time.time()
+		for n in xrange(n_of_steps):
+			new = gear.get_df(history, step, predict=True)
+		tnew = time.time() - start
+		print "%-6d %12.3f %12.3f %12g" % (order, told, tnew, max([rel_diff(a, b) for a, b in zip(new, old)]))
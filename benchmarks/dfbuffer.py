@@ -0,0 +1,87 @@
+# -*- coding: iso-8859-1 -*-
+# dfbuffer.py
+# Benchmark: the transient history buffer
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Fills a transient.dfbuffer as the output buffer of a transient
+analysis run for shooting (one x per step, the last points are kept)
+and reads it with get_as_matrix(). The same is done with the list based
+buffer transient had before (reimplemented here).
+
+Usage: python benchmarks/dfbuffer.py [points [n_of_variables [n_of_steps]]]
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, transient
+
+class list_dfbuffer:
+	"""The buffer transient had before."""
+	def __init__(self, length, width):
+		self._the_real_buffer = []
+		self._length = length
+		self._width = width
+
+	def add(self, atuple):
+		self._the_real_buffer.insert(0, atuple)
+		if len(self._the_real_buffer) > self._length:
+			self._the_real_buffer = self._the_real_buffer[:self._length]
+		return True
+
+	def get_as_matrix(self):
+		for vindex in range(self._width):
+			for index in range(len(self._the_real_buffer)):
+				if index == 0:
+					single_matrix = self._the_real_buffer[index][vindex]
+				else:
+					single_matrix = numpy.concatenate((self._the_real_buffer[index][vindex], single_matrix), axis=0)
+			if vindex == 0:
+				complete_matrix = single_matrix
+			else:
+				complete_matrix = numpy.concatenate((complete_matrix, single_matrix), axis=1)
+		return complete_matrix
+
+def fill(buffer_class, points, xs):
+	start = time.time()
+	buf = buffer_class(length=points, width=1)
+	for x in xs:
+		buf.add((x,))
+	return time.time() - start, buf
+
+if __name__ == '__main__':
+	points = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+	n_of_variables = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+	n_of_steps = int(sys.argv[3]) if len(sys.argv) > 3 else 10*points
+	xs = [numpy.mat(numpy.random.randn(n_of_variables, 1)) for i in xrange(n_of_steps)]
+
+	tadd_old, old = fill(list_dfbuffer, points, xs)
+	tadd_new, new = fill(transient.dfbuffer, points, xs)
+	start = time.time()
+	mold = old.get_as_matrix()
+	tget_old = time.time() - start
+	start = time.time()
+	mnew = new.get_as_matrix()
+	tget_new = time.time() - start
+
+	print "%d points, %d variables, %d steps" % (points, n_of_variables, n_of_steps)
+	print "%-34s %10.3f s" % ("list: add", tadd_old)
+	print "%-34s %10.3f s" % ("list: get_as_matrix", tget_old)
+	print "%-34s %10.3f s" % ("ring: add", tadd_new)
+	print "%-34s %10.3f s" % ("ring: get_as_matrix", tget_new)
+	print "%-34s %10s" % ("identical", numpy.array_equal(mold, mnew))
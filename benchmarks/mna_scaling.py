@@ -0,0 +1,96 @@
+# -*- coding: iso-8859-1 -*-
+# mna_scaling.py
+# Benchmark: MNA and AC source vector build time vs circuit size
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times the construction of the MNA matrix, N and the AC source vector
+of circuits with an increasing number of voltage defined elements.
+
+Usage: python benchmarks/mna_scaling.py [max_n_of_stages]
+
+Every stage is a voltage source, a series resistor and an inductor to
+ground: two voltage defined elements and three nodes per stage. The
+stages are doubled at every step, the time per element should stay
+roughly constant.
+
+For reference, the last column reports the time the MNA took when it
+was grown by one row and one column per voltage defined element
+(utilities.expand_matrix()), which is quadratic in the number of
+elements. It is only run on the smaller circuits.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, circuit, devices, ac, utilities
+
+def vsource_ladder(n_of_stages):
+	circ = circuit.circuit(title="voltage source ladder, %d stages" % (n_of_stages,))
+	circ.nodes_dict.update({0:'0'})
+	elements = []
+	for stage in xrange(n_of_stages):
+		n1, n2 = 2*stage + 1, 2*stage + 2
+		circ.nodes_dict.update({n1:"a%d" % stage, n2:"b%d" % stage})
+		elem = devices.vsource(n1=n1, n2=0, vdc=1.0, abs_ac=1.0)
+		elem.descr = str(stage)
+		elements.append(elem)
+		elem = devices.resistor(n1=n1, n2=n2, R=1e3)
+		elem.descr = str(stage)
+		elements.append(elem)
+		elem = devices.inductor(n1=n2, n2=0, L=1e-6)
+		elem.descr = str(stage)
+		elements.append(elem)
+	circ.elements = elements
+	return circ
+
+def grown_mna(circ):
+	"""The MNA of the voltage defined elements only, adding a row and a
+	column at a time."""
+	mna = numpy.mat(numpy.zeros((len(circ.nodes_dict), len(circ.nodes_dict))))
+	for elem in circ.elements:
+		if circuit.is_elem_voltage_defined(elem):
+			index = mna.shape[0]
+			mna = utilities.expand_matrix(mna, add_a_row=True, add_a_col=True)
+			mna[elem.n1, index] = +1.0
+			mna[elem.n2, index] = -1.0
+			mna[index, elem.n1] = +1.0
+			mna[index, elem.n2] = -1.0
+	return mna
+
+def timeit(function, *args):
+	start = time.time()
+	ret = function(*args)
+	return time.time() - start, ret
+
+if __name__ == '__main__':
+	max_n_of_stages = int(sys.argv[1]) if len(sys.argv) > 1 else 32000
+	print "%8s %8s %12s %12s %14s %14s" % ("elements", "vde", "MNA, N [s]", "Nac [s]", "us/element", "grown MNA [s]")
+	n_of_stages = 250
+	while n_of_stages <= max_n_of_stages:
+		circ = vsource_ladder(n_of_stages)
+		n_of_elements = len(circ.elements)
+		# the plan is built the first time the MNA is requested
+		tmna, (mna, N) = timeit(dc_analysis.generate_mna_and_N, circ, True)
+		tnac, Nac = timeit(ac.generate_Nac, circ)
+		if n_of_stages <= 500:
+			tgrown = "%14.4f" % timeit(grown_mna, circ)[0]
+		else:
+			tgrown = "%14s" % ("-",)
+		print "%8d %8d %12.4f %12.4f %14.2f %s" % (n_of_elements, 2*n_of_stages, tmna, tnac, \
+			1e6*(tmna + tnac)/n_of_elements, tgrown)
+		n_of_stages = 2*n_of_stages
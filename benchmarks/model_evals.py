@@ -0,0 +1,117 @@
+# -*- coding: iso-8859-1 -*-
+# model_evals.py
+# Benchmark: EKV model evaluations per OP analysis
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Counts how many times the EKV model is evaluated during an OP analysis
+of an array of CMOS inverters, when the jacobian is assembled:
+ - calling i() and g() for every device (i/g),
+ - calling eval() for every device (eval),
+ - evaluating all the devices sharing a model at once (vectorized).
+
+Usage: python benchmarks/model_evals.py [n_inverters]
+
+Every model call computes the current (and the inversion charges, with
+the get_ismall() Newton iteration) of one device, or of all the devices
+of a group in the vectorized case. Only the calls made to assemble the
+jacobian are counted, not the ones made afterwards to collect the 
+operating point information of the devices.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dc_analysis, circuit, options, ekv
+
+def inverter_array(n_of_inverters):
+	circ = circuit.circuit(title="CMOS inverter array, %d inverters" % (n_of_inverters,))
+	circ.add_model("ekv", "nch", {"TYPE":"n", "VTO":.4, "KP":10e-6})
+	circ.add_model("ekv", "pch", {"TYPE":"p", "VTO":-.4, "KP":25e-6})
+	circ.add_vsource("VDD", "dd", "0", vdc=3.3)
+	circ.add_vsource("VIN", "in", "0", vdc=1.2)
+	for index in xrange(n_of_inverters):
+		out = "out%d" % index
+		circ.add_mos("MN%d" % index, out, "in", "0", "0", 10e-6, 1e-6, "nch")
+		circ.add_mos("MP%d" % index, out, "in", "dd", "dd", 10e-6, 1e-6, "pch")
+		circ.add_resistor("R%d" % index, out, "0", R=100e3)
+	return circ
+
+class call_counter:
+	"""Wraps a method of ekv_mos_model, counting the calls made while 
+	the jacobian is being built."""
+	def __init__(self, name, assembling):
+		self.name = name
+		self.method = getattr(ekv.ekv_mos_model, name)
+		self.calls = 0
+		counter = self
+		def wrapper(*args, **kwargs):
+			if assembling[0]:
+				counter.calls += 1
+			return counter.method(*args, **kwargs)
+		setattr(ekv.ekv_mos_model, name, wrapper)
+	def restore(self):
+		setattr(ekv.ekv_mos_model, self.name, self.method)
+
+def assembly_flag():
+	"""Wraps dc_analysis.build_J_and_Tx, returns a list whose first 
+	element is True during its execution."""
+	assembling = [False]
+	build_J_and_Tx = dc_analysis.build_J_and_Tx
+	def wrapper(*args, **kwargs):
+		assembling[0] = True
+		try:
+			return build_J_and_Tx(*args, **kwargs)
+		finally:
+			assembling[0] = False
+	dc_analysis.build_J_and_Tx = wrapper
+	return assembling, build_J_and_Tx
+
+def count_op(circ, mode):
+	options.vectorized_devices = mode == "vectorized"
+	device_eval = ekv.ekv_device.__dict__['eval']
+	if mode == "i/g":
+		del ekv.ekv_device.eval
+	assembling, build_J_and_Tx = assembly_flag()
+	scalar = call_counter("get_ids", assembling)
+	vector = call_counter("_get_ids_and_g_vec", assembling)
+	try:
+		start = time.time()
+		op = dc_analysis.op_analysis(circ, guess=False, verbose=0)
+		elapsed = time.time() - start
+	finally:
+		scalar.restore()
+		vector.restore()
+		dc_analysis.build_J_and_Tx = build_J_and_Tx
+		ekv.ekv_device.eval = device_eval
+		options.vectorized_devices = True
+	if op is None:
+		print "OP failed!"
+	return scalar.calls + vector.calls, elapsed, op
+
+if __name__ == '__main__':
+	n_of_inverters = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+	circ = inverter_array(n_of_inverters)
+	n_of_devices = 2*n_of_inverters
+	print "%d EKV devices" % (n_of_devices,)
+	print "%12s %12s %16s %10s %12s" % ("mode", "model calls", "calls/device", "time [s]", "max |dx|")
+	reference = None
+	for mode in ("i/g", "eval", "vectorized"):
+		calls, elapsed, op = count_op(circ, mode)
+		if reference is None:
+			reference = op
+		diff = abs(op.asmatrix() - reference.asmatrix()).max()
+		print "%12s %12d %16.2f %10.4f %12g" % (mode, calls, float(calls)/n_of_devices, elapsed, diff)
@@ -0,0 +1,74 @@
+# -*- coding: iso-8859-1 -*-
+# noise_adjoint.py
+# Benchmark: adjoint noise analysis vs superposition
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Computes the noise at a corner of an RC mesh, due to the thermal noise
+of all its resistors:
+ - with the noise analysis (one transposed solve per frequency),
+ - by superposition, with one AC sweep per resistor, on a subset of the
+   resistors.
+
+Usage: python benchmarks/noise_adjoint.py [mesh_side [n_of_points [n_of_sources]]]
+
+The time of the superposition of all the sources is extrapolated from
+the subset. The last line is the largest relative difference between the
+contributions computed by the two methods, on the subset.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, ac, noise, options, utilities
+from ac_mor import rc_mesh
+from ac_direct import reduced_matrices
+
+if __name__ == '__main__':
+	side = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+	n_of_points = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+	n_of_sources = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+	options.use_sparse = True
+	circ = rc_mesh(side)
+	output = "n%d_%d" % (side - 1, side - 1)
+
+	start = time.time()
+	sol = noise.noise_analysis(circ, "v(%s)" % (output,), 1e6, 1e12, n_of_points, data_filename=os.devnull, verbose=0)
+	tadjoint = time.time() - start
+
+	mna, AC, Nac, Gmin = reduced_matrices(circ)
+	omegas = list(sol.get_omegas())
+	sources = noise.noise_sources(circ, None)
+	index = circ.ext_node_to_int(output) - 1
+	subset = range(0, len(sources.names), max(1, len(sources.names)/n_of_sources))
+	start = time.time()
+	diff = 0
+	for k in subset:
+		# a unit current between the nodes of the source
+		injection = numpy.mat(numpy.zeros((mna.shape[0] + 1, 1)))
+		injection[sources.nodes[k, 0], 0] = 1.0
+		injection[sources.nodes[k, 1], 0] = -1.0
+		injection = injection[1:, :]
+		density = numpy.array([abs(x[index, 0])**2*sources.white[k] for omega, x, solved in \
+			ac._ac_sweep(mna, AC, 0, injection, Gmin, omegas)])
+		diff = max(diff, (abs(density - sol[sources.names[k]])/density).max())
+	tsuperposition = (time.time() - start)*len(sources.names)/len(subset)
+
+	print "%d noise sources, %d points" % (len(sources.names), n_of_points)
+	print "%-34s %10.3f s" % ("adjoint", tadjoint)
+	print "%-34s %10.3f s" % ("superposition (extrapolated)", tsuperposition)
+	print "%-34s %10g" % ("max rel diff", diff)
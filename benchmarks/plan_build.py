@@ -0,0 +1,91 @@
+# -*- coding: iso-8859-1 -*-
+# plan_build.py
+# Benchmark: circuit_plan build and matrix assembly time
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times the construction of the circuit_plan of a large RLC ladder and
+the (sparse) assembly of the matrices from it.
+
+Usage: python benchmarks/plan_build.py [n_of_elements]
+
+The ladder is driven by a voltage source, every stage is a series
+resistor (an inductor every 10 stages) and a capacitor to ground, every
+100 stages a diode clamps the node to ground.
+
+The elements are instantiated directly: the circuit.add_*() methods
+copy the element list and scan the node dictionary at every call, which
+would dominate the run time for this many elements.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dc_analysis, circuit, circuit_plan, devices, diode, transient, options
+
+def rlc_ladder(n_of_elements):
+	circ = circuit.circuit(title="RLC ladder, %d elements" % (n_of_elements,))
+	n_of_stages = n_of_elements/2
+	circ.nodes_dict.update({0:'0'})
+	for node in xrange(1, n_of_stages + 1):
+		circ.nodes_dict.update({node:"n%d" % node})
+	dx = diode.diode_model(name="dx")
+	elements = []
+	source = devices.vsource(n1=1, n2=0, vdc=1.0, abs_ac=1.0)
+	source.descr = "1"
+	elements.append(source)
+	for stage in xrange(1, n_of_stages):
+		if stage % 10:
+			elem = devices.resistor(n1=stage, n2=stage+1, R=1e3)
+		else:
+			elem = devices.inductor(n1=stage, n2=stage+1, L=1e-6)
+		elem.descr = str(stage)
+		elements.append(elem)
+		elem = devices.capacitor(n1=stage+1, n2=0, C=1e-12)
+		elem.descr = str(stage)
+		elements.append(elem)
+		if not stage % 100:
+			elem = diode.diode(stage+1, 0, dx)
+			elem.descr = str(stage)
+			elements.append(elem)
+	circ.elements = elements
+	return circ
+
+def timeit(function, *args):
+	start = time.time()
+	ret = function(*args)
+	return time.time() - start, ret
+
+if __name__ == '__main__':
+	n_of_elements = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+	circ = rlc_ladder(n_of_elements)
+	print "%d elements, %d nodes" % (len(circ.elements), len(circ.nodes_dict))
+	tplan, plan = timeit(circuit_plan.circuit_plan, circ)
+	print "%-32s %10.4f s" % ("plan build", tplan)
+	print "%-32s %10d" % ("  linear static stamps", plan.g_rows.shape[0] + \
+		sum([group[0].shape[0] for group in plan.g_groups]))
+	print "%-32s %10d" % ("  linear reactive stamps", sum([group[0].shape[0] for group in plan.c_groups]))
+	print "%-32s %10d" % ("  voltage defined elements", plan.n_of_vde)
+	print "%-32s %10d" % ("  nonlinear groups", len(plan.nl_table.groups))
+	tcached, cached = timeit(circuit_plan.get_plan, circ)
+	tcached, cached = timeit(circuit_plan.get_plan, circ)
+	print "%-32s %10.6f s" % ("plan lookup (cached)", tcached)
+	tmna, (mna, N) = timeit(dc_analysis.generate_mna_and_N, circ, True)
+	print "%-32s %10.4f s" % ("MNA and N (sparse)", tmna)
+	tD, D = timeit(transient.generate_D, circ, [mna.shape[0]-1, mna.shape[0]-1], True)
+	print "%-32s %10.4f s" % ("D (sparse)", tD)
+	tTt, Tt = timeit(plan.Tt, 0)
+	print "%-32s %10.4f s" % ("Tt", tTt)
@@ -0,0 +1,66 @@
+# -*- coding: iso-8859-1 -*-
+# results_bin.py
+# Benchmark: accessing the variables of a results file, CSV vs binary
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Writes the same samples to a CSV and to a binary results file, then
+loads some of the variables, one at a time as plotting does, from:
+ - the CSV file (csvlib.load_csv), that is parsed every time,
+ - the binary file (binlib.load_bin), that is memory-mapped.
+
+Usage: python benchmarks/results_bin.py [n_of_samples [n_of_variables [n_of_loads]]]
+
+The last line is the largest difference between the loaded values.
+"""
+
+import sys, os, time, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import csvlib, binlib
+
+if __name__ == '__main__':
+	n_of_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+	n_of_variables = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+	n_of_loads = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+	headers = ["T"] + ["V%d" % (i,) for i in range(1, n_of_variables)]
+	data = numpy.random.randn(n_of_variables, n_of_samples)
+	# CSV holds 6 significant digits
+	data = numpy.array([float("%g" % (v,)) for v in data.ravel()]).reshape(data.shape)
+	csv_file = tempfile.mktemp(suffix=".csv")
+	bin_file = tempfile.mktemp(suffix=".bin")
+	for writer in (csvlib.csv_writer(csv_file, headers), \
+		binlib.bin_writer(bin_file, headers, ["s"] + ["V"]*(n_of_variables - 1))):
+		writer.write(data)
+		writer.close()
+	names = headers[1:n_of_loads + 1]
+
+	start = time.time()
+	csv_data = [csvlib.load_csv(csv_file, load_headers=[name])[0] for name in names]
+	tcsv = time.time() - start
+
+	start = time.time()
+	bin_data = [binlib.load_bin(bin_file, load_headers=[name])[0] for name in names]
+	tbin = time.time() - start
+
+	print "%d samples, %d variables, %d loads" % (n_of_samples, n_of_variables, len(names))
+	print "%-34s %10.3f s" % ("CSV", tcsv)
+	print "%-34s %10.3f s" % ("binary", tbin)
+	print "%-34s %10g" % ("max diff", max([abs(a - b).max() for a, b in zip(csv_data, bin_data)]))
+	del bin_data
+	os.remove(csv_file)
+	os.remove(bin_file)
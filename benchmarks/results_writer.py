@@ -0,0 +1,63 @@
+# -*- coding: iso-8859-1 -*-
+# results_writer.py
+# Benchmark: streaming the results of an analysis to a CSV file
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Writes the same lines, one at a time as the analyses do, to a CSV
+file:
+ - appending every line with csvlib.write_csv(), that opens and closes
+   the file each time,
+ - through a csvlib.csv_writer, that keeps the file open and writes the
+   lines in blocks.
+
+Usage: python benchmarks/results_writer.py [n_of_lines [n_of_variables]]
+
+The two files are checked to be identical.
+"""
+
+import sys, os, time, tempfile, filecmp
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import csvlib, options
+
+if __name__ == '__main__':
+	n_of_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+	n_of_variables = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+	headers = ["T"] + ["V%d" % (i,) for i in range(1, n_of_variables)]
+	lines = [numpy.mat(numpy.random.randn(n_of_variables, 1)) for i in xrange(n_of_lines)]
+	old_file = tempfile.mktemp(suffix=".csv")
+	new_file = tempfile.mktemp(suffix=".csv")
+
+	start = time.time()
+	for index, data in enumerate(lines):
+		csvlib.write_csv(old_file, data, headers, append=index > 0)
+	told = time.time() - start
+
+	start = time.time()
+	writer = csvlib.csv_writer(new_file, headers, options.results_buffer_rows, options.results_flush_interval)
+	for data in lines:
+		writer.write(data)
+	writer.close()
+	tnew = time.time() - start
+
+	print "%d lines, %d variables" % (n_of_lines, n_of_variables)
+	print "%-34s %10.3f s" % ("write_csv(append=True)", told)
+	print "%-34s %10.3f s" % ("csv_writer", tnew)
+	print "%-34s %10s" % ("identical files", filecmp.cmp(old_file, new_file, shallow=False))
+	os.remove(old_file)
+	os.remove(new_file)
@@ -0,0 +1,78 @@
+# -*- coding: iso-8859-1 -*-
+# sens_adjoint.py
+# Benchmark: adjoint sensitivities vs perturbation of every element
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times the DC sensitivities of the output of an RC ladder to every
+resistor and capacitor:
+ - with the sensitivity analysis (one adjoint solve),
+ - perturbing every resistor in turn and running an OP analysis 
+   (central differences), on a subset of the resistors.
+
+Usage: python benchmarks/sens_adjoint.py [n_of_stages [n_of_perturbed]]
+
+The time of the perturbation of all the elements is extrapolated from
+the subset. The last line is the largest relative difference between
+the two on the subset.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, sens, options
+from ac_direct import rc_ladder
+
+def output(circ, node):
+	# a new element list: the circuit plan, which holds the values of
+	# the elements, is rebuilt as it would be re-parsing the netlist
+	circ.elements = list(circ.elements)
+	return dc_analysis.op_analysis(circ, verbose=0).asmatrix()[node - 1, 0]
+
+if __name__ == '__main__':
+	n_of_stages = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+	n_of_perturbed = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+	options.use_sparse = True
+	circ = rc_ladder(n_of_stages)
+	# a load, so that every resistor matters
+	circ.add_resistor("RL", "n%d" % (n_of_stages,), "0", R=1e6)
+	node = circ.ext_node_to_int("n%d" % (n_of_stages,))
+
+	start = time.time()
+	sol = sens.sens_analysis(circ, "v(n%d)" % (n_of_stages,), data_filename="stdout", verbose=0)
+	tadjoint = time.time() - start
+
+	resistors = [elem for elem in circ.elements if elem.letter_id.upper() == 'R']
+	perturbed = resistors[::max(1, len(resistors)/n_of_perturbed)]
+	start = time.time()
+	diff = 0
+	for elem in perturbed:
+		R = elem.R
+		elem.R = R*(1 + 1e-4)
+		y1 = output(circ, node)
+		elem.R = R*(1 - 1e-4)
+		y2 = output(circ, node)
+		elem.R = R
+		derivative = (y1 - y2)/(2e-4*R)
+		adjoint = sol["R" + elem.descr]
+		diff = max(diff, abs(derivative - adjoint)/abs(adjoint))
+	tperturbed = (time.time() - start)*len(sol.names)/len(perturbed)
+
+	print "%d parameters" % (len(sol.names),)
+	print "%-34s %10.3f s" % ("adjoint", tadjoint)
+	print "%-34s %10.3f s" % ("perturbation (extrapolated)", tperturbed)
+	print "%-34s %10g" % ("max rel diff", diff)
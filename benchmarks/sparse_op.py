@@ -0,0 +1,64 @@
+# -*- coding: iso-8859-1 -*-
+# sparse_op.py
+# Benchmark: OP analysis time, dense vs sparse solver
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times an OP analysis of a resistor/diode ladder of increasing size, 
+with the dense and the sparse MNA engines.
+
+Usage: python benchmarks/sparse_op.py [n_nodes1 n_nodes2 ...]
+
+The ladder is made of a 5V source driving a chain of 1k resistors, every 
+node of the chain is clamped to ground by a diode.
+"""
+
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dc_analysis, circuit, options
+
+def diode_ladder(n_of_nodes):
+	circ = circuit.circuit(title="Resistor/diode ladder, %d nodes" % (n_of_nodes,))
+	circ.add_model("diode", "dx", {"name":"dx"})
+	circ.add_vsource("V1", "n0", "0", vdc=5.0)
+	for index in xrange(1, n_of_nodes):
+		circ.add_resistor("R%d" % index, "n%d" % (index-1), "n%d" % index, R=1e3)
+		circ.add_diode("D%d" % index, "n%d" % index, "0", "dx")
+	return circ
+
+def time_op(circ, sparse):
+	options.use_sparse = sparse
+	options.sparse_threshold = 0
+	start = time.time()
+	op = dc_analysis.op_analysis(circ, guess=False, verbose=0)
+	elapsed = time.time() - start
+	if op is None:
+		print "OP failed!"
+	return elapsed, op
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1:
+		sizes = [int(arg) for arg in sys.argv[1:]]
+	else:
+		sizes = [50, 100, 200, 400, 800]
+	print "%8s %12s %12s %8s %12s" % ("nodes", "dense [s]", "sparse [s]", "speedup", "max |dx|")
+	for size in sizes:
+		circ = diode_ladder(size)
+		tdense, opdense = time_op(circ, sparse=False)
+		tsparse, opsparse = time_op(circ, sparse=True)
+		diff = abs(opdense.asmatrix() - opsparse.asmatrix()).max()
+		print "%8d %12.4f %12.4f %8.2f %12g" % (size, tdense, tsparse, tdense/tsparse, diff)
@@ -0,0 +1,86 @@
+# -*- coding: iso-8859-1 -*-
+# tran_breakpoints.py
+# Benchmark: transient analysis with and without the source breakpoints
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Runs a transient analysis (with step control) of a clocked
+resistor/diode/capacitor ladder, with and without landing on the corners
+of the clock (options.transient_use_breakpoints), and counts the time
+steps, the Newton solves and the Newton failures.
+
+Usage: python benchmarks/tran_breakpoints.py [n_nodes [method]]
+
+The clock is a 0-5V pulse with 1ns edges and a 1us period, every
+section of the ladder is a 1k resistor, a diode and a 1pF capacitor to
+ground.
+"""
+
+import sys, os, time, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import dc_analysis, transient, circuit, devices, options
+
+def clocked_ladder(n_of_nodes):
+	circ = circuit.circuit(title="Clocked diode ladder, %d nodes" % (n_of_nodes,))
+	circ.add_model("diode", "dx", {"name":"dx"})
+	circ.add_vsource("V1", "n0", "0", vdc=0.0, function=devices.pulse(v1=0.0, v2=5.0, td=1e-7, \
+		tr=1e-9, pw=4.99e-7, tf=1e-9, per=1e-6))
+	for index in xrange(1, n_of_nodes):
+		circ.add_resistor("R%d" % index, "n%d" % (index-1), "n%d" % index, R=1e3)
+		circ.add_diode("D%d" % index, "n%d" % index, "0", "dx")
+		circ.add_capacitor("C%d" % index, "n%d" % index, "0", C=1e-12)
+	return circ
+
+class solve_counter:
+	"""Wraps dc_analysis.dc_solve, counting the calls and the failures."""
+	def __init__(self, dc_solve):
+		self.dc_solve = dc_solve
+		self.calls = 0
+		self.failures = 0
+	def __call__(self, *args, **kwargs):
+		ret = self.dc_solve(*args, **kwargs)
+		self.calls = self.calls + 1
+		if not ret[2]:
+			self.failures = self.failures + 1
+		return ret
+
+def run(circ, method, use_breakpoints, data_filename):
+	options.transient_use_breakpoints = use_breakpoints
+	counter = solve_counter(dc_analysis.dc_solve)
+	dc_analysis.dc_solve = counter
+	try:
+		start = time.time()
+		res = transient.transient_analysis(circ, tstart=0, tstep=1e-8, tstop=5e-6, method=method, \
+			data_filename=data_filename, use_step_control=True, verbose=0)
+		elapsed = time.time() - start
+	finally:
+		dc_analysis.dc_solve = counter.dc_solve
+	return elapsed, res.values().shape[1], counter
+
+if __name__ == '__main__':
+	n_of_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+	method = sys.argv[2].upper() if len(sys.argv) > 2 else transient.TRAP
+	tmpdir = tempfile.mkdtemp()
+	data_filename = os.path.join(tmpdir, "bench.tran")
+	circ = clocked_ladder(n_of_nodes)
+	print "%d nodes, %s" % (n_of_nodes, method)
+	print "%12s %10s %8s %8s %10s" % ("breakpoints", "time [s]", "steps", "solves", "failures")
+	for use_breakpoints in (False, True):
+		elapsed, steps, counter = run(circ, method, use_breakpoints, data_filename)
+		print "%12s %10.3f %8d %8d %10d" % (use_breakpoints, elapsed, steps, counter.calls, counter.failures)
+	os.remove(data_filename)
+	os.rmdir(tmpdir)
@@ -0,0 +1,75 @@
+# -*- coding: iso-8859-1 -*-
+# tran_exponential.py
+# Benchmark: the EXPONENTIAL transient method
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Compares the EXPONENTIAL and the TRAP transient methods, with a fixed
+step, on a RLC ladder driven by a pulse source whose corners fall on the
+time points: for every step, the time taken and the largest error with
+respect to a TRAP analysis with a step 100 times shorter.
+
+Usage: python benchmarks/tran_exponential.py [n_nodes [sparse]]
+
+Every section of the ladder is a 10 ohm resistor, a 1nH inductor and a
+100fF capacitor to ground.
+"""
+
+import sys, os, time, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, transient, circuit, devices, options
+
+TSTOP = 8e-9
+
+def rlc_ladder(n_of_nodes):
+	circ = circuit.circuit(title="RLC ladder, %d sections" % (n_of_nodes,))
+	circ.add_vsource("V1", "n0", "0", vdc=0.0, function=devices.pulse(v1=0.0, v2=1.0, td=1e-9, \
+		tr=1e-10, pw=2e-9, tf=1e-10, per=4e-9))
+	for index in xrange(1, n_of_nodes):
+		circ.add_resistor("R%d" % index, "n%d" % (index-1), "m%d" % index, R=10.0)
+		circ.add_inductor("L%d" % index, "m%d" % index, "n%d" % index, L=1e-9)
+		circ.add_capacitor("C%d" % index, "n%d" % index, "0", C=100e-15)
+	return circ
+
+def run(circ, method, step, data_filename):
+	start = time.time()
+	res = transient.transient_analysis(circ, tstart=0, tstep=step, tstop=TSTOP, method=method, \
+		data_filename=data_filename, use_step_control=False, verbose=0)
+	elapsed = time.time() - start
+	return elapsed, numpy.array(res.values())
+
+def max_error(data, ref):
+	return max([abs(numpy.interp(data[0], ref[0], ref[k]) - data[k]).max() for k in range(1, data.shape[0])])
+
+if __name__ == '__main__':
+	n_of_nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+	options.use_sparse = len(sys.argv) > 2 and sys.argv[2] == 'sparse'
+	options.sparse_threshold = 0
+	tmpdir = tempfile.mkdtemp()
+	data_filename = os.path.join(tmpdir, "bench.tran")
+	circ = rlc_ladder(n_of_nodes)
+	steps = (1e-11, 2e-11, 5e-11, 1e-10)
+	tref, ref = run(circ, transient.TRAP, steps[0]/100, data_filename)
+	print "%d sections, reference: %d steps, %.3f s" % (n_of_nodes, ref.shape[1], tref)
+	print "%10s %10s %12s %10s %12s" % ("step [s]", "TRAP [s]", "TRAP error", "EXP [s]", "EXP error")
+	for step in steps:
+		ttrap, xtrap = run(circ, transient.TRAP, step, data_filename)
+		texp, xexp = run(circ, transient.EXPONENTIAL, step, data_filename)
+		print "%10g %10.3f %12g %10.3f %12g" % (step, ttrap, max_error(xtrap, ref), texp, max_error(xexp, ref))
+	os.remove(data_filename)
+	os.rmdir(tmpdir)
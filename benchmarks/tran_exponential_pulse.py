@@ -0,0 +1,74 @@
+# -*- coding: iso-8859-1 -*-
+# tran_exponential_pulse.py
+# Regression check: the EXPONENTIAL transient method with a pulse source
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Checks the EXPONENTIAL transient method on a series RLC driven by a
+pulse source whose corners do NOT fall on the time points: for every
+step, the largest error on the output with respect to a TRAP analysis
+with a 1ns step is compared with the one of TRAP with the same step.
+
+The steps of the EXPONENTIAL method end on the corners of the pulse
+(see transient.get_breakpoints()), so its error has to be smaller than
+TRAP's, at every step.
+
+Usage: python benchmarks/tran_exponential_pulse.py
+
+Exits with status 1 if the check fails.
+"""
+
+import sys, os, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, transient, circuit, devices
+
+TSTOP = 20e-6
+
+def rlc():
+	circ = circuit.circuit(title="Pulse driven series RLC")
+	circ.add_vsource("V1", "in", "0", vdc=0.0, function=devices.pulse(v1=0.0, v2=1.0, td=15e-9, \
+		tr=10e-9, pw=5e-6, tf=10e-9, per=20e-6))
+	circ.add_resistor("R1", "in", "n1", R=1e3)
+	circ.add_inductor("L1", "n1", "out", L=10e-6)
+	circ.add_capacitor("C1", "out", "0", C=1e-9)
+	return circ
+
+def run(circ, method, step, data_filename):
+	res = transient.transient_analysis(circ, tstart=0, tstep=step, tstop=TSTOP, method=method, \
+		data_filename=data_filename, use_step_control=False, verbose=0)
+	return numpy.array(res.values()), res.variables.index("VOUT")
+
+def out_error(data, ref, index):
+	return abs(numpy.interp(data[0], ref[0], ref[index]) - data[index]).max()
+
+if __name__ == '__main__':
+	tmpdir = tempfile.mkdtemp()
+	data_filename = os.path.join(tmpdir, "check.tran")
+	circ = rlc()
+	ref, index = run(circ, transient.TRAP, 1e-9, data_filename)
+	print "%10s %12s %12s" % ("step [s]", "TRAP error", "EXP error")
+	failed = False
+	for step in (10e-9, 50e-9, 200e-9):
+		etrap = out_error(run(circ, transient.TRAP, step, data_filename)[0], ref, index)
+		eexp = out_error(run(circ, transient.EXPONENTIAL, step, data_filename)[0], ref, index)
+		print "%10g %12g %12g" % (step, etrap, eexp)
+		failed = failed or eexp > etrap
+	os.remove(data_filename)
+	os.rmdir(tmpdir)
+	print "FAILED" if failed else "OK"
+	sys.exit(1 if failed else 0)
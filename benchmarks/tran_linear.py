@@ -0,0 +1,73 @@
+# -*- coding: iso-8859-1 -*-
+# tran_linear.py
+# Benchmark: transient analysis of a linear circuit
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Times a transient analysis of a RC ladder (an interconnect), with
+and without the linear fast path (options.transient_linear_fast_path),
+with a fixed step and with step control.
+
+Usage: python benchmarks/tran_linear.py [n_nodes1 n_nodes2 ...]
+
+The ladder is driven by a pulse source, every section is a 100 ohm
+resistor and a 10fF capacitor to ground.
+"""
+
+import sys, os, time, tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import numpy
+import dc_analysis, transient, circuit, devices, options
+
+def rc_ladder(n_of_nodes):
+	circ = circuit.circuit(title="RC ladder, %d nodes" % (n_of_nodes,))
+	circ.add_vsource("V1", "n0", "0", vdc=0.0, function=devices.pulse(v1=0.0, v2=1.0, td=1e-10, \
+		tr=1e-10, pw=2e-9, tf=1e-10, per=4e-9))
+	for index in xrange(1, n_of_nodes):
+		circ.add_resistor("R%d" % index, "n%d" % (index-1), "n%d" % index, R=100.0)
+		circ.add_capacitor("C%d" % index, "n%d" % index, "0", C=10e-15)
+	return circ
+
+def time_tran(circ, fast_path, use_step_control, data_filename):
+	options.transient_linear_fast_path = fast_path
+	start = time.time()
+	res = transient.transient_analysis(circ, tstart=0, tstep=1e-11, tstop=8e-9, method=transient.TRAP, \
+		data_filename=data_filename, use_step_control=use_step_control, verbose=0)
+	elapsed = time.time() - start
+	return elapsed, numpy.array(res.values())
+
+if __name__ == '__main__':
+	if len(sys.argv) > 1:
+		sizes = [int(arg) for arg in sys.argv[1:]]
+	else:
+		sizes = [10, 50, 200]
+	print "%8s %8s %12s %12s %8s %12s" % ("nodes", "control", "dc_solve [s]", "fast [s]", "speedup", "max |dx|")
+	tmpdir = tempfile.mkdtemp()
+	for size in sizes:
+		circ = rc_ladder(size)
+		for use_step_control in (False, True):
+			told, xold = time_tran(circ, False, use_step_control, os.path.join(tmpdir, "old.tran"))
+			tnew, xnew = time_tran(circ, True, use_step_control, os.path.join(tmpdir, "new.tran"))
+			if xold.shape == xnew.shape:
+				diff = abs(xold - xnew).max()
+			else:
+				# the step control took a different path
+				diff = float('nan')
+			print "%8d %8s %12.3f %12.3f %8.2f %12g" % (size, use_step_control, told, tnew, told/tnew, diff)
+	for filename in os.listdir(tmpdir):
+		os.remove(os.path.join(tmpdir, filename))
+	os.rmdir(tmpdir)
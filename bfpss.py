@@ -21,8 +21,8 @@
 
 import sys
 import numpy
-import transient, implicit_euler, dc_analysis, ticker, options, circuit, printing, utilities
-import results, devices
+import transient, implicit_euler, dc_analysis, ticker, options, circuit, printing, utilities, linsolve
+import results, devices, circuit_plan
 
 def bfpss(circ, period, step=None, mna=None, Tf=None, D=None, points=None, autonomous=False, x0=None,  data_filename='stdout', vector_norm=lambda v: max(abs(v)), verbose=3):
 	"""Performs a PSS analysis. 
@@ -53,7 +53,7 @@ def bfpss(circ, period, step=None, mna=None, Tf=None, D=None, points=None, auton
 	printing.print_info_line(("Method: brute-force",3), verbose)
 	
 	if mna is None or Tf is None:
-		(mna, Tf) = dc_analysis.generate_mna_and_N(circ)
+		(mna, Tf) = dc_analysis.generate_mna_and_N(circ, sparse=False)
 		mna = utilities.remove_row_and_col(mna)
 		Tf = utilities.remove_row(Tf, rrow=0)
 	elif not mna.shape[0] == Tf.shape[0]:
@@ -152,7 +152,7 @@ def bfpss(circ, period, step=None, mna=None, Tf=None, D=None, points=None, auton
 
 		J = J + CMAT
 		residuo = CMAT*x + T + Tf + Tt
-		dx = -1 * (numpy.linalg.inv(J) *  residuo)
+		dx = -1 * linsolve.solve(J, residuo)
 		#td
 		for index in xrange(points):
 			td[index, 0] = dc_analysis.get_td(dx[index*n_of_var:(index+1)*n_of_var, 0], locked_nodes, n=-1)
@@ -314,28 +314,14 @@ def build_Tf(sTf, points, tick, n_of_var, verbose=3):
 	return Tf
 	
 def build_Tt(circ, points, step, tick, n_of_var, verbose=3):
-	nv = len(circ.nodes_dict)
 	printing.print_info_line(("Building Tt...", 5), verbose, print_nl=False)
 	tick.reset()
 	tick.display(verbose > 2)	
 	Tt = numpy.zeros((points*n_of_var, 1))
+	plan = circuit_plan.get_plan(circ)
 	for index in xrange(1, points):
-		v_eq = 0
 		time = index * step
-		for elem in circ.elements:
-			if (isinstance(elem, devices.vsource) or isinstance(elem, devices.isource)) and elem.is_timedependent:
-				if isinstance(elem, devices.vsource):
-					Tt[index*n_of_var + nv - 1 + v_eq, 0] = -1.0 * elem.V(time)
-				elif isinstance(elem, devices.isource):
-					if elem.n1:
-						Tt[index*n_of_var + elem.n1-1, 0] = \
-						Tt[index*n_of_var + elem.n1-1, 0] + elem.I(time)
-					if elem.n2:
-						Tt[index*n_of_var + elem.n2-1, 0] = \
-						Tt[index*n_of_var + elem.n2-1, 0] - elem.I(time)
-			if circuit.is_elem_voltage_defined(elem):
-				v_eq = v_eq +1
-			#print Tt[index*n_of_var:(index+1)*n_of_var]
+		Tt[index*n_of_var:(index+1)*n_of_var, :] = plan.Tt(time)
 		tick.step(verbose > 2)
 	tick.hide(verbose > 2)
 	printing.print_info_line(("done.", 5), verbose)
@@ -0,0 +1,140 @@
+# -*- coding: iso-8859-1 -*-
+# binlib.py
+# Binary results files
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Binary results files, an alternative to the CSV files of csvlib.
+
+The file is made of a text header:
+
+	#ahkab binary results <version>
+	#<variable names, separated by csvlib.SEPARATOR>
+	#<units, separated by csvlib.SEPARATOR>
+	#<padding>
+
+followed by the samples, as a contiguous block of float64 values in the
+native byte order: sample after sample, every sample holding one value
+per variable. The padding aligns the block to 8 bytes.
+
+The block is accessed through numpy.memmap: loading a variable, or a
+set of adjacent variables, parses nothing and copies nothing.
+
+Functions:
+	bin_writer(filename, headers, units, buffer_rows, flush_interval)
+	load_bin(filename, load_headers=[], nsamples=None, skip=0L)
+	get_bin_headers(filename)
+	bin_to_csv(filename, csv_filename)
+"""
+
+import numpy
+import csvlib
+
+MAGIC = "#ahkab binary results"
+VERSION = 1
+
+class bin_writer(csvlib.csv_writer):
+	"""Streaming writer of binary results files, with the same interface
+	as csvlib.csv_writer.
+
+	units: a list of strings, units[i] being the unit of headers[i].
+	"""
+	def __init__(self, filename, headers, units, buffer_rows=1000, flush_interval=1.0):
+		# _open() needs the units
+		self.units = list(units)
+		csvlib.csv_writer.__init__(self, filename, headers, buffer_rows, flush_interval)
+
+	def _open(self):
+		fp = open(self.filename, "wb")
+		header = "%s %d\n#%s\n#%s\n#" % (MAGIC, VERSION, csvlib.SEPARATOR.join(self.headers), \
+			csvlib.SEPARATOR.join(self.units))
+		fp.write(header + " "*(-(len(header) + 1) % 8) + "\n")
+		return fp
+
+	def _write_block(self, block):
+		self._fp.write(numpy.ascontiguousarray(block, dtype=numpy.float64).tostring())
+
+def get_bin_headers(filename):
+	"""Reads the header of a binary results file.
+
+	Returns: (headers, units, offset), offset being the position of the
+	first sample in the file, in bytes.
+	"""
+	fp = open(filename, "rb")
+	magic = fp.readline()
+	if not magic.startswith(MAGIC):
+		fp.close()
+		raise ValueError, "%s is not a binary results file." % (filename,)
+	headers = fp.readline()[1:].rstrip("\n").split(csvlib.SEPARATOR)
+	units = fp.readline()[1:].rstrip("\n").split(csvlib.SEPARATOR)
+	fp.readline()
+	offset = fp.tell()
+	fp.close()
+	return headers, units, offset
+
+def load_bin(filename, load_headers=[], nsamples=None, skip=0L):
+	"""Reads data from a binary results file, with the same interface
+	as csvlib.load_csv().
+
+	filename: a string, the path to the file to be read
+	load_headers: a list of strings, each one being a signal
+	              to be loaded. Empty list -> read all signals
+	nsamples: int/long, number of samples to be read for each
+	          signal. If None, read all available samples.
+	skip: index of the first sample to be read. Default: 0
+
+	Returns:
+	data: numpy.matrix containing the data, data[variable, sample].
+	      A view of the file if the signals are adjacent in it (a single
+	      signal or all of them, in order).
+	headers: the names of the signals read from file,
+	pos: long, position of the last sample read +1,
+	EOF: boolean, True if the EOF was reached.
+	"""
+	headers, units, offset = get_bin_headers(filename)
+	if len(load_headers):
+		his = csvlib.get_headers_index(headers, load_headers)
+	else:
+		his = range(len(headers))
+	fp = open(filename, "rb")
+	fp.seek(0, 2)
+	size = fp.tell()
+	fp.close()
+	n_of_samples = (size - offset)/(8*len(headers))
+	stop = n_of_samples
+	if nsamples is not None:
+		stop = min(n_of_samples, skip + nsamples)
+	skip = min(skip, stop)
+	if n_of_samples == 0 or not len(his):
+		data = numpy.zeros((len(his), stop - skip))
+	else:
+		block = numpy.memmap(filename, dtype=numpy.float64, mode='r', offset=offset, \
+			shape=(n_of_samples, len(headers)))
+		if his == range(his[0], his[-1] + 1):
+			data = block[skip:stop, his[0]:his[-1] + 1].T
+		else:
+			data = block[skip:stop, his].T
+	return numpy.mat(data), map(headers.__getitem__, his), long(stop), stop == n_of_samples
+
+def bin_to_csv(filename, csv_filename):
+	"""Exports the binary results file filename to the CSV file
+	csv_filename, for compatibility with other tools.
+	"""
+	data, headers, pos, EOF = load_bin(filename)
+	writer = csvlib.csv_writer(csv_filename, headers)
+	writer.write(data)
+	writer.close()
@@ -104,6 +104,17 @@ class circuit:
 		self.elements = []
 		self.internal_nodes = 0
 		self.models = {}
+
+	def __getstate__(self):
+		"""The cached circuit_plan is not pickled (or copied): it is 
+		rebuilt when needed. The circuit is sent to the worker processes 
+		of the parallel analyses (see parallel.py).
+		"""
+		state = self.__dict__.copy()
+		for key in ('_plan', '_plan_elements', '_plan_key'):
+			if state.has_key(key):
+				del state[key]
+		return state
 	
 	def create_node(self, name):
 		"""Creates a new node, adds it to the circuit and returns it to the user
@@ -0,0 +1,317 @@
+# -*- coding: iso-8859-1 -*-
+# circuit_plan.py
+# Precompiled stamps of a circuit
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A circuit_plan holds, in array form, everything the analyses need to
+assemble their matrices from a circuit:
+ - the (row, col, value) triplets of the stamps of the linear elements,
+   both the static ones (MNA) and the reactive ones (capacitors and
+   inductors, used by D in transient and AC),
+ - the MNA index of the current of every voltage defined element,
+ - the nodes of the independent sources, by kind (DC, time dependent, AC),
+ - the port index tables of the nonlinear elements (dc_analysis.nl_table),
+   see get_nl_table().
+
+It is built walking circ.elements once, with get_plan(circ), and
+then reused by every analysis run on the same topology.
+
+All indices refer to the UNREDUCED MNA system: the ground node is row
+and column 0, the node voltages follow, then the currents in the voltage
+defined elements, in the same order as in circ.elements.
+
+The plan holds the structure only: the values of the elements (R, C,
+L, M, alpha...) are read from the elements every time mna(), 
+reactive_matrix(), N(), Nac() or Tt() are called, so that sweeping a 
+source or changing a value does not require a new plan.
+"""
+
+import sys
+import numpy
+import scipy.sparse
+
+import devices, circuit, dc_analysis, options, printing
+
+class circuit_plan:
+	def __init__(self, circ):
+		self.n_of_nodes = len(circ.nodes_dict)
+		self.vde_elements = [elem for elem in circ.elements if circuit.is_elem_voltage_defined(elem)]
+		self.n_of_vde = len(self.vde_elements)
+		self.size = self.n_of_nodes + self.n_of_vde
+		self.vde_index = {}
+		for index in xrange(self.n_of_vde):
+			elem = self.vde_elements[index]
+			self.vde_index.update({(elem.letter_id + elem.descr).upper():index})
+
+		# static stamps (MNA) and reactive stamps (D, AC): the constant 
+		# ones, (rows, cols, values) and the ones that depend on the 
+		# elements, by group (see _add_group())
+		g_rows, g_cols, g_values = [], [], []
+		self.g_groups, self.c_groups = [], []
+		resistors, capacitors, gisources, evsources, inductors, couplings = [], [], [], [], [], []
+		# independent sources
+		self.dc_isources, self.td_isources, self.ac_isources = [], [], []
+		self.dc_vsources, self.td_vsources, self.ac_vsources = [], [], []
+		dc_vrows, td_vrows, ac_vrows = [], [], []
+
+		for elem in circ.elements:
+			if elem.is_nonlinear or circuit.is_elem_voltage_defined(elem):
+				continue
+			elif isinstance(elem, devices.resistor):
+				resistors.append(elem)
+			elif isinstance(elem, devices.capacitor):
+				capacitors.append(elem)
+			elif isinstance(elem, devices.gisource):
+				gisources.append(elem)
+			elif isinstance(elem, devices.isource):
+				if elem.is_timedependent:
+					self.td_isources.append(elem)
+				else:
+					self.dc_isources.append(elem)
+				if elem.abs_ac is not None:
+					self.ac_isources.append(elem)
+			elif isinstance(elem, devices.inductor_coupling):
+				pass # taken care of within the inductors
+			else:
+				print "circuit_plan.py: BUG - Unknown linear element. Ref. #28934"
+
+		for vde_index in xrange(self.n_of_vde):
+			elem = self.vde_elements[vde_index]
+			index = self.n_of_nodes + vde_index
+			# KCL and KVL
+			g_rows += [elem.n1, elem.n2, index, index]
+			g_cols += [index, index, elem.n1, elem.n2]
+			g_values += [1.0, -1.0, 1.0, -1.0]
+			if isinstance(elem, devices.vsource):
+				if elem.is_timedependent:
+					self.td_vsources.append(elem)
+					td_vrows.append(index)
+				else:
+					self.dc_vsources.append(elem)
+					dc_vrows.append(index)
+				if elem.abs_ac is not None:
+					self.ac_vsources.append(elem)
+					ac_vrows.append(index)
+			elif isinstance(elem, devices.evsource):
+				evsources.append((elem, index))
+			elif isinstance(elem, devices.inductor):
+				# KVL: V(n1) - V(n2) - L dI/dt - M dIother/dt = 0
+				inductors.append((elem, index))
+				for cd in elem.coupling_devices:
+					other_index = self.find_vde_index(cd.get_other_inductor("L" + elem.descr))
+					couplings.append((cd, index, self.n_of_nodes + other_index))
+			elif isinstance(elem, devices.hvsource):
+				print "circuit_plan.py: BUG - hvsources are not implemented yet."
+				sys.exit(33)
+			else:
+				print "circuit_plan.py: BUG - found an unknown voltage_def elem."
+				print elem
+				sys.exit(33)
+
+		self.g_rows = numpy.array(g_rows, dtype=int)
+		self.g_cols = numpy.array(g_cols, dtype=int)
+		self.g_values = numpy.array(g_values, dtype=float)
+		# the stamp and value functions are module level: the plan is
+		# stored in the circuit, which has to stay picklable (see parallel)
+		self._add_group(self.g_groups, resistors, _two_terminal_stamp, _resistor_value, (1, -1, -1, 1))
+		self._add_group(self.g_groups, gisources, _gisource_stamp, _alpha_value, (1, -1, -1, 1))
+		self._add_group(self.g_groups, evsources, _evsource_stamp, _branch_alpha_value, (-1, 1))
+		self._add_group(self.c_groups, capacitors, _two_terminal_stamp, _capacitor_value, (1, -1, -1, 1))
+		self._add_group(self.c_groups, inductors, _inductor_stamp, _inductor_value, (-1,))
+		self._add_group(self.c_groups, couplings, _coupling_stamp, _coupling_value, (-1,))
+		self.dc_isource_nodes = self._get_nodes(self.dc_isources)
+		self.td_isource_nodes = self._get_nodes(self.td_isources)
+		self.ac_isource_nodes = self._get_nodes(self.ac_isources)
+		self.dc_vsource_rows = numpy.array(dc_vrows, dtype=int)
+		self.td_vsource_rows = numpy.array(td_vrows, dtype=int)
+		self.ac_vsource_rows = numpy.array(ac_vrows, dtype=int)
+
+		# nonlinear elements
+		self._nl_elements = circ.elements
+		self.nl_table = dc_analysis.nl_table(circ.elements)
+
+	def get_nl_table(self):
+		"""Returns: the dc_analysis.nl_table of the nonlinear elements, 
+		rebuilt if options.vectorized_devices changed.
+		"""
+		if self.nl_table.vectorized_devices != options.vectorized_devices:
+			self.nl_table = dc_analysis.nl_table(self._nl_elements)
+		return self.nl_table
+
+	def _add_group(self, groups, elements, stamp, value, pattern):
+		"""Adds to groups the stamps of elements, if any: stamp(elem) 
+		returns their (rows, cols), pattern the signs of value(elem) in
+		them. The value is read every time the matrix is assembled.
+		"""
+		if not len(elements):
+			return
+		rows, cols = zip(*[stamp(elem) for elem in elements])
+		groups.append((numpy.array(rows, dtype=int).ravel(), numpy.array(cols, dtype=int).ravel(), \
+			elements, value, numpy.array(pattern, dtype=float)))
+
+	def _group_stamps(self, groups, rows, cols, values):
+		"""Returns: the (rows, cols, values) of the constant stamps 
+		followed by those of groups, with the current values of the 
+		elements.
+		"""
+		for grows, gcols, elements, value, pattern in groups:
+			rows = numpy.concatenate((rows, grows))
+			cols = numpy.concatenate((cols, gcols))
+			values = numpy.concatenate((values, \
+				numpy.kron(numpy.array([value(elem) for elem in elements], dtype=float), pattern)))
+		return rows, cols, values
+
+	def _get_nodes(self, elements):
+		"""Returns: the nodes of the two-terminal elements, as a (n, 2) array."""
+		nodes = numpy.zeros((len(elements), 2), dtype=int)
+		for index in xrange(len(elements)):
+			nodes[index, :] = (elements[index].n1, elements[index].n2)
+		return nodes
+
+	def find_vde_index(self, id_wdescr):
+		"""Returns: the index of the current of the voltage defined
+		element id_wdescr (eg. 'V1'), among the currents in x.
+		"""
+		try:
+			return self.vde_index[id_wdescr.upper()]
+		except KeyError:
+			printing.print_warning("find_vde_index(): element %s was not found. This is a bug." % (id_wdescr,))
+			return 0
+
+	def _assemble(self, rows, cols, values, sparse):
+		# duplicate entries get summed
+		M = scipy.sparse.coo_matrix((values, (rows, cols)), shape=(self.size, self.size))
+		if sparse:
+			return M.tocsc()
+		else:
+			return numpy.mat(M.toarray())
+
+	def mna(self, sparse=False):
+		"""Returns: the UNREDUCED MNA matrix, a numpy.matrix or, if sparse
+		is set, a scipy.sparse.csc_matrix.
+		"""
+		return self._assemble(*self._group_stamps(self.g_groups, self.g_rows, self.g_cols, self.g_values), \
+			sparse=sparse)
+
+	def reactive_matrix(self, sparse=False):
+		"""Returns: the UNREDUCED matrix of the coefficients of the time
+		derivatives (capacitors, inductors and their couplings).
+		cmin is not included.
+		"""
+		empty = numpy.zeros((0,))
+		return self._assemble(*self._group_stamps(self.c_groups, empty.astype(int), empty.astype(int), empty), \
+			sparse=sparse)
+
+	def _source_vector(self, inodes, icurrents, vrows, vvoltages, dtype=float):
+		v = numpy.zeros((self.size,), dtype=dtype)
+		if len(icurrents):
+			icurrents = numpy.array(icurrents, dtype=dtype)
+			numpy.add.at(v, inodes[:, 0], icurrents)
+			numpy.add.at(v, inodes[:, 1], -icurrents)
+		if len(vvoltages):
+			v[vrows] = -1.0*numpy.array(vvoltages, dtype=dtype)
+		return numpy.mat(v).T
+
+	def N(self):
+		"""Returns: the UNREDUCED constant term of the DC sources."""
+		return self._source_vector(self.dc_isource_nodes, [elem.I() for elem in self.dc_isources], \
+			self.dc_vsource_rows, [elem.V() for elem in self.dc_vsources])
+
+	def Nac(self):
+		"""Returns: the UNREDUCED vector of the AC sources (complex)."""
+		j = numpy.complex('j')
+		return self._source_vector(self.ac_isource_nodes, \
+			[elem.abs_ac*numpy.exp(j*elem.arg_ac) for elem in self.ac_isources], \
+			self.ac_vsource_rows, [elem.abs_ac*numpy.exp(j*elem.arg_ac) for elem in self.ac_vsources], \
+			dtype=complex)
+
+	def Nac_unit(self, sources):
+		"""Returns: the UNREDUCED (size, len(sources)) matrix whose k-th 
+		column is the source vector of a unit AC excitation (1 V or 1 A,
+		zero phase) of sources[k], a vsource or isource instance.
+		"""
+		Nac = numpy.mat(numpy.zeros((self.size, len(sources)), dtype=complex))
+		for k in xrange(len(sources)):
+			elem = sources[k]
+			if isinstance(elem, devices.vsource):
+				vrows = numpy.array([self.n_of_nodes + self.find_vde_index(elem.letter_id + elem.descr)])
+				Nac[:, k] = self._source_vector(None, [], vrows, [1.0], dtype=complex)
+			else:
+				Nac[:, k] = self._source_vector(self._get_nodes([elem]), [1.0], None, [], dtype=complex)
+		return Nac
+
+	def Tt(self, time):
+		"""Returns: the REDUCED (ground row removed) contribution of the
+		time dependent sources at the time supplied.
+		"""
+		Tt = self._source_vector(self.td_isource_nodes, [elem.I(time) for elem in self.td_isources], \
+			self.td_vsource_rows, [elem.V(time) for elem in self.td_vsources])
+		return Tt[1:, :]
+
+# stamps (rows, cols) and values of the element groups, see 
+# circuit_plan._add_group(). evsources and inductors are listed as 
+# (elem, index), couplings as (coupling, index, other_index), index being 
+# the row of the current in the voltage defined element.
+def _two_terminal_stamp(elem):
+	return (elem.n1, elem.n1, elem.n2, elem.n2), (elem.n1, elem.n2, elem.n1, elem.n2)
+
+def _gisource_stamp(elem):
+	return (elem.n1, elem.n1, elem.n2, elem.n2), (elem.sn1, elem.sn2, elem.sn1, elem.sn2)
+
+def _evsource_stamp((elem, index)):
+	return (index, index), (elem.sn1, elem.sn2)
+
+def _inductor_stamp((elem, index)):
+	return (index,), (index,)
+
+def _coupling_stamp((cd, index, other_index)):
+	return (index,), (other_index,)
+
+def _resistor_value(elem):
+	return 1.0/elem.R
+
+def _capacitor_value(elem):
+	return elem.C
+
+def _alpha_value(elem):
+	return elem.alpha
+
+def _branch_alpha_value((elem, index)):
+	return elem.alpha
+
+def _inductor_value((elem, index)):
+	return elem.L
+
+def _coupling_value((cd, index, other_index)):
+	return cd.M
+
+def get_plan(circ):
+	"""Returns the circuit_plan of circ, building it only if the circuit
+	topology changed since the last call.
+
+	The plan is stored in the circuit instance. The circuit methods
+	never modify the element list in place when an element is added,
+	so the identity of the list, its length and the number of nodes
+	are enough to tell a new topology.
+	"""
+	if getattr(circ, '_plan', None) is None or circ._plan_elements is not circ.elements or \
+		circ._plan_key != (len(circ.elements), len(circ.nodes_dict)):
+		circ._plan = circuit_plan(circ)
+		circ._plan_elements = circ.elements
+		circ._plan_key = (len(circ.elements), len(circ.nodes_dict))
+	return circ._plan
@@ -5,6 +5,7 @@ Functions:
 
 1. CSV write/load:
 	write_csv(filename, data, headers, append=False)
+	csv_writer(filename, headers, buffer_rows, flush_interval)
 	load_csv(filename, load_headers=[], nsamples=None, skip=0L)
 
 2. MISC utilities
@@ -15,14 +16,22 @@ Functions:
 3. Internal routines
 	_get_fp(filename, mode='r')
 	_close_fp(fp, filename)
+	_parse_block(block, n_of_columns)
+	_find_sample(filename, fp, data_offset, index)
 
 """
 
-import sys, copy
+import sys, os, copy, time, warnings
 import numpy
-import netlist_parser
 
 SEPARATOR = "\t"
+# load_csv() reads the files in blocks of this size
+READ_BLOCK_BYTES = 4*2**20
+# the index used to skip to a sample holds the position of one sample 
+# every INDEX_STEP, it is saved to a file named as the CSV file plus
+# INDEX_SUFFIX
+INDEX_STEP = 1000
+INDEX_SUFFIX = ".idx"
 
 def write_csv(filename, data, headers, append=False):
 	"""Writes data in CVS format to filename.
@@ -87,6 +96,84 @@ def write_headers(filename, headers):
 			fp.write("\n")
 
 
+class csv_writer:
+	"""Streaming CSV writer: the lines are stored in a preallocated block
+	and written to filename in bulk, through a file that is kept open.
+
+	filename: the path to the file to be written, or 'stdout'.
+	headers: a list of strings, the signal names.
+	buffer_rows: the block is written when it holds this many lines...
+	flush_interval: ...or when this many seconds passed since the last
+	write, whichever comes first.
+
+	The file is created (and the headers written) right away. The output
+	is the same as that of write_csv().
+	"""
+	def __init__(self, filename, headers, buffer_rows=1000, flush_interval=1.0):
+		self.filename = filename
+		self.headers = copy.copy(headers)
+		self.buffer_rows = max(1, int(buffer_rows))
+		self.flush_interval = flush_interval
+		self._block = numpy.empty((self.buffer_rows, len(headers)))
+		self._rows = 0
+		self._line_format = SEPARATOR.join(["%g"]*len(headers)) + "\n"
+		self._fp = self._open()
+		self._closed = False
+		self._last_flush = time.time()
+
+	def write(self, data):
+		"""Adds data to the file, data being arranged as in write_csv():
+		data[variable_index, sample_number]
+		"""
+		data = numpy.asarray(data)
+		if not data.shape[0] == len(self.headers):
+			print "(W): csv_writer.write(): data and headers don't match. Continuing anyway."
+			print "DATA: " + str(data.shape) + " headers length: "+str(len(self.headers))
+		for j in range(data.shape[1]):
+			self._block[self._rows, :] = data[:, j]
+			self._rows = self._rows + 1
+			if self._rows == self.buffer_rows:
+				self.flush()
+		if self._rows and time.time() - self._last_flush > self.flush_interval:
+			self.flush()
+
+	def flush(self):
+		"""Writes the lines held in the block to the file."""
+		if self._closed:
+			return
+		if self._rows:
+			self._write_block(self._block[:self._rows, :])
+			self._rows = 0
+		try:
+			self._fp.flush()
+		except IOError:
+			pass
+		self._last_flush = time.time()
+
+	def close(self):
+		"""Flushes the block and closes the file. Nothing can be written
+		afterwards."""
+		if self._closed:
+			return
+		self.flush()
+		_close_fp(self._fp, self.filename)
+		self._fp = None
+		self._closed = True
+
+	def _open(self):
+		"""Creates the file and writes the headers.
+		Returns: the file object."""
+		fp = _get_fp(self.filename, mode="w")
+		headers = copy.copy(self.headers)
+		if not headers[0][0] == '#':
+			headers[0] = '#'+headers[0]
+		fp.write(SEPARATOR.join(headers) + "\n")
+		return fp
+
+	def _write_block(self, block):
+		"""Writes block[sample_number, variable_index] to the file."""
+		self._fp.write((self._line_format*block.shape[0]) % tuple(block.ravel()))
+
 def _get_fp(filename, mode="r"):
 	if filename == 'stdout':
 		if mode == 'w' or mode == 'a':
@@ -157,6 +244,12 @@ def load_csv(filename, load_headers=[], nsamples=None, skip=0L):
 
 	to allow incremental reading of big files.
 
+	The file is read in blocks of READ_BLOCK_BYTES, each of them parsed at
+	once. When skip is set, the samples before it are not parsed: the
+	position of every INDEX_STEP-th sample is looked up in an index kept
+	in filename + INDEX_SUFFIX, that is (re)built when missing or older
+	than the file.
+
 	filename: a string, the path to the file to be read
 	load_headers: a list of strings, each one being a signal
 	              to be loaded. Empty string -> read all signals
@@ -178,55 +271,149 @@ def load_csv(filename, load_headers=[], nsamples=None, skip=0L):
 
 	fp = _get_fp(filename, mode="r")
 	headers = None
-	data = None
-	sample_index = 0L
-	line_index = 0
-	EOF = False
-
-	for line in fp:#.readlines():
+	while headers is None:
+		line = fp.readline()
+		if line == '':
+			_close_fp(fp, filename)
+			return numpy.mat(numpy.zeros((0, 0))), [], long(skip), True
 		line = line.strip()
 		if line == '':
 			continue
-		if line[0] == '#' and headers is None:
+		if line[0] == '#':
 			line = line[1:]
-		if line[0] == '#' and headers is not None:
-			continue #comment
-		if headers is None:		
-			headers = line.split(SEPARATOR)
-			if len(load_headers):
-				his = get_headers_index(headers, load_headers)
-			else:
-				his = range(len(headers))
-		else:
-			line_index = line_index + 1
-			if line_index < skip:
-				continue
-			if data is None:
-				data = numpy.zeros((len(his), 1))
-			else:
-				data = numpy.concatenate((data, numpy.zeros((len(his), 1))), axis=1)
-			data_values = line.split(SEPARATOR)
-			for i in range(len(data_values)):
-				if his.count(i) > 0:
-					data[his.index(i),-1] = parse_value(data_values[i])
-				else:
-					pass
-			sample_index = sample_index + 1
-			if nsamples is not None and sample_index == nsamples:
-				break
+		headers = line.split(SEPARATOR)
+	if len(load_headers):
+		his = get_headers_index(headers, load_headers)
+	else:
+		his = range(len(headers))
+
+	to_skip = skip
+	if skip:
+		offset, to_skip = _find_sample(filename, fp, fp.tell(), skip)
+		fp.seek(offset)
+
+	chunks = []
+	sample_index = 0L
+	EOF = True
+	while nsamples is None or sample_index < nsamples:
+		block = fp.read(READ_BLOCK_BYTES)
+		if block == '':
+			break
+		if not block.endswith("\n"):
+			block = block + fp.readline()
+		rows = _parse_block(block, len(headers))
+		if to_skip:
+			dropped = min(to_skip, rows.shape[0])
+			rows = rows[dropped:, :]
+			to_skip = to_skip - dropped
+		if nsamples is not None and sample_index + rows.shape[0] >= nsamples:
+			taken = nsamples - sample_index
+			EOF = rows.shape[0] == taken and fp.read(1) == ''
+			rows = rows[:taken, :]
+		chunks.append(rows[:, his])
+		sample_index = sample_index + rows.shape[0]
 	_close_fp(fp, filename)
 
-	if data is None or line == '' or nsamples > sample_index:
-		EOF = True
+	if len(chunks):
+		data = numpy.concatenate(chunks, axis=0).T
 	else:
-		EOF = False
-
+		data = numpy.zeros((len(his), 0))
 	pos = skip + sample_index
 
 	headers = map(headers.__getitem__, his)
 
 	return numpy.mat(data), headers, pos, EOF
 
+def _parse_block(block, n_of_columns):
+	"""Parses the lines in block, skipping comments and empty lines.
+	The values are all converted at once, falling back to parse_value() 
+	(one value at a time) only if that fails, eg. because of SPICE units.
+
+	Returns: a (n_of_lines, n_of_columns) array.
+	"""
+	if '#' in block or "\n\n" in block or block.startswith("\n"):
+		block = "\n".join([line for line in block.split("\n") if line.strip() != '' and \
+			line.strip()[0] != '#'])
+	n_of_lines = block.count("\n") + (not block.endswith("\n") and block.strip() != '')
+	with warnings.catch_warnings():
+		# a parse error ends the conversion early, with a warning
+		warnings.simplefilter("ignore")
+		values = numpy.fromstring(block, sep=" ")
+	if values.shape[0] != n_of_lines*n_of_columns:
+		values = numpy.zeros((n_of_lines, n_of_columns))
+		for i, line in enumerate([line for line in block.split("\n") if line.strip() != '']):
+			data_values = line.strip().split(SEPARATOR)[:n_of_columns]
+			values[i, :len(data_values)] = map(parse_value, data_values)
+	return values.reshape((n_of_lines, n_of_columns))
+
+def _find_sample(filename, fp, data_offset, index):
+	"""Looks up the position of the sample index in the index file,
+	rebuilding it if needed.
+
+	data_offset: the position of the first line after the headers.
+
+	Returns: (offset, n), the sample index is the n-th sample found 
+	reading from offset.
+	"""
+	offsets = _load_index(filename)
+	if offsets is None:
+		offsets = _build_index(filename, fp, data_offset)
+	i = min(index/INDEX_STEP, offsets.shape[0] - 1)
+	return long(offsets[i]), index - i*INDEX_STEP
+
+def _load_index(filename):
+	"""Returns: the offsets of every INDEX_STEP-th sample, as stored in 
+	the index file, or None if it doesn't exist or it is out of date.
+	"""
+	try:
+		index = numpy.load(filename + INDEX_SUFFIX)
+	except (IOError, ValueError):
+		return None
+	stat = os.stat(filename)
+	if index.shape[0] < 3 or index[0] != stat.st_size or index[1] != long(stat.st_mtime*1e6) \
+		or index[2] != INDEX_STEP:
+		return None
+	return index[3:]
+
+def _build_index(filename, fp, data_offset):
+	"""Finds the offsets of every INDEX_STEP-th sample scanning the file
+	for line breaks, without parsing it, and saves them in the index
+	file.
+
+	Returns: the offsets.
+	"""
+	offsets = []
+	n_of_samples = 0
+	position = data_offset
+	fp.seek(data_offset)
+	while True:
+		block = fp.read(READ_BLOCK_BYTES)
+		if block == '':
+			break
+		if not block.endswith("\n"):
+			block = block + fp.readline()
+		chars = numpy.frombuffer(block, dtype=numpy.uint8)
+		starts = numpy.concatenate(([0], numpy.flatnonzero(chars == ord("\n"))[:-1] + 1))
+		# samples: the lines that are neither empty nor comments
+		starts = starts[(chars[starts] != ord("\n")) & (chars[starts] != ord("#"))]
+		first = -n_of_samples % INDEX_STEP
+		offsets.extend(position + starts[first::INDEX_STEP])
+		n_of_samples = n_of_samples + starts.shape[0]
+		position = position + len(block)
+	if not len(offsets):
+		offsets = [data_offset]
+	offsets = numpy.array(offsets, dtype=numpy.int64)
+	if n_of_samples > INDEX_STEP:
+		stat = os.stat(filename)
+		index = numpy.concatenate(([stat.st_size, long(stat.st_mtime*1e6), INDEX_STEP], offsets))
+		try:
+			fp_index = open(filename + INDEX_SUFFIX, "wb")
+			numpy.save(fp_index, index.astype(numpy.int64))
+			fp_index.close()
+		except IOError:
+			pass
+	return offsets
+
 def parse_value(astring):
 	try:
 		afloat = float(astring)
@@ -234,6 +421,8 @@ def parse_value(astring):
 	except ValueError:
 		success = False
 	if not success:
+		# imported here: netlist_parser (indirectly) imports this module
+		import netlist_parser
 		try:
 			afloat = netlist_parser.convert_units(astring)
 			success = True
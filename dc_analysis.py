@@ -29,13 +29,15 @@ The actual solution is done by mdn_solver, that uses a modified
 version of the Newton Rhapson method.
 """
 
-import sys
+import sys, itertools
 import numpy, numpy.linalg
-import constants, ticker, options, circuit, devices, printing, utilities, dc_guess, results
+import scipy.sparse
+import constants, ticker, options, circuit, devices, printing, utilities, dc_guess, results, linsolve
+import circuit_plan, parallel
 
 
 
-def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=None, locked_nodes=None, skip_Tt=False, verbose=3):
+def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=None, locked_nodes=None, skip_Tt=False, lu=None, verbose=3):
 	"""Tries to perform a DC analysis of the circuit. 
 	The system we want to solve is:
 	(mna+Gmin)*x + N + T(x) = 0
@@ -59,6 +61,9 @@ def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=No
 	However, if you are doing lots of simulations of the same circuit (a transient analysis), it's
 	a good idea to generate it only once.
 
+	lu: an optional linsolve.lu_cache instance, owned by the calling analysis, 
+	to be passed to mdn_solver.
+
 	Returns:
 	(x, error, converged, tot_iterations)
 	"""
@@ -77,22 +82,9 @@ def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=No
 		Ntran = 0
 
 	#time variable component: Tt this is always the same in each iter. So we build it once for all.
-	Tt = numpy.mat(numpy.zeros((mna_size, 1)))
-	v_eq = 0
 	if not skip_Tt:
-		for elem in circ.elements:
-			if (isinstance(elem, devices.vsource) or isinstance(elem, devices.isource)) and elem.is_timedependent:
-				if isinstance(elem, devices.vsource):
-					Tt[nv - 1 + v_eq, 0] = -1 * elem.V(time)
-				elif isinstance(elem, devices.isource):
-					if elem.n1:
-						Tt[elem.n1 - 1, 0] = Tt[elem.n1 - 1, 0] + elem.I(time)
-					if elem.n2:
-						Tt[elem.n2 - 1, 0] = Tt[elem.n2 - 1, 0] - elem.I(time)
-			if circuit.is_elem_voltage_defined(elem):
-				v_eq = v_eq + 1
-	#update N to include the time variable sources
-	Ndc = Ndc + Tt
+		#update N to include the time variable sources
+		Ndc = Ndc + circuit_plan.get_plan(circ).Tt(time)
 
 	#initial guess, if specified, otherwise it's zero
 	if x0 is not None:
@@ -118,7 +110,8 @@ def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=No
 		elif gmin_stepping["enabled"]:
 			#print "gmin index:", str(gmin_stepping["index"])+", gmin:", str( 10**(gmin_stepping["factors"][gmin_stepping["index"]]))
 			printing.print_info_line(("Setting Gmin to: "+str(10**gmin_stepping["factors"][gmin_stepping["index"]]), 6), verbose)
-			mna_to_pass = build_gmin_matrix(circ, 10**(gmin_stepping["factors"][gmin_stepping["index"]]), mna_size, verbose) + mna
+			mna_to_pass = build_gmin_matrix(circ, 10**(gmin_stepping["factors"][gmin_stepping["index"]]), mna_size, verbose, \
+				sparse=scipy.sparse.issparse(mna)) + mna
 			N_to_pass = Ndc + Ntran*(Ntran is not None)
 		elif source_stepping["enabled"]:
 			printing.print_info_line(("Setting sources to "+ str(source_stepping["factors"][source_stepping["index"]]*100)+ "% of their actual value", 6), verbose)
@@ -126,7 +119,7 @@ def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=No
 			N_to_pass = source_stepping["factors"][source_stepping["index"]]*Ndc+Ntran*(Ntran is not None)
 		try:
 			(x, error, converged, n_iter, convergence_by_node) = mdn_solver(x, mna_to_pass, circ, T=N_to_pass, \
-			 nv=nv, print_steps=(verbose > 0), locked_nodes=locked_nodes, time=time, MAXIT=MAXIT, debug=(verbose==6))
+			 nv=nv, print_steps=(verbose > 0), locked_nodes=locked_nodes, time=time, MAXIT=MAXIT, lu=lu, debug=(verbose==6))
 			tot_iterations += n_iter
 		except numpy.linalg.linalg.LinAlgError:
 			n_iter = 0
@@ -138,6 +131,12 @@ def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=No
 			converged = False
 			print "failed."
 			printing.print_general_error("Overflow")
+		except FloatingPointError, e:
+			# a device model computed a NaN
+			n_iter = 0
+			converged = False
+			print "failed."
+			printing.print_general_error(str(e))
 	
 		if not converged:
 			if verbose == 6:
@@ -168,8 +167,19 @@ def dc_solve(mna, Ndc, circ, Ntran=None, Gmin=None, x0=None, time=None, MAXIT=No
 				printing.print_info_line((" done.", 3), verbose)
 	return (x, error, converged, tot_iterations)
 
-def build_gmin_matrix(circ, gmin, mna_size, verbose):
+def build_gmin_matrix(circ, gmin, mna_size, verbose, sparse=None):
+	"""Builds the (reduced) Gmin matrix.
+	If sparse is None, the matrix type is selected according to 
+	utilities.use_sparse(), otherwise a scipy.sparse matrix is 
+	returned if sparse is True, a numpy.matrix if it's False.
+	"""
 	printing.print_info_line(("Building Gmin matrix...", 5), verbose)
+	if sparse is None:
+		sparse = utilities.use_sparse(mna_size)
+	if sparse:
+		diag = numpy.zeros((mna_size,))
+		diag[:len(circ.nodes_dict)-1] = gmin
+		return scipy.sparse.spdiags(diag, 0, mna_size, mna_size, format='csc')
 	Gmin_matrix = numpy.mat(numpy.zeros((mna_size, mna_size)))
 	for index in xrange(len(circ.nodes_dict)-1):
 		Gmin_matrix[index, index] = gmin
@@ -217,7 +227,7 @@ def get_solve_methods():
 	source_stepping = {"enabled":False,"failed":False,"factors":(0.001,.005,.01,.03,.1,.3,.5,.7,.8,.9), "index":0}
 	return standard_solving, gmin_stepping, source_stepping
 
-def dc_analysis(circ, start, stop, step, type_descr, xguess=None, data_filename="stdout", print_int_nodes=True, guess=True, stype="LINEAR", verbose=2):
+def dc_analysis(circ, start, stop, step, type_descr, xguess=None, data_filename="stdout", print_int_nodes=True, guess=True, stype="LINEAR", workers=None, verbose=2):
 	"""Performs a sweep of the value of V or I of a independent source from start 
 	value to stop value using the provided step. 
 	For every circuit generated, computes the op and prints it out.
@@ -232,6 +242,8 @@ def dc_analysis(circ, start, stop, step, type_descr, xguess=None, data_filename=
 	data_filename: string, filename of the output file. If set to stdout, prints to screen
 	print_int_nodes: do it
 	guess: op_analysis will guess to start the first NR iteration for the first point, the previsious dc is used from then on
+	workers: number of worker processes the sweep is split among (see 
+	         options.dc_sweep_workers, which is used if workers is None)
 	verbose: verbosity level
 	
 	Returns:
@@ -287,11 +299,10 @@ def dc_analysis(circ, start, stop, step, type_descr, xguess=None, data_filename=
 	else:
 		initial_value = source_elem.idc
 
-	# The initial value is set to None and this IS CORRECT. 
-	# op_analysis will attempt to do a smart guess, if called with x0 = None and guess=True
-	# For each iteration over the source voltage (current) value, the last result is used as x0.
-	# op_analysis will not attempt to guess the op if x0 is not None
-	x = None
+	sweep_values = list(dc_iter)
+	if workers is None:
+		workers = options.dc_sweep_workers
+	workers = min(parallel.get_n_of_workers(workers), len(sweep_values))
 	
 	sol = results.dc_solution(circ, start, stop, sweepvar=sweep_label, stype=stype, outfile=data_filename)
 	
@@ -300,33 +311,38 @@ def dc_analysis(circ, start, stop, step, type_descr, xguess=None, data_filename=
 	tick.display(verbose>2)
 
 	#sweep setup
-	
-	#tarocca il generatore di tensione, avvia DC silenziosa, ritarocca etc
+	if workers > 1:
+		# every worker solves a contiguous chunk of the sweep on its own
+		# copy of the circuit, the chunks come back in sweep order.
+		# The copies are sent without the circuit_plan (see 
+		# circuit.__getstate__()), every worker builds its own
+		source_index = [id(elem) for elem in circ.elements].index(id(source_elem))
+		jobs = [(circ, source_index, chunk, guess) for chunk in parallel.split(sweep_values, workers)]
+		points = itertools.chain.from_iterable(parallel.imap(_dc_sweep_chunk, jobs, workers))
+		printing.print_info_line(("(%d workers) " % (workers,), 3), verbose, print_nl=False)
+	else:
+		points = _dc_sweep(circ, source_elem, sweep_values, guess)
+
+	solved = False
 	index = 0
-	for sweep_value in dc_iter:
-		index = index + 1
-		if isinstance(source_elem, devices.vsource):
-			source_elem.vdc = sweep_value
-		else:
-			source_elem.idc = sweep_value
-		#silently calculate the op
-		op = op_analysis(circ, x0=x, guess=guess, verbose=0)
-		if op is None:
-			tick.hide(verbose>2)
-			if not options.dc_sweep_skip_allowed:
-				print "Could't solve the circuit for sweep value:", start + index*step
-				solved = False
-				break
-			else:
-				print "Skipping sweep value:", start + index*step
-				continue
-		solved = True
-		sol.add_op(sweep_value, op)
+	try:
+		for sweep_value, op in points:
+			index = index + 1
+			if op is None:
+				tick.hide(verbose>2)
+				if not options.dc_sweep_skip_allowed:
+					print "Could't solve the circuit for sweep value:", start + index*step
+					solved = False
+					break
+				else:
+					print "Skipping sweep value:", start + index*step
+					continue
+			solved = True
+			sol.add_op(sweep_value, op)
 		
-		if guess:
-			guess = False
-
-		tick.step(verbose>2)
+			tick.step(verbose>2)
+	finally:
+		sol.lock()
 	
 	tick.hide(verbose>2)
 	if solved:
@@ -340,11 +356,50 @@ def dc_analysis(circ, start, stop, step, type_descr, xguess=None, data_filename=
 
 	return sol if solved else None
 
-def op_analysis(circ, x0=None, guess=True, data_filename=None, verbose=3):
+def _dc_sweep(circ, source_elem, sweep_values, guess):
+	"""Sets the source to every value in sweep_values in turn and solves
+	the circuit. 
+
+	The first point is solved from scratch (guessing if guess is set),
+	every other one starts from the solution of the previous point.
+
+	Yields: (sweep_value, op), op being None if the point couldn't be 
+	solved. If dc_sweep_skip_allowed is not set, the sweep stops at the
+	first point that couldn't be solved.
+	"""
+	x = None
+	lu = linsolve.lu_cache()
+	for sweep_value in sweep_values:
+		if isinstance(source_elem, devices.vsource):
+			source_elem.vdc = sweep_value
+		else:
+			source_elem.idc = sweep_value
+		#silently calculate the op
+		op = op_analysis(circ, x0=x, guess=guess, lu=lu, verbose=0)
+		yield sweep_value, op
+		if op is None:
+			if not options.dc_sweep_skip_allowed:
+				break
+			continue
+		x = op
+		guess = False
+
+def _dc_sweep_chunk(args):
+	"""Worker process job: solves a chunk of a DC sweep.
+	args: (circ, source_index, sweep_values, guess), source_index being the 
+	index of the swept source in circ.elements.
+
+	Returns: a list of (sweep_value, op) tuples, see _dc_sweep().
+	"""
+	circ, source_index, sweep_values, guess = args
+	return list(_dc_sweep(circ, circ.elements[source_index], sweep_values, guess))
+
+def op_analysis(circ, x0=None, guess=True, data_filename=None, lu=None, verbose=3):
 	"""Runs an Operating Point (OP) analysis
 	circ: the circuit instance on which the simulation is run
 	x0: is the initial guess to be used to start the NR mdn_solver
 	guess: if set to True and x0 is None, it will generate a 'smart' guess
+	lu: the linsolve.lu_cache to be used, if None a new one is created
 	verbose: verbosity level from 0 (silent) to 6 (debug).
 
 	Returns a Operation Point result, if successful, None otherwise.
@@ -371,15 +426,17 @@ def op_analysis(circ, x0=None, guess=True, data_filename=None, verbose=3):
 	# if x0 is not None, use that
 	
 	printing.print_info_line(("Solving with Gmin:", 4), verbose)
-	Gmin_matrix = build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose-2)
-	(x1, error1, solved1, n_iter1) = dc_solve(mna, N, circ, Gmin=Gmin_matrix, x0=x0, verbose=verbose)
+	Gmin_matrix = build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose-2, sparse=scipy.sparse.issparse(mna))
+	if lu is None:
+		lu = linsolve.lu_cache()
+	(x1, error1, solved1, n_iter1) = dc_solve(mna, N, circ, Gmin=Gmin_matrix, x0=x0, lu=lu, verbose=verbose)
 	
 	# We'll check the results now. Recalculate them without Gmin (using previsious solution as initial guess)
 	# and check that differences on nodes and current do not exceed the tolerances.
 	if solved1:
 		op1 = results.op_solution(x1, error1, circ, outfile=data_filename, iterations=n_iter1)
 		printing.print_info_line(("Solving without Gmin:", 4), verbose)
-		(x2, error2, solved2, n_iter2) = dc_solve(mna, N, circ, Gmin=None, x0=x1, verbose=verbose)
+		(x2, error2, solved2, n_iter2) = dc_solve(mna, N, circ, Gmin=None, x0=x1, lu=lu, verbose=verbose)
 		
 		if not solved2:
 			printing.print_general_error("Can't solve without Gmin.")
@@ -406,6 +463,7 @@ def op_analysis(circ, x0=None, guess=True, data_filename=None, verbose=3):
 	else:
 		printing.print_general_error("Couldn't solve the circuit. Giving up.")
 		opsolution = None
+	printing.print_info_line(("LU: %s" % (str(lu),), 5), verbose)
 
 	return opsolution
 
@@ -466,7 +524,7 @@ def print_elements_ops(circ, x):
 	return None
 
 
-def mdn_solver(x, mna, circ, T, MAXIT, nv, locked_nodes, time=None, print_steps=False, vector_norm=lambda v: max(abs(v)), debug=True):
+def mdn_solver(x, mna, circ, T, MAXIT, nv, locked_nodes, time=None, print_steps=False, vector_norm=lambda v: max(abs(v)), lu=None, debug=True):
 	"""
 	Solves a problem like F(x) = 0 using the Newton Algorithm with a variable damping td.
 	
@@ -503,6 +561,8 @@ def mdn_solver(x, mna, circ, T, MAXIT, nv, locked_nodes, time=None, print_steps=
 	time: the value of time to be passed to non_linear _and_ time variant elements.
 	print_steps: show a progress indicator
 	vector_norm:
+	lu: a linsolve.lu_cache instance, to reuse the factorizations of J. If None,
+	a new one is used for this call only.
 	
 	Returns a tuple with:
 	the solution, 
@@ -520,9 +580,12 @@ def mdn_solver(x, mna, circ, T, MAXIT, nv, locked_nodes, time=None, print_steps=
 	#print_steps = False
 	#locked_nodes = get_locked_nodes(element_list)
 	mna_size = mna.shape[0]
+	sparse = scipy.sparse.issparse(mna)
 	nonlinear_circuit = circ.is_nonlinear()
 	tick = ticker.ticker(increments_for_step=1)
 	tick.display(print_steps)
+	if lu is None:
+		lu = linsolve.lu_cache()
 	if x is None:
 		x = numpy.mat(numpy.zeros((mna_size, 1))) # if no guess was specified, its all zeros
 	else:
@@ -538,13 +601,14 @@ def mdn_solver(x, mna, circ, T, MAXIT, nv, locked_nodes, time=None, print_steps=
 		tick.step(print_steps)
 		if nonlinear_circuit:
 		# build dT(x)/dx (stored in J) and Tx(x)
-			J, Tx = build_J_and_Tx(x, mna_size, circ.elements, time)
+			J, Tx = build_J_and_Tx(x, mna_size, circ.elements, time, sparse=sparse, \
+				table=circuit_plan.get_plan(circ).get_nl_table())
 			J = J + mna
 		else:
 			J = mna
 			Tx = 0
 		residuo = mna*x + T + Tx
-		dx = numpy.linalg.inv(J) * (-1 * residuo)
+		dx = lu.solve(J, -1 * residuo)
 		x = x + get_td(dx, locked_nodes, n=iteration)*dx
 		if iteration > 0: 
 			if convergence_check(x, dx, residuo, nv-1)[0]:
@@ -559,19 +623,160 @@ def mdn_solver(x, mna, circ, T, MAXIT, nv, locked_nodes, time=None, print_steps=
 		convergence_by_node = []
 	return (x, residuo, converged, iteration+1, convergence_by_node)
 
-def build_J_and_Tx(x, mna_size, element_list, time):
-	J = numpy.mat(numpy.zeros((mna_size, mna_size)))
+def build_J_and_Tx(x, mna_size, element_list, time, sparse=False, table=None):
+	"""Builds the jacobian of the nonlinear elements, J, and their 
+	contribution to KCL, Tx, at x.
+
+	Nonlinear elements that support it are evaluated in batches (see 
+	nl_table), the others one at a time through update_J_and_Tx().
+	table: the nl_table of element_list, usually the one of the 
+	circuit_plan. If not supplied, it is built.
+	"""
+	if table is None:
+		table = nl_table(element_list)
+	if sparse and table.scalar_elements:
+		J = scipy.sparse.lil_matrix((mna_size, mna_size))
+	elif sparse:
+		J = scipy.sparse.csc_matrix((mna_size, mna_size))
+	else:
+		J = numpy.mat(numpy.zeros((mna_size, mna_size)))
 	Tx = numpy.mat(numpy.zeros((mna_size, 1)))
-	for elem in element_list:
-		if elem.is_nonlinear:
-			update_J_and_Tx(J, Tx, x, elem, time)
+	for elem in table.scalar_elements:
+		update_J_and_Tx(J, Tx, x, elem, time)
+	if sparse:
+		J = J.tocsc()
+	for group in table.groups:
+		J = group.update_J_and_Tx(J, Tx, x, time)
 	return J, Tx
 
+class nl_table:
+	"""Index table of the nonlinear elements in a list.
+
+	Elements providing get_vec_model() and get_vec_params() are grouped by 
+	class and model, every group is evaluated with a single call to the 
+	model's get_i_and_g_vec() method (see nl_group). 
+	Every other nonlinear element (eg. user defined modules) is listed in 
+	scalar_elements and has to go through elem.i() and elem.g().
+
+	The table is built according to options.vectorized_devices, which is 
+	stored in the attribute of the same name.
+	"""
+	def __init__(self, element_list):
+		self.vectorized_devices = options.vectorized_devices
+		self.groups = []
+		self.scalar_elements = []
+		group_keys = []
+		group_elements = {}
+		for elem in element_list:
+			if not elem.is_nonlinear:
+				continue
+			if options.vectorized_devices and hasattr(elem, "get_vec_model") and \
+				len(elem.get_output_ports()) == 1:
+				vec_model = elem.get_vec_model()
+			else:
+				vec_model = None
+			if vec_model is None:
+				self.scalar_elements.append(elem)
+				continue
+			key = (elem.__class__, id(vec_model))
+			if not group_elements.has_key(key):
+				group_keys.append(key)
+				group_elements.update({key:[]})
+			group_elements[key].append(elem)
+		for key in group_keys:
+			self.groups.append(nl_group(group_elements[key]))
+
+class nl_group:
+	"""A group of nonlinear elements of the same class, sharing a model 
+	that can evaluate all of them in one go.
+
+	The elements must have a single output port. 
+	The node arrays of the ports and the positions of the stamps in J and 
+	Tx are computed once, at every evaluation we gather the device 
+	parameters and the port voltages, call the model and scatter-add the
+	results.
+
+	The device parameters are read from the elements when the group is
+	built, and again only after devices.params_changed() is called. The
+	ones listed in the vec_state_params attribute of the model, if any, 
+	are updated by the model itself: they are read only once.
+	"""
+	def __init__(self, elements):
+		self.elements = elements
+		self.model = elements[0].get_vec_model()
+		self._state_keys = getattr(self.model, "vec_state_params", ())
+		self.params = {}
+		self._update_params()
+		out_nodes = numpy.array([elem.get_output_ports()[0] for elem in elements], dtype=int)
+		self.drive_nodes = numpy.array([elem.get_drive_ports(0) for elem in elements], dtype=int)
+		n_of_dports = self.drive_nodes.shape[1]
+		# Tx: +i on n1, -i on n2. The 0 row (ground) is not there.
+		tx_rows = numpy.concatenate((out_nodes[:, 0], out_nodes[:, 1]))
+		self._tx_mask = tx_rows != 0
+		self._tx_rows = tx_rows[self._tx_mask] - 1
+		# J: +g on (n1, dn1), -g on (n1, dn2), -g on (n2, dn1), +g on (n2, dn2)
+		# for each drive port
+		n1 = numpy.repeat(out_nodes[:, 0:1], n_of_dports, axis=1)
+		n2 = numpy.repeat(out_nodes[:, 1:2], n_of_dports, axis=1)
+		dn1 = self.drive_nodes[:, :, 0]
+		dn2 = self.drive_nodes[:, :, 1]
+		rows = numpy.concatenate((n1.ravel(), n1.ravel(), n2.ravel(), n2.ravel()))
+		cols = numpy.concatenate((dn1.ravel(), dn2.ravel(), dn1.ravel(), dn2.ravel()))
+		self._j_mask = numpy.logical_and(rows != 0, cols != 0)
+		self._j_rows = rows[self._j_mask] - 1
+		self._j_cols = cols[self._j_mask] - 1
+		self._j_flat = None
+
+	def _update_params(self):
+		"""Reads the device parameters from the elements."""
+		self._params_generation = devices.get_params_generation()
+		params_list = [elem.get_vec_params() for elem in self.elements]
+		for key in params_list[0].iterkeys():
+			if key in self._state_keys and self.params.has_key(key):
+				continue
+			self.params.update({key:numpy.array([params[key] for params in params_list])})
+
+	def update_J_and_Tx(self, J, Tx, x, time):
+		"""Adds the contributions of the group to J and Tx.
+		Tx is modified in place. J is modified in place if it's dense, 
+		a new matrix is returned if it's sparse.
+
+		Returns: J
+		"""
+		if self._params_generation != devices.get_params_generation():
+			self._update_params()
+		xg = numpy.concatenate(([0], numpy.asarray(x).ravel()))
+		ports_v = xg[self.drive_nodes[:, :, 0]] - xg[self.drive_nodes[:, :, 1]]
+		i, g = self.model.get_i_and_g_vec(ports_v, self.params)
+		tx_values = numpy.concatenate((i, -i))[self._tx_mask]
+		Tx[:, 0] += numpy.mat(numpy.bincount(self._tx_rows, tx_values, minlength=Tx.shape[0])).T
+		g = g.ravel()
+		j_values = numpy.concatenate((g, -g, -g, g))[self._j_mask]
+		if scipy.sparse.issparse(J):
+			J = J + scipy.sparse.coo_matrix((j_values, (self._j_rows, self._j_cols)), shape=J.shape).tocsc()
+		else:
+			if self._j_flat is None or self._j_flat[0] != J.shape[0]:
+				flat_indices = self._j_rows*J.shape[0] + self._j_cols
+				unique_indices, inverse = numpy.unique(flat_indices, return_inverse=True)
+				self._j_flat = (J.shape[0], unique_indices, inverse)
+			size, unique_indices, inverse = self._j_flat
+			J.flat[unique_indices] += numpy.bincount(inverse, j_values, minlength=len(unique_indices))
+		return J
+
 
 def update_J_and_Tx(J, Tx, x, elem, time):
+	"""Adds the contribution of a nonlinear element to J and Tx.
+	
+	If the element provides eval(op_index, ports_v, time), returning the 
+	current and the conductances of a port at once, that's used. 
+	Otherwise i() and g() are called, once per drive port.
+	"""
 	out_ports = elem.get_output_ports()
+	has_eval = hasattr(elem, "eval")
 	for index in xrange(len(out_ports)):
 		n1, n2 = out_ports[index]
+		if not (n1 or n2):
+			continue
 		dports = elem.get_drive_ports(index)
 		v_dports = []
 		for port in dports:
@@ -581,15 +786,17 @@ def update_J_and_Tx(J, Tx, x, elem, time):
 			if port[1]:
 				v = v - x[port[1] - 1, 0]
 			v_dports.append(v)
-		if n1 or n2:
+		if has_eval:
+			iel, gs = elem.eval(index, v_dports, time)
+		else:
 			iel = elem.i(index, v_dports, time)
+			gs = [elem.g(index, v_dports, iindex, time) for iindex in xrange(len(dports))]
 		if n1:
 			Tx[n1 - 1, 0] = Tx[n1 - 1, 0] + iel
 		if n2:
 			Tx[n2 - 1, 0] = Tx[n2 - 1, 0] - iel
 		for iindex in xrange(len(dports)):
-			if n1 or n2:
-				g = elem.g(index, v_dports, iindex, time)
+			g = gs[iindex]
 			if n1:
 				if dports[iindex][0]:
 					J[n1 - 1, dports[iindex][0] - 1] += g
@@ -649,11 +856,11 @@ def get_td(dx, locked_nodes, n=-1):
 	return td
 
 
-def generate_mna_and_N(circ):
+def generate_mna_and_N(circ, sparse=None):
 	"""La vecchia versione usava il sistema visto a lezione, quella nuova mira ad essere 
 	magari meno elegante, ma funzionale, flessibile e comprensibile. 
-	MNA e N vengono creati direttamente della dimensione det. dal numero dei nodi, poi se 
-	ci sono voltage sources vengono allargate.
+	MNA e N vengono creati direttamente della dimensione finale: numero dei nodi pi 
+	numero degli elementi definiti in tensione (voltage sources, induttori, vcvs).
 	
 	Il vettore incognita � fatto cos�:
 	x vettore colonna di lunghezza (N_nodi - 1) + N_vsources, i primi N_nodi valori di x, corrispondono
@@ -667,73 +874,17 @@ def generate_mna_and_N(circ):
 	
 	Richiede in ingresso la descrizione del circuito, circ.
 	Restituisce: (MNA, N)
+
+	If sparse is set to True, MNA is a scipy.sparse (CSC) matrix, if it is
+	None the matrix type is chosen by utilities.use_sparse().
+
+	The stamps are taken from the circuit_plan of circ.
 	"""
-	n_of_nodes = len(circ.nodes_dict)
-	mna = numpy.mat(numpy.zeros((n_of_nodes, n_of_nodes)))
-	N = numpy.mat(numpy.zeros((n_of_nodes, 1)))
-	for elem in circ.elements:
-		if elem.is_nonlinear:
-			continue
-		elif isinstance(elem, devices.resistor):
-			mna[elem.n1, elem.n1] = mna[elem.n1, elem.n1] + 1.0/elem.R
-			mna[elem.n1, elem.n2] = mna[elem.n1, elem.n2] - 1.0/elem.R
-			mna[elem.n2, elem.n1] = mna[elem.n2, elem.n1] - 1.0/elem.R
-			mna[elem.n2, elem.n2] = mna[elem.n2, elem.n2] + 1.0/elem.R
-		elif isinstance(elem, devices.capacitor):
-			pass #In a capacitor I(V) = 0
-		elif isinstance(elem, devices.gisource):
-			mna[elem.n1, elem.sn1] = mna[elem.n1, elem.sn1] + elem.alpha
-			mna[elem.n1, elem.sn2] = mna[elem.n1, elem.sn2] - elem.alpha
-			mna[elem.n2, elem.sn1] = mna[elem.n2, elem.sn1] - elem.alpha
-			mna[elem.n2, elem.sn2] = mna[elem.n2, elem.sn2] + elem.alpha
-		elif isinstance(elem, devices.isource):
-			if not elem.is_timedependent: #convenzione normale!
-				N[elem.n1, 0] = N[elem.n1, 0] + elem.I()
-				N[elem.n2, 0] = N[elem.n2, 0] - elem.I()
-			else:
-				pass #vengono aggiunti volta per volta
-		elif isinstance(elem, devices.inductor_coupling):
-			pass
-			# this is taken care of within the inductors
-		elif circuit.is_elem_voltage_defined(elem):
-			pass
-			#we'll add its lines afterwards
-		else:
-			print "dc_analysis.py: BUG - Unknown linear element. Ref. #28934"
-	#process vsources
-	# i generatori di tensione non sono pilotabili in tensione: g � infinita
-	# for each vsource, introduce a new variable: the current flowing through it.
-	# then we introduce a KVL equation to be able to solve the circuit
-	for elem in circ.elements:
-		if circuit.is_elem_voltage_defined(elem):
-			index = mna.shape[0] #get_matrix_size(mna)[0]
-			mna = utilities.expand_matrix(mna, add_a_row=True, add_a_col=True)
-			N = utilities.expand_matrix(N, add_a_row=True, add_a_col=False)
-			# KCL
-			mna[elem.n1, index] = 1.0
-			mna[elem.n2, index] = -1.0
-			# KVL
-			mna[index, elem.n1] = +1.0
-			mna[index, elem.n2] = -1.0
-			if isinstance(elem, devices.vsource) and not elem.is_timedependent:
-				# corretto, se � def una parte tempo-variabile ci pensa
-				# mdn_solver a scegliere quella giusta da usare.
-				N[index, 0] = -1.0*elem.V()
-			elif isinstance(elem, devices.vsource) and elem.is_timedependent:
-				pass # taken care step by step
-			elif isinstance(elem, devices.evsource):
-				mna[index, elem.sn1] = -1.0 * elem.alpha
-				mna[index, elem.sn2] = +1.0 * elem.alpha
-			elif isinstance(elem, devices.inductor):
-				#N[index,0] = 0 pass, it's already zero
-				pass
-			elif isinstance(elem, devices.hvsource):
-				print "dc_analysis.py: BUG - hvsources are not implemented yet."
-				sys.exit(33)
-			else:
-				print "dc_analysis.py: BUG - found an unknown voltage_def elem."
-				print elem
-				sys.exit(33)
+	plan = circuit_plan.get_plan(circ)
+	if sparse is None:
+		sparse = utilities.use_sparse(plan.size - 1)
+	mna = plan.mna(sparse)
+	N = plan.N()
 
 	# Seems a good place to run some sanity check
 	# for the time being we do not halt the execution
@@ -785,11 +936,19 @@ def check_ground_paths(mna, circ, reduced_mna=True):
 	else:
 		r_c = 0
 	to_be_checked_for_nonlinear_paths = [] 
+	if scipy.sparse.issparse(mna):
+		# nonzero entries in the voltage defined elements' columns, per row
+		mna_diag = mna.diagonal()
+		vde_nnz = numpy.diff(mna[:, len(circ.nodes_dict) - r_c:].tocsr().indptr)
 	for node in circ.nodes_dict.iterkeys():
 		if node == 0:
 			continue
 			# ground 
-		if mna[node - r_c, node - r_c] == 0 and not mna[node - r_c, len(circ.nodes_dict) - r_c:].any():
+		if scipy.sparse.issparse(mna):
+			no_path = mna_diag[node - r_c] == 0 and not vde_nnz[node - r_c]
+		else:
+			no_path = mna[node - r_c, node - r_c] == 0 and not mna[node - r_c, len(circ.nodes_dict) - r_c:].any()
+		if no_path:
 			to_be_checked_for_nonlinear_paths.append(node)
 	for node in to_be_checked_for_nonlinear_paths:
 		node_is_nl_op = False
@@ -22,7 +22,7 @@
 
 import sys
 import numpy, numpy.linalg
-import circuit, utilities
+import circuit, utilities, linsolve
 
 def get_dc_guess(circ, verbose=3):
 	"""This method tries to build a DC guess, according to what the
@@ -48,9 +48,9 @@ def get_dc_guess(circ, verbose=3):
 		print ""
 
 	nv = len(circ.nodes_dict)
-	M = numpy.mat(numpy.zeros((1, nv)))
-	T = numpy.mat(numpy.zeros((1, 1)))
-	index = 0
+	# the equations are collected first and M and T are allocated once:
+	# one (n1, n2, guess) tuple per row of M*x = T
+	equations = []
 	v_eq = 0 # number of current equations
 	one_element_with_dc_guess_found = False
 
@@ -68,24 +68,20 @@ def get_dc_guess(circ, verbose=3):
 				for (n1, n2) in elem.ports:
 					if n1 == n2:
 						continue
-					if index:
-						M = utilities.expand_matrix(M, add_a_row=True, add_a_col=False)
-						T = utilities.expand_matrix(T, add_a_row=True, add_a_col=False)
-					M[index, n1] = +1
-					M[index, n2] = -1
-					T[index] = elem.dc_guess[port_index]
+					equations.append((n1, n2, elem.dc_guess[port_index]))
 					port_index = port_index + 1
-					index = index + 1
 			else:
 				if elem.n1 == elem.n2:
 					continue
-				if index:
-					M = utilities.expand_matrix(M, add_a_row=True, add_a_col=False)
-					T = utilities.expand_matrix(T, add_a_row=True, add_a_col=False)
-				M[index, elem.n1] = +1
-				M[index, elem.n2] = -1
-				T[index] = elem.dc_guess[0]
-				index = index + 1
+				equations.append((elem.n1, elem.n2, elem.dc_guess[0]))
+
+	M = numpy.mat(numpy.zeros((max(len(equations), 1), nv)))
+	T = numpy.mat(numpy.zeros((max(len(equations), 1), 1)))
+	for index in xrange(len(equations)):
+		n1, n2, guess = equations[index]
+		M[index, n1] = +1
+		M[index, n2] = -1
+		T[index] = guess
 	
 	if verbose == 5:
 		print "DBG: get_dc_guess(): M and T, no reduction"
@@ -156,18 +152,12 @@ def get_dc_guess(circ, verbose=3):
 	#    I'm not sure about this though.
 	
 	if M.shape[0] != M.shape[1]:
-		Rp = numpy.mat(numpy.linalg.pinv(M)) * T
+		# same as pinv(M)*T, without forming the pseudo-inverse
+		Rp = numpy.mat(numpy.linalg.lstsq(M, T, rcond=1e-15)[0])
 	else: # case M.shape[0] == M.shape[1], use normal
-		if numpy.linalg.det(M) != 0:
-			try:
-				Rp = numpy.linalg.inv(M) * T
-			except numpy.linalg.linalg.LinAlgError:
-				eig = numpy.linalg.eig(M)[0]
-				cond = abs(eig).max()/abs(eig).min()
-				if verbose:
-					print "cond=" +str(cond)+". No guess."
-				return None
-		else:
+		try:
+			Rp = linsolve.solve(M, T)
+		except numpy.linalg.linalg.LinAlgError:
 			if verbose:
 				print "Guess matrix is singular. No guess."
 			return None
@@ -106,6 +106,23 @@ know the external names of its nodes. It is used to print the parsed netlist.
 	##def i(self, v):
 	##	return 0
 
+
+# The batched evaluations of the nonlinear devices (see dc_analysis.nl_group)
+# read the device parameters (W, L, AREA, T...) once: whoever changes them
+# in a circuit that was already simulated has to call params_changed()
+_params_generation = 0
+
+def params_changed():
+	"""Marks the parameters of the nonlinear devices as changed: they are
+	read again at the next evaluation."""
+	global _params_generation
+	_params_generation = _params_generation + 1
+
+def get_params_generation():
+	"""Returns: an integer that changes every time params_changed() is 
+	called."""
+	return _params_generation
+
 class resistor:
 	letter_id = "r"
 	is_nonlinear = False
@@ -246,6 +263,12 @@ class isource:
 			return self.idc
 		else:
 			return self._time_function.value(time)
+
+	def breakpoints(self, tstart, tstop):
+		"""Generates the times in [tstart, tstop] where the current has a
+		corner, in increasing order. See pulse.breakpoints()."""
+		return _breakpoints(self, tstart, tstop)
+
 class vsource:
 	"""Generic (ideal) voltage source:
 	Defaults to a DC voltage source. To implement a time-varying source:
@@ -295,6 +318,16 @@ class vsource:
 		else:
 			return self._time_function.value(time)
 
+	def breakpoints(self, tstart, tstop):
+		"""Generates the times in [tstart, tstop] where the voltage has a
+		corner, in increasing order. See pulse.breakpoints()."""
+		return _breakpoints(self, tstart, tstop)
+
+def _breakpoints(source, tstart, tstop):
+	if source.is_timedependent and hasattr(source._time_function, "breakpoints"):
+		return source._time_function.breakpoints(tstart, tstop)
+	return iter([])
+
 class evsource:
 	"""Linear voltage controlled voltage source (ideal)
 
@@ -408,6 +441,27 @@ class pulse:
 			return self.v2 + ((self.v1-self.v2)/(self.tf))*(time - (self.td+self.tr+self.pw))
 		else:
 			return self.v1
+	def breakpoints(self, tstart, tstop):
+		"""Generates the times in [tstart, tstop] where the waveform has
+		a corner (the beginning and the end of the edges), in increasing 
+		order.
+		"""
+		if not self.ready() or self.per <= 0:
+			return
+		corners = [c for c in (self.td, self.td + self.tr, self.td + self.tr + self.pw, \
+			self.td + self.tr + self.pw + self.tf) if c < self.per]
+		if self.td + self.tr + self.pw + self.tf > self.per:
+			# the pulse is cut at the end of the period
+			corners.insert(0, 0)
+		k = max(0, int(math.floor(tstart/self.per)))
+		while corners:
+			for c in corners:
+				t = k*self.per + c
+				if t > tstop:
+					return
+				if t >= tstart:
+					yield t
+			k = k + 1
 	def ready(self):
 		if self.v1 == None or self.v2 == None or self.td == None or self.tr == None or self.pw == None or \
 		self.tf == None or self.per == None:
@@ -444,6 +498,12 @@ class sin:
 			return self.vo + self.va * math.exp(-1*(time-self.td)/self.theta) * math.sin(2*math.pi*self.freq*(time-self.td))
 		else:
 			return self.vo + self.va * math.sin(2*math.pi*self.freq*(time-self.td))
+	def breakpoints(self, tstart, tstop):
+		"""Generates the time in [tstart, tstop] where the waveform has
+		a corner, if any: the beginning of the sinusoid, td.
+		"""
+		if tstart <= self.td <= tstop:
+			yield self.td
 	def ready(self):
 		if self.vo == None or self.va == None or self.freq == None or self.td == None or self.theta == None:
 			return False
@@ -482,6 +542,13 @@ class exp:
 			return self.v1+(self.v2 - self.v1) * (1-math.exp(-1 * (time - self.td1)/self.tau1))
 		else:
 			return self.v1 + (self.v2 - self.v1) * (1 - math.exp(-1 * (time - self.td1 ) / self.tau1))+(self.v1 - self.v2 ) * ( 1 - math.exp(-1 * (time - self.td2) / self.tau2))
+	def breakpoints(self, tstart, tstop):
+		"""Generates the times in [tstart, tstop] where the waveform has
+		a corner (td1 and td2), in increasing order.
+		"""
+		for t in sorted((self.td1, self.td2)):
+			if tstart <= t <= tstop:
+				yield t
 	def ready(self):
 		if self.v1 == None or self.v2 == None or self.td1 == None or self.tau1 == None or self.td2 == None \
 		or self.tau2 == None:
@@ -0,0 +1,154 @@
+# -*- coding: iso-8859-1 -*-
+# df_coeff.py
+# Cached coefficients of the differentiation formulae
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Coefficients of the differentiation formulae (DF) and of the predictors,
+shared by the DF modules (gear, trap, implicit_euler).
+
+The coefficients depend only on the distances of the past time points
+from the new one, t(n+1) - t(n-k), normalized to the step h:
+
+	s[k] = (t(n+1) - t(n-k+1))/h = 1 + (t(n) - t(n-k+1))/h,	k = 1, 2...
+
+and on a power of h. They are computed for h = 1, cached (LRU) with the
+ratios as key and scaled: with a fixed step, or a step that changes
+seldom, they are computed only a few times in the whole transient.
+
+The ratios are rounded to options.transient_df_ratio_resolution before
+being used, so that the small differences due to the accumulation of
+the time are not seen as different step histories. The coefficients
+are computed from the rounded ratios.
+
+The past values are combined with a single product of the coefficients
+and the matrix of the stacked values.
+"""
+
+import collections
+import numpy
+import options, utilities
+
+class coeff_cache:
+	"""LRU cache of the coefficients: at most options.transient_df_cache_size
+	entries are kept, the least recently used is dropped first.
+
+	The number of lookups that found the coefficients (hits) or had to
+	compute them (misses) is kept in the attributes of the same name.
+	"""
+	def __init__(self):
+		# the least recently used entry first
+		self._entries = collections.OrderedDict()
+		self.hits = 0
+		self.misses = 0
+
+	def __str__(self):
+		return "%d entries, %d hits, %d misses" % (len(self._entries), self.hits, self.misses)
+
+	def get(self, key, compute):
+		"""Returns: the coefficients for key, calling compute() to get
+		them if they are not cached.
+		"""
+		if key in self._entries:
+			self.hits = self.hits + 1
+			value = self._entries.pop(key)
+		else:
+			self.misses = self.misses + 1
+			while len(self._entries) >= max(1, options.transient_df_cache_size):
+				self._entries.popitem(last=False)
+			value = compute()
+		self._entries[key] = value
+		return value
+
+	def clear(self):
+		self._entries = collections.OrderedDict()
+
+cache = coeff_cache()
+
+def get_key(pv_array, step, n):
+	"""Returns: the tuple of the n normalized ratios s[1]...s[n] in units
+	of options.transient_df_ratio_resolution, rounded.
+	"""
+	resolution = options.transient_df_ratio_resolution
+	t0 = pv_array[0][0]
+	return tuple([int(round((1.0 + (t0 - pv_array[k][0])/step)/resolution)) for k in range(n)])
+
+def get_ratios(key):
+	"""Returns: the array of the ratios in key, with s[0] = 0 added at
+	the beginning.
+	"""
+	return numpy.concatenate(([0], numpy.array(key, dtype=float)*options.transient_df_ratio_resolution))
+
+def stack(pv_array, n, index=1):
+	"""Returns: the matrix whose columns are the n most recent values
+	pv_array[k][index], the last one first.
+	"""
+	return numpy.concatenate([pv_array[k][index] for k in range(n)], axis=1)
+
+def predictor(pv_array, step, n, key=None):
+	"""The prediction of x(n+1), extrapolating the polynomial through
+	the last n values of x, and the coefficient of its LTE.
+	key: the one of the last n points, if already known.
+
+	Returns: (predict_x, predict_lte_coeff)
+	"""
+	if key is None:
+		key = get_key(pv_array, step, n)
+	alpha, lte = cache.get(("predictor",) + key, lambda: _predictor_coefficients(get_ratios(key), n))
+	return stack(pv_array, n)*alpha, lte*step**n
+
+def gear(pv_array, step, order, predict):
+	"""The coefficients of Gear's DF of the given order (see gear.py).
+
+	Returns: [C1, C0, x_lte_coeff, predict_x, predict_lte_coeff]
+	"""
+	key = get_key(pv_array, step, order + 1)
+	gamma0, gamma, x_lte = cache.get(("gear", order) + key, \
+		lambda: _gear_coefficients(get_ratios(key), order))
+	C1 = gamma0/step
+	C0 = stack(pv_array, order)*gamma/step
+	if predict:
+		predict_x, predict_lte_coeff = predictor(pv_array, step, order + 1, key)
+	else:
+		predict_x, predict_lte_coeff = None, None
+	return [C1, C0, x_lte*step**(order + 1), predict_x, predict_lte_coeff]
+
+def _predictor_coefficients(s, n):
+	"""Returns: (alpha, lte), the weights of the past values in the
+	extrapolation to s = 0 (a column matrix) and the coefficient of its
+	LTE, for h = 1.
+	"""
+	alpha = numpy.ones((n,))
+	for k in range(1, n + 1):
+		for j in range(1, n + 1):
+			if j != k:
+				alpha[k - 1] = alpha[k - 1]*s[j]/(s[j] - s[k])
+	return numpy.mat(alpha).T, -s[1:n + 1].prod()/utilities.fact(n)
+
+def _gear_coefficients(s, order):
+	"""Returns: (gamma[0], gamma[1:], x_lte), gamma[0] being the 
+	coefficient of x(n+1) and gamma[k] the one of x(n-k+1) in the 
+	derivative (gamma[1:] as a column matrix) and x_lte the coefficient
+	of the LTE, for h = 1.
+	"""
+	alpha, lte = _predictor_coefficients(s, order + 1)
+	gamma = numpy.zeros((order + 1,))
+	gamma[1:] = numpy.asarray(alpha).ravel()[:order]*(1.0/s[order + 1] - 1.0/s[1:order + 1])
+	gamma[0] = -gamma[1:].sum()
+	x_lte = (s[1:order + 1]**(order + 1)*(-gamma[1:]/gamma[0])).sum()
+	x_lte = (-1.0)**(order + 1)/utilities.fact(order + 1)*x_lte
+	return gamma[0], numpy.mat(gamma[1:]).T, x_lte
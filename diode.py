@@ -18,7 +18,7 @@
 # along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
 
 import math, numpy
-import constants, printing, dc_analysis, utilities
+import constants, printing, dc_analysis, utilities, devices
 
 """
 Contains a diode element and its model class.
@@ -30,13 +30,14 @@ Contains a diode element and its model class.
                                   
 """
 
+class dev_class: pass # empty class to hold device parameters
+
 class diode:
 	letter_id = "d"
 	is_nonlinear = True
 	is_symbolic = True
 	dc_guess = [0.425]
 	def __init__(self, n1, n2, model, AREA=None, T=None, ic=None, off=False):
-		class dev_class: pass
 		self.device = dev_class()
 		self.device.AREA = AREA if AREA is not None else 1.0
 		self.device.T = T
@@ -66,6 +67,7 @@ class diode:
 	def set_temperature(self, T):
 		"""Set the operating temperature IN KELVIN degrees"""
 		self.device.T = T
+		devices.params_changed()
 	def __str__(self):
 		T = self._get_T()
 		rep = "%s area=%g T=%g" % (self.model.name, self.device.AREA, self.device.T)
@@ -91,6 +93,25 @@ class diode:
 			raise Exception, "Attepted to evaluate a diode's gm on an unknown port."
 		return self.model.get_gm(op_index, ports_v, port_index, self.device)
 
+	def eval(self, op_index, ports_v, time=0):
+		"""Returns: (i, [g]), see i() and g()."""
+		return self.i(op_index, ports_v, time), [self.g(op_index, ports_v, 0, time)]
+
+	def get_vec_model(self):
+		"""Diodes sharing a model are evaluated all together, through 
+		diode_model.get_i_and_g_vec(), unless the model has a series 
+		resistance: then every diode needs its own inner iteration. 
+
+		Returns: the model, or None if this diode can't be batched.
+		"""
+		if self.model.RS:
+			return None
+		return self.model
+
+	def get_vec_params(self):
+		"""Returns: the device parameters needed by the vectorized model."""
+		return {"AREA":self.device.AREA, "T":self.device.T}
+
 	def get_op_info(self, ports_v_v):
 		vn1n2 = float(ports_v_v[0][0])
 		idiode = self.i(0, (vn1n2,))
@@ -103,6 +124,14 @@ class diode:
 	def print_op_info(self, ports_v):
 		print self.get_op_info(ports_v),
 
+	def get_noise(self, ports_v):
+		"""Returns: (white, flicker), the power spectral densities of the 
+		noise current of the diode [A^2/Hz]: shot noise, 2qI, and the 
+		flicker noise at 1 Hz, KF*I^AF (it scales as 1/f).
+		"""
+		idiode = abs(self.i(0, ports_v))
+		return 2*constants.e*idiode, self.model.KF*idiode**self.model.AF
+
 IS_DEFAULT = 1e-14 # A
 N_DEFAULT = 1.0
 ISR_DEFAULT = 0.0 #A
@@ -192,6 +221,51 @@ class diode_model:
 		return idiode
 	def _safe_exp(self, x):
 		return math.exp(x) if x<70 else math.exp(70)+10*x
+
+	def _safe_exp_vec(self, x):
+		return numpy.where(x < 70, numpy.exp(numpy.minimum(x, 70)), math.exp(70) + 10*x)
+
+	def get_i_vec(self, vd, params):
+		"""Vectorized version of get_i(), for diodes without series resistance.
+		vd: array of the diode voltages
+		params: dictionary of arrays, as returned by diode.get_vec_params()
+
+		Returns: array of currents
+		"""
+		return self._get_i_and_gm_vec(vd, params)[0]
+
+	def get_gm_vec(self, vd, params):
+		"""Vectorized version of get_gm(), see get_i_vec()."""
+		return self._get_i_and_gm_vec(vd, params)[1]
+
+	def get_i_and_g_vec(self, ports_v, params):
+		"""Evaluates a batch of diodes sharing this model.
+		ports_v: array, one row per diode holding its port voltage
+		params: see get_i_vec()
+
+		Returns: (i, g), i has one current per diode, g one row of 
+		conductances per diode.
+		"""
+		i, gm = self._get_i_and_gm_vec(ports_v[:, 0], params)
+		return i, gm[:, numpy.newaxis]
+
+	def _get_i_and_gm_vec(self, vd, params):
+		T = params["T"]
+		if (T == T[0]).all():
+			temperatures = [T[0]]
+		else:
+			temperatures = numpy.unique(T)
+		i = numpy.empty(vd.shape)
+		gm = numpy.empty(vd.shape)
+		for temp in temperatures:
+			if temp != self.T:
+				self.set_temperature(temp)
+			sel = T == temp
+			e1 = self._safe_exp_vec(vd[sel]/(self.N*self.VT))
+			e2 = self._safe_exp_vec(vd[sel]/(self.NR*self.VT))
+			i[sel] = params["AREA"][sel]*(self.IS*(e1 - 1) + self.ISR*(e2 - 1))
+			gm[sel] = params["AREA"][sel]*(self.IS/(self.N*self.VT)*e1 + self.ISR/(self.NR*self.VT)*e2)
+		return i, gm
 			
 	def _get_i(self, v):
 		i = self.IS*(self._safe_exp(v/(self.N*self.VT))-1) \
@@ -58,6 +58,7 @@ The Missing Features:
 
 import constants, options, utilities, printing
 import math 
+import numpy
 
 
 # DEFAULT VALUES FOR 500n CH LENGTH
@@ -73,9 +74,13 @@ XJ_DEFAULT = .1e-6
 
 TCV_DEFAULT = 1e-3
 BEX_DEFAULT = -1.5 
+KF_DEFAULT = 0.0
+AF_DEFAULT = 1.0
 
 ISMALL_GUESS_MIN = 1e-10
 
+class dev_class: pass # empty class to hold device parameters
+
 class ekv_device:
 	INIT_IFRN_GUESS = 1
 	def __init__(self, nd, ng, ns, nb, W, L, model, M=1, N=1):
@@ -102,7 +107,6 @@ class ekv_device:
 		self.n1 = nd
 		self.n2 = ns
 		self.ports = ((self.n1, self.nb), (self.ng, self.nb), (self.n2, self.nb))
-		class dev_class: pass # empty class to hold device parameters
 		self.device = dev_class()
 		self.device.L = float(L) #channel length -
 		self.device.W = float(W) #channel width -
@@ -192,6 +196,17 @@ class ekv_device:
 		arr = self.get_op_info(ports_v)
 		print arr,
 
+	def get_noise(self, ports_v):
+		"""Returns: (white, flicker), the power spectral densities of the
+		drain noise current [A^2/Hz]: the channel thermal noise, 
+		4kT*2/3*gm, and the flicker noise at 1 Hz, KF*Ids^AF/(COX*L^2)
+		(it scales as 1/f).
+		"""
+		ids = abs(self.i(0, ports_v))
+		gm = abs(self.g(0, ports_v, 1))
+		white = 4*constants.k*constants.T*2.0/3.0*gm
+		return white, self.ekv_model.KF*ids**self.ekv_model.AF/(self.ekv_model.COX*self.device.L**2)
+
 	def get_op_info(self, ports_v):
 		"""Operating point info, for design/verification. """
 		mos_type = self._get_mos_type()
@@ -257,6 +272,38 @@ class ekv_device:
 
 		return g
 
+	def eval(self, op_index, ports_v, time=0):
+		"""Returns the current and the three transconductances at once, 
+		with a single evaluation of the model. 
+		See i() and g() for the meaning of the parameters.
+
+		Returns: (Ids, [gmd, gmg, gms])
+		"""
+		assert op_index == 0 
+		Ids, gs = self.ekv_model.get_ids_and_g(self.device, ports_v, self.opdict)
+		gs = list(gs)
+		for port_index in range(3):
+			if gs[port_index] == 0:
+				sign = -1 if port_index == 2 else +1
+				gs[port_index] = sign*options.gmin*2
+		self.opdict.update({'gmd':gs[0], 'gmg':gs[1], 'gms':gs[2]})
+		return Ids, gs
+
+	def get_vec_model(self):
+		"""EKV devices sharing a model are evaluated all together, 
+		through ekv_mos_model.get_i_and_g_vec().
+		"""
+		return self.ekv_model
+
+	def get_vec_params(self):
+		"""Returns: the device parameters needed by the vectorized model.
+		ifn and irn are the starting guesses of the normalized currents, 
+		the model updates them at every evaluation.
+		"""
+		return {"W":self.device.W, "L":self.device.L, "M":float(self.device.M), \
+			"N":float(self.device.N), "ip_abs_err":self.opdict['ip_abs_err'], \
+			"ifn":float(self.opdict['ifn']), "irn":float(self.opdict['irn'])}
+
 	def get_value_function(self, identifier):
 		def get_value(self):
 			return self.opdict[identifier]
@@ -265,10 +312,14 @@ class ekv_device:
 class scaling_holder: pass # will hold the scaling factors
 
 class ekv_mos_model:
+	# ifn and irn (see get_i_and_g_vec()) are updated by the model: they
+	# are the starting guesses of the next evaluation
+	vec_state_params = ("ifn", "irn")
+
 	def __init__(self, name=None, TYPE='n', TNOM=None, COX=None, \
 	GAMMA=None, NSUB=None, PHI=None, VTO=None, KP=None, \
 	XJ=None, LAMBDA=None, \
-	TOX=None, VFB=None, U0=None, TCV=None, BEX=None):
+	TOX=None, VFB=None, U0=None, TCV=None, BEX=None, KF=None, AF=None):
 		
 		self.scaling = scaling_holder()
 
@@ -326,6 +377,9 @@ class ekv_mos_model:
 		# Intrinsic model temperature parameters
 		self.TCV = self.NPMOS*float(TCV) if TCV is not None else self.NPMOS*TCV_DEFAULT
 		self.BEX = float(BEX) if BEX is not None else BEX_DEFAULT
+		# flicker noise
+		self.KF = float(KF) if KF is not None else KF_DEFAULT
+		self.AF = float(AF) if AF is not None else AF_DEFAULT
 	
 		self.set_device_temperature(constants.T)
 
@@ -496,6 +550,115 @@ class ekv_mos_model:
 		
 		return Ids, qf, qr
 
+	def get_ids_vec(self, ports_v, params):
+		"""Vectorized version of get_ids(), evaluates all at once the 
+		devices sharing this model.
+		ports_v: array, one row per device: (vdb, vgb, vsb)
+		params: dictionary of arrays, as returned by ekv_device.get_vec_params()
+		
+		Returns: array of IDS
+		"""
+		return self._get_ids_and_g_vec(ports_v, params)[0]
+
+	def get_g_vec(self, ports_v, params):
+		"""Vectorized version of get_gmd(), get_gmg() and get_gms(), 
+		see get_ids_vec().
+		
+		Returns: array, one row per device: (gmd, gmg, gms)
+		"""
+		return self._get_ids_and_g_vec(ports_v, params)[1]
+
+	def get_i_and_g_vec(self, ports_v, params):
+		"""Evaluates the current and the transconductances of all the 
+		devices, exactly as ekv_device.i() and ekv_device.g() would.
+		See get_ids_vec().
+
+		Returns: (Ids, g), g having one row per device: (gmd, gmg, gms)
+		"""
+		Ids, g = self._get_ids_and_g_vec(ports_v, params)
+		# see ekv_device.g()
+		gmin_sign = numpy.array([+1, +1, -1])
+		g = numpy.where(g == 0, gmin_sign*options.gmin*2, g)
+		return Ids, g
+
+	def _get_ids_and_g_vec(self, ports_v, params):
+		vd, vg, vs = ports_v[:, 0], ports_v[:, 1], ports_v[:, 2]
+		(VD, VG, VS), CS_FACTOR = self.get_voltages_vec(vd, vg, vs)
+		VP, nv, nq = self.get_vp_nv_nq_vec(VG)
+
+		Ut = constants.Vth()
+		Is = 2 * nq * Ut**2 * self.KP * params["W"]/params["L"]
+		Gs = 2 * nq * Ut * self.KP * params["W"]/params["L"]
+
+		vp = VP/Ut
+		vs = VS/Ut
+		vd = VD/Ut
+
+		ifn = self.get_ismall_vec(vp - vs, params["ip_abs_err"], numpy.maximum(params["ifn"], ISMALL_GUESS_MIN))
+		Leff, v_irn = self.get_leq_virp_vec(params, vd, vs, VP, params["L"], ifn)
+		irn = self.get_ismall_vec(v_irn, params["ip_abs_err"], numpy.maximum(params["irn"], ISMALL_GUESS_MIN))
+		params["ifn"][:] = ifn
+		params["irn"][:] = irn
+
+		qf = numpy.sqrt(.25 + ifn) - .5
+		qr = numpy.sqrt(.25 + irn) - .5
+
+		Ids = CS_FACTOR*self.NPMOS * params["L"]/Leff * params["M"] * Is * (ifn - irn)
+
+		direct = CS_FACTOR == +1
+		gmd = numpy.where(direct, Gs*qr, Gs*qf)
+		gms = numpy.where(direct, -1.0*Gs*qf, -Gs*qr)
+		# like get_gmg(), nv is evaluated at the unscaled gate voltage
+		nv = self.get_vp_nv_nq_vec(vg)[1]
+		gmg = CS_FACTOR*Gs*(qf - qr)/nv
+
+		return Ids, numpy.column_stack((gmd, gmg, gms))
+
+	def get_voltages_vec(self, vd, vg, vs):
+		"""Vectorized version of get_voltages(). CS is an array."""
+		vd = vd*self.NPMOS
+		vg = vg*self.NPMOS
+		vs = vs*self.NPMOS
+		swap = vs > vd
+		cs = numpy.where(swap, -1, +1)
+		return (numpy.where(swap, vs, vd), vg, numpy.where(swap, vd, vs)), cs
+
+	def get_vp_nv_nq_vec(self, VG):
+		"""Vectorized version of get_vp_nv_nq()."""
+		sqrt_phi = math.sqrt(self.PHI)
+		VGeff = VG - self.VTO + self.PHI + self.GAMMA*sqrt_phi
+		arg = VG - self.VTO + (sqrt_phi + self.GAMMA/2)**2
+		on = numpy.logical_and(VGeff > 0, arg > 0)
+		VP = numpy.where(on, VG - self.VTO - self.GAMMA*(numpy.sqrt(numpy.where(on, arg, 0)) - (sqrt_phi + self.GAMMA/2)), -self.PHI)
+		VP[numpy.isnan(VP)] = 0
+		nq = 1 + .5 * self.GAMMA / numpy.sqrt(self.PHI + .5*VP)
+		nv = 1 + .5 * self.GAMMA / numpy.sqrt(self.PHI +    VP + 1e-12)
+		return VP, nv, nq
+
+	def get_leq_virp_vec(self, params, vd, vs, Vp, Leff, ifn):
+		"""Vectorized version of get_leq_virp()."""
+		assert (vd >= vs).all()
+		Vth = constants.Vth()
+		Vc = self.UCRIT * params["N"] * Leff
+		Vdss  = Vc * (numpy.sqrt(.25 + Vth/Vc*numpy.sqrt(ifn)) - .5) # eq. 46
+		Vdssp = Vc * (numpy.sqrt(.25 + Vth/Vc *(numpy.sqrt(ifn) - .75*numpy.log(ifn))) - .5) + \
+			Vth*(numpy.log(.5 * Vc/Vth) - .6) # eq. 47
+		vser_1 = numpy.sqrt(ifn) - Vdss/Vth
+		Vds = (vd - vs)*.5*Vth
+		delta_v = 4*Vth*numpy.sqrt(self.LAMBDA*vser_1 + 1.0/64) # eq. 48
+		Vip = numpy.sqrt(Vdss**2 + delta_v**2) - numpy.sqrt((Vds - Vdss)**2 + delta_v**2) #eq 50
+		Lc = math.sqrt(constants.si.esi*self.XJ/self.COX) #eq. 51
+		delta_l = self.LAMBDA * Lc * numpy.log(1 + (Vds - Vip)/(Lc*self.UCRIT)) #eq. 52
+		Lp = params["N"]*Leff - delta_l + (Vds + Vip)/self.UCRIT #eq. 53
+		Lmin = params["N"]*Leff/10.0 #eq. 54
+		Leq = .5*(Lp + numpy.sqrt(Lp**2 + Lmin**2)) #eq. 55
+
+		assert not numpy.isnan(Vdssp).any()
+		assert not numpy.isnan(delta_v).any()
+
+		v_irp = (Vp - Vds - vs*Vth - numpy.sqrt(Vdssp**2 + delta_v**2) + numpy.sqrt((Vds-Vdssp)**2+delta_v**2))/Vth
+		return Leq, v_irp
+
 	def get_leq_virp(self, device, (vd, vg, vs), Vp, Leff, ifn):
 		#if ifn > 0 and Vp - constants.Vth()*vd > 0:
 		assert vd >= vs			
@@ -560,6 +723,25 @@ class ekv_mos_model:
 		gmg = CS_FACTOR*self.scaling.Gs*(qf-qr)/nv
 		return gmg
 
+	def get_ids_and_g(self, device, (vd, vg, vs), opdict=None, debug=False):
+		"""Returns:
+			IDS, the drain-to-source current (de-normalized),
+			(gmd, gmg, gms), the transconductances.
+		Same as get_ids(), get_gmd(), get_gmg() and get_gms(), but the 
+		current is computed only once.
+		"""
+		Ids, qf, qr = self.get_ids(device, (vd, vg, vs), opdict, debug)
+		(j1, j2, j3), CS_FACTOR = self.get_voltages(vd, vg, vs)
+		if CS_FACTOR == +1:
+			gmd = self.scaling.Gs*qr
+			gms = -1.0*self.scaling.Gs*qf
+		else:
+			gmd = self.scaling.Gs*qf
+			gms = -self.scaling.Gs*qr
+		VP, nv, nq = self.get_vp_nv_nq(float(vg))
+		gmg = CS_FACTOR*self.scaling.Gs*(qf-qr)/nv
+		return Ids, (gmd, gmg, gms)
+
 	def get_ismall(self, vsmall, ip_abs_err, iguess=None, debug=False):
 		"""Solves the problem: given v, find i such that:
 			v = ln(q) + 2q
@@ -610,8 +792,7 @@ class ekv_mos_model:
 				check = False
 			# convergence was not reached, update ismall 
 			if math.isnan(ismall):
-				print "Ismall is NaN!!"
-				exit()
+				raise FloatingPointError, "Ismall is NaN"
 			if ismall == 0:
 				# this is a sign we went below the machine resolution
 				# it makes no sense to iterate there as quantization errors
@@ -633,6 +814,64 @@ class ekv_mos_model:
 			print str(iter_c) + " iterations."
 		return ismall
 	
+	def get_ismall_vec(self, vsmall, ip_abs_err, iguess):
+		"""Vectorized version of get_ismall(): the same damped Newton 
+		iteration is run on all the elements of vsmall, each element 
+		leaving the iteration when it has converged.
+		vsmall, ip_abs_err, iguess: arrays
+		"""
+		if numpy.isnan(vsmall).any():
+			raise Exception, \
+			"Attempted to calculate a current corresponding to a NaN voltage."
+		if not (ip_abs_err > 0).all():
+			raise Exception, \
+			"The normalized current absolute error has been set to a negative value."
+
+		ismall = numpy.array(iguess, dtype=float)
+		check = numpy.zeros(ismall.shape, dtype=bool)
+		# indices of the elements that are still iterating
+		active = numpy.arange(ismall.shape[0])
+		while active.shape[0]:
+			i_a = ismall[active]
+			vsmall_iter, numeric_problem_v = self.get_vsmall_vec(i_a)
+			dvdi, numeric_problem_i = self.get_dvsmall_dismall_vec(i_a)
+			deltai = (vsmall[active] - vsmall_iter)/dvdi
+			numeric_problem = numpy.logical_or(numeric_problem_i, numeric_problem_v)
+			abs_deltai = abs(deltai)
+			err = ip_abs_err[active]
+			converged = numpy.logical_or( \
+				numpy.logical_and(numpy.logical_or(abs_deltai < err, numeric_problem), abs_deltai < i_a*options.ier), \
+				numpy.logical_or(abs_deltai < err*1e-6, numeric_problem))
+			# the convergence check has to be passed twice in a row
+			done = numpy.logical_and(converged, check[active])
+			check[active] = converged
+			if numpy.isnan(i_a).any():
+				raise FloatingPointError, "Ismall is NaN"
+			# ismall == 0: we went below the machine resolution, stop there
+			update = numpy.logical_and(numpy.logical_not(done), i_a != 0)
+			i_a, deltai = i_a[update], deltai[update]
+			ratio = deltai/i_a
+			# Damped Newton with domain restriction: ismall >= 0.
+			i_a = numpy.where(ratio > self.NR_damp_factor, self.NR_damp_factor*i_a, \
+				numpy.where(ratio <= -1, 0.1*i_a, i_a + deltai))
+			active = active[update]
+			ismall[active] = i_a
+		return ismall
+
+	def get_vsmall_vec(self, ismall):
+		"""Vectorized version of get_vsmall()."""
+		numeric_problem = abs(ismall) < utilities.EPS
+		ismall = numpy.where(numeric_problem, utilities.EPS, ismall)
+		vsmall = numpy.log(numpy.sqrt(.25 + ismall) - 0.5) + 2*numpy.sqrt(.25 + ismall) - 1.0
+		return vsmall, numeric_problem
+
+	def get_dvsmall_dismall_vec(self, ismall):
+		"""Vectorized version of get_dvsmall_dismall()."""
+		numeric_problem = abs(ismall) < utilities.EPS
+		ismall = numpy.where(numeric_problem, utilities.EPS, ismall)
+		dvdi = 1.0/(numpy.sqrt(.25+ismall)-.5) * .5/numpy.sqrt(.25 + ismall) + 1.0/numpy.sqrt(.25 + ismall)
+		return dvdi, numeric_problem
+
 	def get_vsmall(self, ismall, verbose=3):
 		"""Returns v according to the equations:
 			q = sqrt(.25 + i) - .5
@@ -0,0 +1,118 @@
+# -*- coding: iso-8859-1 -*-
+# exponential.py
+# Exponential propagator of linear circuits
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+The exponential propagator of a linear circuit, used by the EXPONENTIAL
+transient method (see transient.py).
+
+A linear circuit is described by:
+
+	D*dx/dt + G*x + b(t) = 0
+
+G being the (reduced) MNA matrix plus Gmin and b(t) = N + Tt(t). Within
+a step [t, t+h], b is taken to vary linearly from b(t) = b0 to
+b(t+h) = b1, which is exact for piecewise linear sources whose corners
+fall on the time points. Then x = p0 + p1*(s - t) + y(s), where:
+
+	G*p1 = -(b1 - b0)/h,	G*p0 = -(b0 + D*p1)
+
+and y solves D*dy/dt = -G*y, so that y(t+h) = exp(h*A)*y(t), with
+A = -D^-1*G. D is singular in general (nodes without capacitors, voltage
+sources), so exp(h*A) is computed through the shift and invert operator:
+
+	M = (D + h*G)^-1 * D
+
+whose eigenvalues mu = 1/(1 - h*lambda) are related to the eigenvalues
+lambda of the pencil (G, D): exp(h*A) = f(M), f(mu) = exp(1 - 1/mu).
+The infinite eigenvalues of the pencil (the algebraic equations) are
+mapped to mu = 0, where f vanishes together with all its derivatives.
+
+f(M) is precomputed from the ordered real Schur form of M (a dense 
+matrix, even if the MNA matrix is sparse), so that every step costs a
+product and two back substitutions.
+
+There is no truncation error and no step control, the accuracy depends
+only on how well b is represented by the linear interpolation.
+"""
+
+import numpy, numpy.linalg
+import scipy.linalg, scipy.sparse
+
+import linsolve
+
+# f(mu) = exp(1 - 1/mu) underflows to zero for |mu| < 1/746: below MU_MIN
+# the eigenvalues are dropped
+MU_MIN = 1e-3
+
+class propagator:
+	"""Advances the solution of a linear circuit by the step h.
+
+	G: the reduced MNA matrix, including Gmin.
+	D: the reduced matrix of the derivatives.
+	h: the step.
+	G_factors: a factorization of G (see linsolve), if already available.
+
+	Raises numpy.linalg.linalg.LinAlgError if G or D + h*G are singular.
+	"""
+	def __init__(self, G, D, h, G_factors=None):
+		self.h = h
+		self.D = D
+		if G_factors is None:
+			G_factors = linsolve.factor(G)
+		self.G_factors = G_factors
+		self._pencil = linsolve.factor(D + h*G)
+		self._phi = self._propagator()
+
+	def step(self, x, b0, b1):
+		"""Returns: x(t+h), given x(t) and the source vectors b0 = b(t)
+		and b1 = b(t+h), all REDUCED.
+		"""
+		p1 = self.G_factors.solve(-(b1 - b0)/self.h)
+		p0 = self.G_factors.solve(-(b0 + self.D*p1))
+		return p0 + p1*self.h + self.apply(x - p0)
+
+	def apply(self, y):
+		"""Returns: exp(h*A)*y"""
+		return self._phi*y
+
+	def _propagator(self):
+		"""f(M), from its real Schur form M = Z*T*Z^T, ordered so that
+		the eigenvalues that are not dropped come first:
+
+			T = [T11 T12; 0 T22]	f(T) = [F11 X; 0 0]
+
+		F11 = f(T11) and X solves T11*X - X*T22 = F11*T12.
+		"""
+		D = self.D
+		if scipy.sparse.issparse(D):
+			D = D.todense()
+		M = numpy.asarray(self._pencil.solve_many(D))
+		n = M.shape[0]
+		T, Z, sdim = scipy.linalg.schur(M, output='real', sort=lambda re, im: re*re + im*im >= MU_MIN**2)
+		F = numpy.zeros((n, n))
+		if sdim:
+			T11 = T[:sdim, :sdim]
+			# T11 is quasi triangular: the triangular solver would not
+			# handle its 2x2 blocks
+			F11 = scipy.linalg.expm(numpy.eye(sdim) - scipy.linalg.solve(T11, numpy.eye(sdim)))
+			F[:sdim, :sdim] = F11
+			if sdim < n:
+				F[:sdim, sdim:] = scipy.linalg.solve_sylvester(T11, -T[sdim:, sdim:], \
+					numpy.dot(F11, T[:sdim, sdim:]))
+		return numpy.mat(numpy.dot(Z, numpy.dot(F, Z.T)))
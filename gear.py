@@ -75,12 +75,13 @@
 	 x_coeff = -1 * P[1, 0]
 	 const   = -1 * P[1, 1:] * z[1:, 0]
 	 
-	This module uses a faster way to compute the values that doesn't require to invert the matrix.
+	This module uses a faster way to compute the values that doesn't require to invert the matrix
+	(see df_coeff.py, where they are computed and cached).
 	Anyway, from a theorical point of view, the above applies.
 	  """
 	
 import numpy, sys
-import utilities, printing
+import utilities, printing, df_coeff
 
 order = None
 #FAST = True
@@ -133,59 +134,6 @@ def get_df(pv_array, suggested_step, predict=False):
 		printing.print_general_error("You must set Gear's order before using it! e.g. gear.order = 5")
 		sys.exit(1)
 	
-	s = []
-	s.append(0)
-	for index in range(1, order + 2):
-		s.append(suggested_step + pv_array[0][0] - pv_array[index - 1][0])
-		
-	# build e[k, i]
-	e = numpy.mat(numpy.zeros((order + 2, order + 2)))
-	for k_index in range(1, order + 2):
-		for i_index in range(1, order + 2):
-			if i_index == k_index:
-				e[k_index, i_index] = 1
-			else:
-				e[k_index, i_index] = s[i_index] / (s[i_index] -s[k_index])
-	
-	alpha = numpy.mat(numpy.zeros((1, order + 2)))
-	for k_index in range(1, order + 2):
-		alpha[0, k_index] = 1.0
-		for j_index in range(order + 1):
-			alpha[0, k_index] = alpha[0, k_index] * e[k_index, j_index+1]
-	
-	#build gamma
-	gamma = numpy.mat(numpy.zeros((1, order +1)))
-	for k_index in range(1, order + 1):
-		gamma[0, k_index] = alpha[0, k_index] * ((1.0/s[order+1]) - (1.0/s[k_index]))
-	
-	gamma[0, 0] = 0
-	for index in range(1, order + 1):
-		gamma[0, 0] = gamma[0, 0] - gamma[0, index]
-	
-	# values to be returned
-	C1 = gamma[0, 0]
-	
-	C0 = numpy.mat(numpy.zeros(pv_array[0][1].shape))
-	for index in range(order):
-		C0 = C0 + gamma[0, index + 1] * pv_array[index][1]
-	
-	x_lte_coeff = 0
-	for k_index in range(1, order+1):
-		x_lte_coeff = x_lte_coeff + (s[k_index] ** (order + 1)) * (-1.0 * gamma[0, k_index] / gamma[0, 0]) 
-	x_lte_coeff = ((-1.0)**(order + 1)) *(1.0/utilities.fact(order + 1)) * x_lte_coeff
-	
-	if predict:
-		predict_x = numpy.mat(numpy.zeros(pv_array[0][1].shape))
-		for index in range(1, order + 2): #order
-			predict_x = predict_x + alpha[0, index] * pv_array[index - 1][1]
-		
-		predict_lte_coeff = -1.0/(utilities.fact(order + 1))
-		for index in range(1, order + 2):
-			predict_lte_coeff = predict_lte_coeff * s[index]
-		#print predict_lte_coeff
-		#print x_lte_coeff
-	else:
-		predict_x = None
-		predict_lte_coeff = None
-	
-	return [C1, C0, x_lte_coeff, predict_x, predict_lte_coeff]
+	# the coefficients are computed (and cached) by df_coeff
+	return df_coeff.gear(pv_array, suggested_step, order, predict)
+
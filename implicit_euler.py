@@ -20,6 +20,7 @@
 """ This module implements IE (aka Backward Euler) and a first order prediction formula"""
 
 import numpy
+import df_coeff
 
 order = 1
 
@@ -84,11 +85,8 @@ def get_df(pv_array, suggested_step, predict=True):
 	x_lte_coeff = 0.5 * suggested_step
 	
 	if predict and len(pv_array) > 1 and pv_array[1][1] is not None:
-		predict = numpy.mat(numpy.zeros(pv_array[0][1].shape))
-		for index in xrange(predict.shape[0]):
-			predict[index, 0] = (pv_array[0][1][index, 0] - pv_array[1][1][index, 0]) \
-			/ (pv_array[0][0] - pv_array[1][0]) * suggested_step + pv_array[0][1][index, 0]
-		predict_lte_coeff = -0.5 * suggested_step * (pv_array[0][0] + suggested_step - pv_array[1][0])
+		# the line through x(n), x(n-1)
+		predict, predict_lte_coeff = df_coeff.predictor(pv_array, suggested_step, 2)
 	else:
 		predict = None
 		predict_lte_coeff = None
@@ -0,0 +1,244 @@
+# -*- coding: iso-8859-1 -*-
+# linsolve.py
+# Linear systems solution
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+This module provides the routines used by all the analyses to solve
+linear systems. No explicit inverse is ever computed: a matrix is factored
+once (LU) and the factorization handle is used to solve for as many
+right hand sides as needed.
+
+The principal are:
+	factor(A) - returns a factorization handle of A
+	solve(A, b) - solves A*x = b
+	lu_cache - reuses factorizations across Newton iterations and time steps
+
+Both dense (numpy.matrix) and sparse (scipy.sparse) matrices are accepted.
+A singular matrix raises numpy.linalg.linalg.LinAlgError.
+"""
+
+import numpy, numpy.linalg
+import scipy.linalg, scipy.linalg.lapack, scipy.sparse, scipy.sparse.linalg
+
+class factorization:
+	"""LU factorization handle of a square matrix.
+
+	A: the matrix to be factored, numpy.matrix or scipy.sparse matrix.
+	permc_spec: the column ordering to be used by SuperLU, sparse only.
+	perm: sparse only. If set, A is taken to be M[:, perm] and the handle
+	solves M*x = b instead of A*x = b.
+	"""
+	def __init__(self, A, permc_spec="COLAMD", perm=None):
+		self.shape = A.shape
+		self.perm = perm
+		self._complex = numpy.iscomplexobj(A)
+		self.perm_c = None
+		if scipy.sparse.issparse(A):
+			self.sparse = True
+			try:
+				self._lu = scipy.sparse.linalg.splu(A.tocsc(), permc_spec=permc_spec)
+			except RuntimeError, e:
+				raise numpy.linalg.linalg.LinAlgError, str(e)
+			self.perm_c = self._lu.perm_c
+			self._norm1 = abs(A).sum(axis=0).max()
+		else:
+			self.sparse = False
+			lu, piv = scipy.linalg.lu_factor(A)
+			if not numpy.diag(lu).all():
+				raise numpy.linalg.linalg.LinAlgError, "Singular matrix"
+			self._lu = (lu, piv)
+			self._norm1 = numpy.abs(A).sum(axis=0).max()
+
+	def rcond(self):
+		"""Returns: an estimate of the reciprocal of the condition number 
+		of A, in 1-norm. For sparse matrices, the 1-norm of the inverse is
+		estimated with scipy.sparse.linalg.onenormest(), through solves.
+		"""
+		if self.sparse:
+			inv = scipy.sparse.linalg.LinearOperator(self.shape, dtype=self._lu.L.dtype, \
+				matvec=self._lu.solve, rmatvec=lambda x: self._lu.solve(x, trans='H'))
+			return 1.0/(self._norm1*scipy.sparse.linalg.onenormest(inv))
+		gecon, = scipy.linalg.lapack.get_lapack_funcs(('gecon',), (self._lu[0],))
+		rcond, info = gecon(self._lu[0], self._norm1, norm='1')
+		return rcond
+
+	def solve(self, b):
+		"""Solves A*x = b for a single right hand side b (a column vector).
+		Returns: x, a numpy.matrix.
+		"""
+		return self.solve_many(b)
+
+	def solve_many(self, B):
+		"""Solves A*X = B, B holding one right hand side per column.
+		Returns: X, a numpy.matrix of the same shape as B.
+		"""
+		if self.sparse and numpy.iscomplexobj(B) and not self._complex:
+			# SuperLU would cast B to the (real) type of the factors
+			B = numpy.asarray(B)
+			Y = self._lu.solve(numpy.ascontiguousarray(B.real)) + \
+				1j*self._lu.solve(numpy.ascontiguousarray(B.imag))
+		elif self.sparse:
+			Y = self._lu.solve(numpy.asarray(B))
+		else:
+			Y = scipy.linalg.lu_solve(self._lu, B)
+		if self.perm is not None:
+			X = numpy.empty(Y.shape, dtype=Y.dtype)
+			X[self.perm, ...] = Y
+			Y = X
+		return numpy.mat(Y.reshape((self.shape[0], -1)))
+
+	def solve_transposed(self, B):
+		"""Solves A^T*X = B (transposed, not conjugated) with the same
+		factors, B holding one right hand side per column.
+		Returns: X, a numpy.matrix of the same shape as B.
+		"""
+		B = numpy.asarray(B)
+		if self.perm is not None:
+			# A = M[:, perm], so A^T = M^T[perm, :]
+			B = B[self.perm, ...]
+		if self.sparse and numpy.iscomplexobj(B) and not self._complex:
+			Y = self._lu.solve(numpy.ascontiguousarray(B.real), trans='T') + \
+				1j*self._lu.solve(numpy.ascontiguousarray(B.imag), trans='T')
+		elif self.sparse:
+			Y = self._lu.solve(numpy.ascontiguousarray(B), trans='T')
+		else:
+			Y = scipy.linalg.lu_solve(self._lu, B, trans=1)
+		return numpy.mat(Y.reshape((self.shape[0], -1)))
+
+def factor(A):
+	"""Returns: a factorization handle of the square matrix A.
+	"""
+	return factorization(A)
+
+def solve(A, b):
+	"""Solves A*x = b, A being dense or sparse. b may have more than one
+	column.
+	Returns: x, a numpy.matrix.
+	"""
+	return factorization(A).solve_many(b)
+
+class lu_cache:
+	"""Caches the LU factorization of the systems solved by an analysis.
+
+	An analysis creates one instance and passes it to dc_solve (and from
+	there to mdn_solver), which calls solve(A, b) instead of solving
+	A*x = b from scratch. Then:
+	- if A is the same matrix that was factored last time (linear circuits,
+	  fixed time step), the factorization is simply reused,
+	- if A is sparse and has the same sparsity pattern as the last one, the
+	  fill reducing column ordering and the permuted CSC structure computed
+	  for that pattern are reused and only the numeric factorization is
+	  performed,
+	- otherwise, the ordering (symbolic analysis) is computed again.
+
+	Dense matrices have no symbolic step, they are either reused or
+	numerically factored.
+
+	The number of times each path was taken is kept in the symbolic,
+	numeric and reused attributes.
+	"""
+	def __init__(self):
+		self.symbolic = 0
+		self.numeric = 0
+		self.reused = 0
+		self._factorization = None
+		self._sparse = None
+		self._matrix = None
+		# sparse only: the pattern and the column ordering
+		self._indptr = None
+		self._indices = None
+		self._perm = None
+		self._perm_indptr = None
+		self._perm_indices = None
+		self._data_map = None
+
+	def __str__(self):
+		return "%d symbolic analyses, %d numeric factorizations, %d reused factorizations" % \
+			(self.symbolic, self.numeric, self.reused)
+
+	def factor(self, A):
+		"""Returns: a factorization handle of A, computing it only if needed.
+		"""
+		if scipy.sparse.issparse(A):
+			self._factor_sparse(A)
+		else:
+			self._factor_dense(A)
+		return self._factorization
+
+	def solve(self, A, b):
+		"""Solves A*x = b, factoring A only if needed.
+		A is either a numpy.matrix or a scipy.sparse matrix, b a numpy.matrix.
+
+		Returns: x, a numpy.matrix.
+		"""
+		return self.factor(A).solve(b)
+
+	def _factor_dense(self, A):
+		if not self._sparse and self._matrix is not None and self._matrix.shape == A.shape \
+			and numpy.array_equal(self._matrix, A):
+			self.reused += 1
+			return
+		self._matrix = None
+		self._factorization = factorization(A)
+		self._sparse = False
+		self._matrix = numpy.array(A)
+		self.numeric += 1
+
+	def _factor_sparse(self, A):
+		A = A.tocsc()
+		if not A.has_sorted_indices:
+			A = A.sorted_indices()
+		same_pattern = self._sparse and self._indptr.shape == A.indptr.shape and \
+			self._indices.shape == A.indices.shape and \
+			numpy.array_equal(self._indptr, A.indptr) and \
+			numpy.array_equal(self._indices, A.indices)
+		if same_pattern and self._matrix is not None and numpy.array_equal(self._matrix, A.data):
+			self.reused += 1
+			return
+		self._matrix = None
+		if not same_pattern:
+			self._analyze(A)
+		else:
+			Ap = scipy.sparse.csc_matrix((A.data[self._data_map], self._perm_indices, \
+				self._perm_indptr), shape=A.shape)
+			self._factorization = factorization(Ap, permc_spec="NATURAL", perm=self._perm)
+		self._matrix = A.data.copy()
+		self.numeric += 1
+
+	def _analyze(self, A):
+		"""Finds a fill reducing ordering for the columns of A and sets up
+		the structure of the permuted matrix. The factorization that is
+		computed along the way is kept, it refers to the unpermuted A.
+		"""
+		self._sparse = None
+		self._factorization = factorization(A, permc_spec="COLAMD")
+		# splu factors Pr*A*Pc, where Pc moves column i of A to perm_c[i]
+		# we factor A[:, perm] with the natural ordering instead
+		perm = numpy.argsort(self._factorization.perm_c)
+		lengths = numpy.diff(A.indptr)[perm]
+		perm_indptr = numpy.concatenate(([0], numpy.cumsum(lengths))).astype(A.indptr.dtype)
+		data_map = numpy.repeat(A.indptr[perm] - perm_indptr[:-1], lengths) + \
+			numpy.arange(A.nnz, dtype=A.indptr.dtype)
+		self._perm_indices = A.indices[data_map]
+		self._perm_indptr = perm_indptr
+		self._data_map = data_map
+		self._perm = perm
+		self._indptr = A.indptr.copy()
+		self._indices = A.indices.copy()
+		self._sparse = True
+		self.symbolic += 1
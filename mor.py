@@ -0,0 +1,133 @@
+# -*- coding: iso-8859-1 -*-
+# mor.py
+# Model order reduction of the AC system
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reduced order model of the AC system (PRIMA):
+
+	(G + s*C) x = b
+
+is projected on an orthonormal, real, basis V of the Krylov subspaces
+
+	K_q((G + s0*C)^-1 C, (G + s0*C)^-1 b)
+
+built around one or more real expansion points s0 (block Arnoldi, the
+real and imaginary parts of b being the starting block). The reduced
+system
+
+	(V^T G V + s*V^T C V) z = V^T b,	x ~ V z
+
+matches the first q moments of x(s) around every s0 and, V being real,
+it is passive if the original system is. Its size is the number of
+vectors in V, usually a few tens: solving it is cheap at any number of
+frequencies, no matter how big the circuit is.
+
+G and C may be dense (numpy.matrix) or sparse (scipy.sparse).
+"""
+
+import numpy, numpy.linalg
+import scipy.sparse
+
+import linsolve
+
+class prima_model:
+	"""The reduced order model of (G + s*C) x = b.
+
+	G, C: the REDUCED real matrices, dense or sparse.
+	b: the REDUCED right hand side (column vector, may be complex).
+	s0_list: the (real) expansion points.
+	order: number of block Arnoldi iterations per expansion point.
+
+	Raises numpy.linalg.linalg.LinAlgError if G + s0*C is singular.
+	"""
+	# the solutions are expanded back (x = V z) in blocks of frequencies
+	# that take at most this many bytes
+	block_bytes = 32*2**20
+
+	def __init__(self, G, C, b, s0_list, order):
+		b = numpy.asarray(b).ravel()
+		self.V = _krylov_basis(G, C, b, s0_list, order)
+		self.Gr = self.V.T.dot(_mult(G, self.V))
+		self.Cr = self.V.T.dot(_mult(C, self.V))
+		self.br = self.V.T.dot(b)
+		self.block_size = max(1, self.block_bytes/(16*self.V.shape[0]))
+
+	def size(self):
+		"""Returns: the number of unknowns of the reduced system."""
+		return self.V.shape[1]
+
+	def solve(self, s):
+		"""Solves the reduced system for every value in the array s.
+
+		Returns: a (n, len(s)) numpy.matrix, one solution (of the full
+		system) per column.
+		"""
+		M = self.Gr[None, :, :] + s[:, None, None]*self.Cr[None, :, :]
+		b = numpy.tile(self.br, (s.shape[0], 1))[:, :, None]
+		z = numpy.linalg.solve(M, b)[:, :, 0]
+		return numpy.mat(self.V.dot(z.T))
+
+def _mult(M, v):
+	"""Returns: M*v as a numpy array, M being dense or sparse."""
+	if scipy.sparse.issparse(M):
+		return M.dot(v)
+	return numpy.asarray(M).dot(v)
+
+def _krylov_basis(G, C, b, s0_list, order):
+	"""Block Arnoldi at every expansion point, with modified Gram-Schmidt
+	(done twice). The vectors found at every point are then added to
+	the basis, orthogonalized against the ones of the previous points.
+
+	Returns: V, a (n, q) array with orthonormal columns.
+	"""
+	vectors = []
+	for s0 in s0_list:
+		lu = linsolve.factor(G + s0*C)
+		block = [numpy.asarray(lu.solve(numpy.mat(v).T)).ravel() for v in (b.real, b.imag) if v.any()]
+		local = []
+		for iteration in xrange(order):
+			new_block = [w for w in [_orthonormalize(w, local) for w in block] if w is not None]
+			if not new_block:
+				break
+			local.extend(new_block)
+			block = [-numpy.asarray(lu.solve(numpy.mat(_mult(C, w)).T)).ravel() for w in new_block]
+		for w in local:
+			w = _orthonormalize(w, vectors)
+			if w is not None:
+				vectors.append(w)
+	return numpy.column_stack(vectors)
+
+def _orthonormalize(w, vectors):
+	"""Returns: w orthogonalized against the (orthonormal) vectors and
+	normalized or None if w is (numerically) in their span. 
+	"""
+	norm = numpy.linalg.norm(w)
+	for repeat in (0, 1):
+		for v in vectors:
+			w = w - v.dot(w)*v
+	if numpy.linalg.norm(w) <= 1e-10*norm:
+		return None
+	return w/numpy.linalg.norm(w)
+
+def get_expansion_points(omega_start, omega_stop, n_of_points):
+	"""Returns: n_of_points real expansion points, log-spaced between
+	omega_start and omega_stop.
+	"""
+	if n_of_points == 1:
+		return [numpy.sqrt(omega_start*omega_stop)]
+	return list(numpy.logspace(numpy.log10(omega_start), numpy.log10(omega_stop), n_of_points))
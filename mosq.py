@@ -38,8 +38,9 @@ This MOS Model follows the Square Law Mos Model:
 
 """
 
-import constants, options, utilities, printing
+import constants, options, utilities, printing, devices
 import math 
+import numpy
 
 
 # DEFAULT VALUES FOR 500n CH LENGTH
@@ -54,9 +55,13 @@ AKP_DEFAULT = 1.8e-2*1e-6
 
 TCV_DEFAULT = 1e-3
 BEX_DEFAULT = -1.5 
+KF_DEFAULT = 0.0
+AF_DEFAULT = 1.0
 
 ISMALL_GUESS_MIN = 1e-10
 
+class dev_class: pass # empty class to hold device parameters
+
 class mosq_device:
 	def __init__(self, nd, ng, ns, nb, W, L, model, M=1, N=1):
 		"""Quadratic Law MOSFET device
@@ -82,7 +87,6 @@ class mosq_device:
 		self.n1 = nd
 		self.n2 = ns
 		self.ports = ((self.n1, self.n2), (self.ng, self.n2), (self.nb, self.n2))
-		class dev_class: pass # empty class to hold device parameters
 		self.device = dev_class()
 		self.device.L = float(L) #channel length -
 		self.device.W = float(W) #channel width -
@@ -159,6 +163,17 @@ class mosq_device:
 		arr = self.get_op_info(ports_v)
 		print arr,
 
+	def get_noise(self, ports_v):
+		"""Returns: (white, flicker), the power spectral densities of the
+		drain noise current [A^2/Hz]: the channel thermal noise, 
+		4kT*2/3*gm, and the flicker noise at 1 Hz, KF*Ids^AF/(COX*L^2)
+		(it scales as 1/f).
+		"""
+		ids = abs(self.i(0, ports_v))
+		gm = abs(self.g(0, ports_v, 1))
+		white = 4*constants.k*constants.T*2.0/3.0*gm
+		return white, self.mosq_model.KF*ids**self.mosq_model.AF/(self.mosq_model.COX*self.device.L**2)
+
 	def get_op_info(self, ports_v):
 		"""Operating point info, for design/verification. """
 		mos_type = self._get_mos_type()
@@ -219,6 +234,34 @@ class mosq_device:
 
 		return g
 
+	def eval(self, op_index, ports_v, time=0):
+		"""Returns the current and the three transconductances at once. 
+		See i() and g() for the meaning of the parameters.
+
+		Returns: (Ids, [gmd, gm, gmb])
+		"""
+		assert op_index == 0 
+		Ids, gs = self.mosq_model.get_ids_and_g(self.device, ports_v, self.opdict)
+		gs = list(gs)
+		for port_index in range(3):
+			if gs[port_index] == 0:
+				sign = -1 if port_index == 2 else +1
+				gs[port_index] = sign*options.gmin*2
+		self.opdict.update({'gmd':gs[0], 'gm':gs[1], 'gmb':gs[2]})
+		return Ids, gs
+
+	def get_vec_model(self):
+		"""Devices sharing a model are evaluated all together, 
+		through mosq_mos_model.get_i_and_g_vec().
+		"""
+		return self.mosq_model
+
+	def get_vec_params(self):
+		"""Returns: the device parameters needed by the vectorized model."""
+		svt, skp = self.mosq_model.get_svt_skp(self.device)
+		return {"W":self.device.W, "L":self.device.L, "M":float(self.device.M), \
+			"N":float(self.device.N), "svt":svt, "skp":skp}
+
 	def get_value_function(self, identifier):
 		def get_value(self):
 			return self.opdict[identifier]
@@ -232,6 +275,7 @@ class mosq_device:
 			self.device.mckey = mckey
 		else:
 			self.device.mckey = None
+		devices.params_changed()
 
 class scaling_holder: pass # will hold the scaling factors
 
@@ -239,7 +283,7 @@ class mosq_mos_model:
 	def __init__(self, name=None, TYPE='n', TNOM=None, COX=None, \
 	GAMMA=None, NSUB=None, PHI=None, VTO=None, KP=None, \
 	LAMBDA=None, AKP=None, AVT=None,\
-	TOX=None, VFB=None, U0=None, TCV=None, BEX=None):
+	TOX=None, VFB=None, U0=None, TCV=None, BEX=None, KF=None, AF=None):
 		
 		self.scaling = scaling_holder()
 
@@ -295,6 +339,9 @@ class mosq_mos_model:
 		# Intrinsic model temperature parameters
 		self.TCV = self.NPMOS*float(TCV) if TCV is not None else self.NPMOS*TCV_DEFAULT
 		self.BEX = float(BEX) if BEX is not None else BEX_DEFAULT
+		# flicker noise
+		self.KF = float(KF) if KF is not None else KF_DEFAULT
+		self.AF = float(AF) if AF is not None else AF_DEFAULT
 	
 		# Monte carlo
 		self.AVT = AVT if AVT is not None else AVT_DEFAULT
@@ -388,6 +435,10 @@ class mosq_mos_model:
 
 		#print "PHI:", self.PHI, "vbs:", vbs
 		VT = self.VTO + svt + self.GAMMA*(math.sqrt(-vbs+2*self.PHI) - math.sqrt(2*self.PHI))
+		return self._get_ids(device, (vds, vgs, vbs), CS_FACTOR, skp, VT, opdict)
+
+	def _get_ids(self, device, (vds, vgs, vbs), CS_FACTOR, skp, VT, opdict):
+		"""Returns IDS from the swapped voltages, as get_ids() does."""
 		if vgs < VT:
 			ids = options.iea*(vgs/VT+vds/VT)/100 
 		else:
@@ -476,6 +527,122 @@ class mosq_mos_model:
 		gm = CS_FACTOR * self.NPMOS * (1+skp) * gm * device.M/device.N
 		return gm
 
+	def get_ids_and_g(self, device, (vds, vgs, vbs), opdict=None, debug=False):
+		"""Returns:
+			IDS, the drain-to-source current (de-normalized),
+			(gmd, gm, gmb), the transconductances.
+		Same as get_ids(), get_gmd(), get_gm() and get_gmb(), but the 
+		swap, VT and the Monte Carlo parameters are computed only once.
+		"""
+		if debug: 
+			print "=== Current for vds:", vds, "vgs:", vgs, "vbs:", vbs
+		(vds, vgs, vbs), CS_FACTOR = self.get_voltages(vds, vgs, vbs)
+		svt, skp = self.get_svt_skp(device, debug=debug)
+		VT = self.VTO + svt + self.GAMMA*(math.sqrt(-vbs+2*self.PHI) - math.sqrt(2*self.PHI))
+		Ids = self._get_ids(device, (vds, vgs, vbs), CS_FACTOR, skp, VT, opdict)
+
+		# the transconductances use VTO and not VT, as the get_g*() methods do
+		WoL = device.W/device.L
+		sq = (2*self.PHI - vbs)**(1.0/2)
+		vgb = -self.GAMMA*(-2**(1.0/2)*self.PHI**(1.0/2) + sq)
+		if vgs < VT:
+			gmd = gm = options.iea/VT/100 
+			gmb = 0
+		elif vds < vgs - VT:
+			gmd = self.KP*WoL*(vgb - 1.0*vds + vgs - self.VTO)
+			gm = self.KP*WoL*vds
+			gmb = self.KP*self.GAMMA*vds*device.W/(2*device.L*sq)
+		else:
+			gmd = 0.5*self.KP*self.LAMBDA*WoL*(vgb + vgs - self.VTO)**2
+			gm = -0.5*self.KP*self.LAMBDA*WoL*(vgb + vgs - self.VTO)**2 \
+				+ 0.5*self.KP*WoL*(self.LAMBDA*(-vgb + vds - vgs + self.VTO) + 1.0)*(2*vgb + 2*vgs - 2*self.VTO)
+			gmb = -0.25*self.KP*self.GAMMA*self.LAMBDA*device.W*(vgb + vgs - self.VTO)**2/(device.L*sq) \
+				+ 0.5*self.KP*self.GAMMA*device.W*(self.LAMBDA*(-vgb + vds - vgs + self.VTO) + 1.0)*(vgb + vgs - self.VTO)/(device.L*sq)
+		gmd = (1+skp) * gmd * device.M/device.N
+		gm = self.NPMOS * (1+skp) * gm * device.M/device.N
+		# get_gmb() flips the sign of swapped devices
+		gmb = (self.NPMOS if CS_FACTOR > 0 else -1) * (1+skp) * gmb * device.M/device.N
+		return Ids, (gmd, gm, gmb)
+
+	def get_ids_vec(self, ports_v, params):
+		"""Vectorized version of get_ids(), evaluates all at once the 
+		devices sharing this model.
+		ports_v: array, one row per device: (vds, vgs, vbs)
+		params: dictionary of arrays, as returned by mosq_device.get_vec_params()
+		
+		Returns: array of IDS
+		"""
+		return self._get_ids_and_g_vec(ports_v, params)[0]
+
+	def get_g_vec(self, ports_v, params):
+		"""Vectorized version of get_gmd(), get_gm() and get_gmb(), 
+		see get_ids_vec().
+		
+		Returns: array, one row per device: (gmd, gm, gmb)
+		"""
+		return self._get_ids_and_g_vec(ports_v, params)[1]
+
+	def get_i_and_g_vec(self, ports_v, params):
+		"""Evaluates the current and the transconductances of all the 
+		devices, exactly as mosq_device.i() and mosq_device.g() would.
+		See get_ids_vec().
+
+		Returns: (Ids, g), g having one row per device: (gmd, gm, gmb)
+		"""
+		Ids, g = self._get_ids_and_g_vec(ports_v, params)
+		# see mosq_device.g()
+		gmin_sign = numpy.array([+1, +1, -1])
+		g = numpy.where(g == 0, gmin_sign*options.gmin*2, g)
+		return Ids, g
+
+	def get_voltages_vec(self, vds, vgs, vbs):
+		"""Vectorized version of get_voltages(). CS is an array."""
+		vds = vds*self.NPMOS
+		vgs = vgs*self.NPMOS
+		vbs = vbs*self.NPMOS
+		swap = vds < 0
+		cs = numpy.where(swap, -1, +1)
+		return (numpy.where(swap, -vds, vds), numpy.where(swap, vgs - vds, vgs), \
+			numpy.where(swap, vbs - vds, vbs)), cs
+
+	def _get_ids_and_g_vec(self, ports_v, params):
+		(vds, vgs, vbs), CS_FACTOR = self.get_voltages_vec(ports_v[:, 0], ports_v[:, 1], ports_v[:, 2])
+		svt, skp = params["svt"], params["skp"]
+		WoL = params["W"]/params["L"]
+		MoN = params["M"]/params["N"]
+
+		VT = self.VTO + svt + self.GAMMA*(numpy.sqrt(-vbs+2*self.PHI) - math.sqrt(2*self.PHI))
+		off = vgs < VT
+		lin = numpy.logical_and(numpy.logical_not(off), vds < vgs - VT)
+
+		ids = numpy.where(off, options.iea*(vgs/VT+vds/VT)/100, \
+			numpy.where(lin, (skp+1)*self.KP*WoL*((vgs-VT)*vds - .5*vds**2), \
+			(skp+1)*.5*self.KP*WoL*(vgs-VT)**2*(1+self.LAMBDA*(vds-vgs+VT))))
+		Ids = CS_FACTOR * self.NPMOS * MoN * ids
+
+		# the transconductances use VTO and not VT, as the scalar methods do
+		sq = numpy.sqrt(2*self.PHI - vbs)
+		vgb = -self.GAMMA*(-2**(1.0/2)*self.PHI**(1.0/2) + sq)
+		gmd = numpy.where(off, options.iea/VT/100, \
+			numpy.where(lin, self.KP*WoL*(vgb - 1.0*vds + vgs - self.VTO), \
+			0.5*self.KP*self.LAMBDA*WoL*(vgb + vgs - self.VTO)**2))
+		gmd = (1+skp) * gmd * MoN
+
+		gm = numpy.where(off, options.iea/VT/100, \
+			numpy.where(lin, self.KP*WoL*vds, \
+			-0.5*self.KP*self.LAMBDA*WoL*(vgb + vgs - self.VTO)**2 \
+			+ 0.5*self.KP*WoL*(self.LAMBDA*(-vgb + vds - vgs + self.VTO) + 1.0)*(2*vgb + 2*vgs - 2*self.VTO)))
+		gm = self.NPMOS * (1+skp) * gm * MoN
+
+		gmb = numpy.where(off, 0, \
+			numpy.where(lin, self.KP*self.GAMMA*vds*params["W"]/(2*params["L"]*sq), \
+			-0.25*self.KP*self.GAMMA*self.LAMBDA*params["W"]*(vgb + vgs - self.VTO)**2/(params["L"]*sq) \
+			+ 0.5*self.KP*self.GAMMA*params["W"]*(self.LAMBDA*(-vgb + vds - vgs + self.VTO) + 1.0)*(vgb + vgs - self.VTO)/(params["L"]*sq)))
+		# get_gmb() flips the sign of swapped devices
+		gmb = numpy.where(CS_FACTOR < 0, -1, self.NPMOS) * (1+skp) * gmb * MoN
+
+		return Ids, numpy.column_stack((gmd, gm, gmb))
+
 	def _self_check(self):
 		"""Performs sanity check on the model parameters."""
 		ret = True, ""
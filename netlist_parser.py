@@ -1159,6 +1159,12 @@ def parse_analysis(circ, directives):
 					analysis.append(parse_ic_directive(line, line_elements))
 				elif line_elements[0] == ".symbolic":
 					analysis.append(parse_an_symbolic(line, circ, line_elements))
+				elif line_elements[0] == ".sens":
+					analysis.append(parse_an_sens(line, circ, line_elements))
+				elif line_elements[0] == ".noise":
+					analysis.append(parse_an_noise(line, circ, line_elements))
+				elif line_elements[0] == ".actransfer":
+					analysis.append(parse_an_ac_transfer(line, circ, line_elements))
 				else:
 					raise NetlistParseError("Unknown directive.")
 			except NetlistParseError, (msg,):
@@ -1426,6 +1432,115 @@ def parse_an_symbolic(line, circ, line_elements=None):
 	
 	return {"type":"symbolic", "source":source_name, 'ac':ac}
 
+def parse_an_sens(line, circ, line_elements=None):
+	"""Parses a sensitivity analysis:
+	
+	Directive is:
+	.SENS output=<v(node)|v(node1,node2)|i(elem)> [start=<float> stop=<float> nsteps=<integer>]
+
+	The AC sensitivities are computed only if start, stop and nsteps 
+	are set.
+	"""
+	if line_elements is None:
+		line_elements = line.split()
+	
+	output = None
+	start = None
+	stop = None
+	nsteps = None
+	
+	for token in line_elements[1:]:
+		if token[0] == "*":
+			break
+		(label, value) = parse_param_value_from_string(token)
+		if label == 'output':
+			output = value
+		elif label == 'start':
+			start = convert_units(value)
+		elif label == 'stop':
+			stop = convert_units(value)
+		elif label == 'nsteps':
+			nsteps = convert_units(value)
+		else:
+			raise NetlistParseError("")
+	
+	if output is None:
+		raise NetlistParseError("Required parameters are missing.")
+	if (start, stop, nsteps).count(None) not in (0, 3):
+		raise NetlistParseError("start, stop and nsteps are required for AC sensitivities.")
+	
+	return {"type":"sens", "output":output, "start":start, "stop":stop, "nsteps":nsteps}
+
+def parse_an_noise(line, circ, line_elements=None):
+	"""Parses a noise analysis:
+	
+	Directive is:
+	.NOISE output=<v(node)|v(node1,node2)|i(elem)> start=<float> stop=<float> nsteps=<integer>
+	"""
+	if line_elements is None:
+		line_elements = line.split()
+	
+	output = None
+	start = None
+	stop = None
+	nsteps = None
+	
+	for token in line_elements[1:]:
+		if token[0] == "*":
+			break
+		(label, value) = parse_param_value_from_string(token)
+		if label == 'output':
+			output = value
+		elif label == 'start':
+			start = convert_units(value)
+		elif label == 'stop':
+			stop = convert_units(value)
+		elif label == 'nsteps':
+			nsteps = convert_units(value)
+		else:
+			raise NetlistParseError("")
+	
+	if output is None or start is None or stop is None or nsteps is None:
+		raise NetlistParseError("Required parameters are missing.")
+	
+	return {"type":"noise", "output":output, "start":start, "stop":stop, "nsteps":nsteps}
+
+def parse_an_ac_transfer(line, circ, line_elements=None):
+	"""Parses an AC transfer analysis:
+	
+	Directive is:
+	.ACTRANSFER start=<float> stop=<float> nsteps=<integer> [sources=<src1>[,<src2>...]]
+
+	If sources is not set, every source with an AC value is used.
+	"""
+	if line_elements is None:
+		line_elements = line.split()
+	
+	start = None
+	stop = None
+	nsteps = None
+	sources = None
+	
+	for token in line_elements[1:]:
+		if token[0] == "*":
+			break
+		(label, value) = parse_param_value_from_string(token)
+		if label == 'start':
+			start = convert_units(value)
+		elif label == 'stop':
+			stop = convert_units(value)
+		elif label == 'nsteps':
+			nsteps = convert_units(value)
+		elif label == 'sources':
+			sources = [name for name in value.split(",") if len(name)]
+		else:
+			raise NetlistParseError("")
+	
+	if start is None or stop is None or nsteps is None:
+		raise NetlistParseError("Required parameters are missing.")
+	
+	return {"type":"actransfer", "start":start, "stop":stop, "nsteps":nsteps, "sources":sources}
+
 def is_valid_value_param_string(astr):
 	"""Has the string a form like <param_name>=<value>?
 	No spaces.
@@ -0,0 +1,162 @@
+# -*- coding: iso-8859-1 -*-
+# noise.py
+# Small signal noise analysis
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Small signal noise analysis, by the adjoint method.
+
+Every noise source is a current between two nodes, uncorrelated with
+the others. Its contribution to the output y = c^T x is its power
+spectral density times |lambda[n1] - lambda[n2]|^2, where lambda solves
+the transposed AC system:
+
+	(G + j*omega*C)^T lambda = c
+
+so a single (transposed) solve per frequency gives the transfer of
+every source to the output.
+
+The sources are:
+ - resistors: thermal noise, 4kT/R,
+ - elements providing get_noise(ports_v) (diodes and MOS transistors),
+   that returns the white and the flicker (at 1 Hz) densities of the
+   current in their output port, evaluated at the operating point.
+
+The sweep variable is the angular frequency, as in the AC analysis, the
+flicker noise scales as 1/f = 2*pi/omega.
+"""
+
+import sys
+import numpy, scipy.sparse
+
+import dc_analysis, ac, sens, linsolve, devices, constants, options, printing, \
+	results, ticker, utilities
+
+def noise_analysis(circ, output, start, stop, nsteps, step_type=options.ac_log_step, xop=None, \
+	data_filename="stdout", verbose=3):
+	"""Computes the power spectral density of the noise at output, in
+	total and per device, over an AC sweep.
+
+	output: 'v(node)', 'v(node1,node2)' or 'i(element)' (the current in
+	a voltage defined element).
+	xop: the operating point, if None an OP analysis is run.
+
+	Returns: a results.noise_solution instance or None if the system is
+	singular at some frequency.
+	"""
+	c = sens.get_output_vector(circ, output)
+	omegas = ac._get_omegas(start, nsteps, stop, step_type)
+
+	printing.print_info_line(("Starting noise analysis of %s: " % (output,), 3), verbose)
+
+	(mna, N) = dc_analysis.generate_mna_and_N(circ)
+	del N
+	mna = utilities.remove_row_and_col(mna)
+	sparse = scipy.sparse.issparse(mna)
+	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose, sparse=sparse)
+	AC = ac.generate_AC(circ, [mna.shape[0], mna.shape[0]], sparse=sparse)
+	AC = utilities.remove_row_and_col(AC)
+
+	if xop is None:
+		printing.print_info_line(("Starting OP analysis...", 3), verbose, print_nl=False)
+		xop = dc_analysis.op_analysis(circ, verbose=0)
+		if xop is None:
+			printing.print_info_line(("failed.", 3), verbose)
+			printing.print_general_error("OP analysis failed, no operating point available. Quitting.")
+			sys.exit(3)
+		printing.print_info_line(("done.", 3), verbose)
+	x = xop.asmatrix()
+	if circ.is_nonlinear():
+		J = ac.generate_J(xop=x, circ=circ, mna=mna, Nac=None, data_filename=data_filename, verbose=verbose)
+	else:
+		J = 0
+	G = mna + J + Gmin_matrix
+
+	sources = noise_sources(circ, x)
+	printing.print_info_line(("%d noise sources." % (len(sources.names),), 3), verbose)
+	sol = results.noise_solution(circ, output, sources.names, opoints=len(omegas), stype=step_type, \
+		op=xop, outfile=data_filename)
+
+	# the pattern is the same at every frequency
+	lu = linsolve.lu_cache()
+	j = numpy.complex('j')
+	printing.print_info_line(("Solving... ", 3), verbose, print_nl=False)
+	tick = ticker.ticker(increments_for_step=1)
+	tick.display(verbose > 1)
+	for omega in omegas:
+		try:
+			lam = lu.factor(G + j*omega*AC).solve_transposed(c)
+		except numpy.linalg.linalg.LinAlgError:
+			tick.hide(verbose > 1)
+			printing.print_general_error("NOISE: the system is singular at w = %g rad/s." % (omega,))
+			return None
+		sol.add_line(omega, sources.densities(lam, omega))
+		tick.step(verbose > 1)
+	tick.hide(verbose > 1)
+
+	printing.print_info_line(("done.", 3), verbose)
+	sol.write_to_file()
+	return sol
+
+class noise_sources:
+	"""The noise current sources of circ, at the operating point x
+	(REDUCED). One per element: nodes[k] are the nodes it is connected
+	to, white[k] its white noise density and flicker[k] its flicker
+	noise density at 1 Hz.
+	"""
+	def __init__(self, circ, x):
+		names, nodes, white, flicker = [], [], [], []
+		for elem in circ.elements:
+			if isinstance(elem, devices.resistor):
+				densities = (4*constants.k*constants.T/abs(elem.R), 0.0)
+				port = (elem.n1, elem.n2)
+			elif hasattr(elem, "get_noise"):
+				densities = elem.get_noise(_get_ports_v(elem, x))
+				port = elem.get_output_ports()[0]
+			else:
+				continue
+			names.append((elem.letter_id + elem.descr).upper())
+			nodes.append(port)
+			white.append(densities[0])
+			flicker.append(densities[1])
+		self.names = names
+		self.nodes = numpy.array(nodes, dtype=int).reshape((-1, 2))
+		self.white = numpy.array(white, dtype=float)
+		self.flicker = numpy.array(flicker, dtype=float)
+
+	def densities(self, lam, omega):
+		"""Returns: the array of the contributions of every source to the
+		noise density at the output, given the solution lam (REDUCED) of
+		the transposed system at omega.
+		"""
+		lam = numpy.concatenate(([0], numpy.asarray(lam).ravel()))
+		transfer = lam[self.nodes[:, 0]] - lam[self.nodes[:, 1]]
+		return (transfer.real**2 + transfer.imag**2)*(self.white + self.flicker*2*numpy.pi/omega)
+
+def _get_ports_v(elem, x):
+	"""Returns: the list of the voltages across the drive ports of the
+	(nonlinear) element elem, x being REDUCED.
+	"""
+	ports_v = []
+	for port in elem.get_drive_ports(0):
+		v = 0
+		if port[0]:
+			v = v + x[port[0] - 1, 0]
+		if port[1]:
+			v = v - x[port[1] - 1, 0]
+		ports_v.append(v)
+	return ports_v
@@ -40,6 +40,27 @@ nl_voltages_lock_factor = 4  	# if we allow the voltage on controlling ports to
 use_standard_solve_method = True
 use_gmin_stepping = True
 use_source_stepping = True
+# evaluate the nonlinear devices sharing a model all together (see 
+# dc_analysis.nl_table), instead of one at a time
+vectorized_devices = True
+
+# sparse matrices
+# if use_sparse is set, the MNA system is assembled with scipy.sparse
+# and solved with a sparse LU factorization whenever the reduced system
+# has at least sparse_threshold unknowns. Smaller systems are faster dense.
+use_sparse = False
+sparse_threshold = 200
+
+# results
+# the DC, AC, MC and TRAN results are written to their CSV file in blocks
+# of (at most) results_buffer_rows lines or, whichever comes first, every
+# results_flush_interval seconds
+results_buffer_rows = 1000
+results_flush_interval = 1.0
+# 'csv': text files, 'bin': binary files (see binlib.py), whose variables
+# are memory-mapped instead of parsed when they are accessed. Output to
+# stdout is always CSV.
+results_format = 'csv'
 
 # dc
 dc_max_nr_iter = 10000
@@ -47,6 +68,9 @@ dc_max_guess_effort = 250000
 dc_log_step = 'LOG'
 dc_lin_step = 'LIN'
 dc_sweep_skip_allowed = True
+# number of worker processes a DC sweep is split among: 1 solves the 
+# sweep in the calling process, 0 uses one worker per CPU
+dc_sweep_workers = 1
 
 # transient
 default_tran_method = "IMPLICIT_EULER"
@@ -60,6 +84,21 @@ transient_use_aposteriori_step_control = True
 # very close to the one we already used. 0.9 seems to be a good idea.
 transient_aposteriori_step_threshold = 0.9
 cmin=1e-18
+# the coefficients of the differentiation formulae are cached (see 
+# df_coeff.py), with the ratios of the past time steps to the current
+# one, rounded to transient_df_ratio_resolution, as key. At most 
+# transient_df_cache_size of them are kept.
+transient_df_cache_size = 1000
+transient_df_ratio_resolution = 1e-12
+# linear circuits are solved with a single back substitution per time
+# step, factoring the system matrix only when the step changes
+transient_linear_fast_path = True
+# the time steps end exactly on the corners of the waveforms of the
+# sources (see devices.pulse.breakpoints()) with step control, where the
+# DF is restarted and the step is reduced by transient_breakpoint_step_factor.
+# Fixed step analyses (and shooting) keep the time points tstart + k*tstep.
+transient_use_breakpoints = True
+transient_breakpoint_step_factor = 0.01
 
 # shooting
 shooting_default_points = 100
@@ -73,6 +112,36 @@ ac_log_step = 'LOG'
 ac_lin_step = 'LIN'
 ac_max_nr_iter = 20
 ac_phase_in_deg = False
+# number of worker processes the frequency points of an AC analysis are
+# split among: 1 solves them in the calling process, 0 uses one worker
+# per CPU
+ac_sweep_workers = 1
+# reduce the AC system to Hessenberg form once and solve every frequency 
+# in O(n^2), instead of factoring the system at every frequency (dense 
+# systems only, see ac.hessenberg_pencil). The reduction is not used if 
+# the reciprocal condition number of the real part of the system is 
+# below ac_hessenberg_min_rcond.
+ac_use_hessenberg = False
+ac_hessenberg_min_rcond = 1e-12
+# solve a reduced order model of the AC system (see mor.py), built with
+# ac_mor_order Krylov iterations at each of ac_mor_expansion_points 
+# frequencies, log-spaced over the sweep. The model is checked against
+# the full system at ac_mor_check_points frequencies and a warning is
+# printed if the relative error exceeds ac_mor_tolerance.
+ac_use_mor = False
+ac_mor_order = 10
+ac_mor_expansion_points = 3
+ac_mor_check_points = 3
+ac_mor_tolerance = 1e-3
+# adaptive AC sweep: the sweep is refined, halving its intervals, until
+# in the middle of every interval the solution is within 
+# ac_adaptive_mag_tol dB and ac_adaptive_phase_tol degrees of the
+# interpolation of the solutions at its ends, or until 
+# ac_adaptive_max_points points have been solved.
+ac_adaptive = False
+ac_adaptive_mag_tol = 0.1
+ac_adaptive_phase_tol = 1.0
+ac_adaptive_max_points = 10000
 
 #plotting
 # Set to None to disable writing plots to disk
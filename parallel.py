@@ -0,0 +1,80 @@
+# -*- coding: iso-8859-1 -*-
+# parallel.py
+# Helpers to run independent parts of an analysis in worker processes
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Sweeps (DC, AC) are split in contiguous chunks of points, every chunk is
+solved by a worker process on its own copy of the circuit and the results
+are handed back in sweep order.
+
+The job function has to be defined at module level (it is pickled by
+name) and so have to be its arguments. The workers are forked: they
+start with the same options as the parent.
+"""
+
+import multiprocessing
+
+def get_n_of_workers(workers):
+	"""Returns: the number of worker processes to be used.
+	workers: the requested number, 0 or a negative value mean one per CPU.
+	"""
+	if workers <= 0:
+		try:
+			workers = multiprocessing.cpu_count()
+		except NotImplementedError:
+			workers = 1
+	return workers
+
+def split(values, n_of_chunks):
+	"""Splits the list values in (at most) n_of_chunks contiguous chunks
+	of about the same length.
+
+	Returns: a list of lists.
+	"""
+	n_of_chunks = max(min(n_of_chunks, len(values)), 1)
+	size, extra = divmod(len(values), n_of_chunks)
+	chunks = []
+	start = 0
+	for index in xrange(n_of_chunks):
+		stop = start + size + (1 if index < extra else 0)
+		chunks.append(values[start:stop])
+		start = stop
+	return chunks
+
+def imap(job, jobs_args, workers):
+	"""Calls job(args) for every args in jobs_args.
+
+	If workers is greater than 1, the jobs are run in a pool of that many
+	processes, otherwise they are run in the calling process.
+
+	Returns: an iterator over the return values of job, in the same order
+	as jobs_args. Every value is available as soon as its job (and the
+	preceding ones) are done.
+	"""
+	if workers <= 1 or len(jobs_args) <= 1:
+		for args in jobs_args:
+			yield job(args)
+		return
+	pool = multiprocessing.Pool(processes=min(workers, len(jobs_args)))
+	try:
+		for ret in pool.imap(job, jobs_args):
+			yield ret
+		pool.close()
+	finally:
+		pool.terminate()
+		pool.join()
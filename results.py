@@ -22,7 +22,7 @@ This is the results module of the simulator.
 """
 import sys, time, copy
 import numpy
-import circuit, devices, printing, options, constants, csvlib
+import circuit, devices, printing, options, constants, csvlib, binlib
 from ahkab import __version__
 VERSION = __version__
 csvlib.SEPARATOR = "\t"
@@ -304,7 +304,7 @@ class ac_solution:
 		self.ostart, self.ostop, self.opoints = ostart, ostop, opoints
 		self.filename = outfile
 
-		self._init_file_done = False
+		self._lock = False
 
 		#We have mixed current and voltage results
 		# per primi vengono tanti valori di tensioni quanti sono i nodi del circuito meno uno,
@@ -336,21 +336,29 @@ class ac_solution:
 				self.units.update({varname_abs:"A"})
 				self.units.update({varname_arg:""})
 
+		self._writer = _get_writer(self.filename, self.variables, self.units)
+
 	def __str__(self):
 		return "<AC simulation results for %s (netlist %s). %s sweep, from %g Hz to %g Hz, %d points. Run on %s, data filename %s.>" % \
 		(self.netlist_title, self.netlist_file, self.stype, self.ostart, self.ostop, self.opoints,self.timestamp, self.filename)
 
 	def add_line(self, omega, x):
-		omega = numpy.mat(numpy.array([omega]))
+		"""Adds a solution and its corresponding angular frequency to the results set.
+		"""
+		if self._lock:
+			printing.print_general_error("Attempting to add values to a complete result set. BUG")
+			return
+		x = numpy.asarray(x)[:, 0]
+		data = numpy.empty((2*x.shape[0] + 1, 1))
+		data[0, 0] = omega
+		data[1::2, 0] = numpy.abs(x)
+		data[2::2, 0] = numpy.angle(x, deg=options.ac_phase_in_deg)
+		self._writer.write(data)
 
-		xsplit = numpy.mat(numpy.zeros((x.shape[0]*2, 1)))
-		for i in range(x.shape[0]):
-			xsplit[2*i, 0] = numpy.abs(x[i,0])
-			xsplit[2*i+1, 0] = numpy.angle(x[i,0],deg=options.ac_phase_in_deg)
-			 
-		data = numpy.concatenate((omega, xsplit), axis=0) 
-		csvlib.write_csv(self.filename, data, self.variables, append=self._init_file_done)
-		self._init_file_done = True
+	def lock(self):
+		"""Marks the results set as complete and closes its file."""
+		self._lock = True
+		self._writer.close()
 
 	def get_type(self):
 		return "AC"
@@ -365,13 +373,13 @@ class ac_solution:
 
 	def __getitem__(self, name):
 		"""Get a specific variable, as from a dictionary."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name], nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, [name])
 		return data
 
 	def get(self, name, default=None):
 		"""Get a solution by variable name."""
 		try:
-			data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name], nsamples=None, skip=0L)
+			data, headers, pos, EOF = _load_data(self._writer, [name])
 		except KeyError:
 			return default
 		return data
@@ -390,11 +398,11 @@ class ac_solution:
 
 	def values(self):
 		"""Get all of the results set's variables values."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		return data
 
 	def items(self):
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		vlist = []
 		for j in range(data.shape[0]):
 			vlist.append(data[j, :])
@@ -403,7 +411,7 @@ class ac_solution:
 	# iterator methods
 	def __iter__(self):
 		self.iter_index = 0
-		self.iter_data, self.iter_headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[], nsamples=None, skip=0L)
+		self.iter_data, self.iter_headers, pos, EOF = _load_data(self._writer, [])
 		return self
 
 	def next(self):
@@ -415,6 +423,372 @@ class ac_solution:
 			self.iter_index += 1
 		return next
 
+class ac_transfer_solution:
+	def __init__(self, circ, sources, opoints, stype, op, outfile):
+		"""Holds the results of an AC transfer analysis: the response of
+		every variable to a unit excitation of every source, as complex
+		values.
+			circ: the circuit instance of the simulated circuit
+			sources: the source elements, one per column of the matrix
+			opoints: the number of frequencies (storage is allocated 
+			for them beforehand)
+			stype: the sweep type
+			op: the linearization op used to compute the results
+			outfile: the file the results are saved to (write_to_file())
+		"""
+		self.timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+		self.netlist_file = circ.filename
+		self.netlist_title = circ.title
+		self.vea = options.vea
+		self.ver = options.ver
+		self.iea = options.iea
+		self.ier = options.ier
+		self.gmin = options.gmin
+		self.temp = constants.T
+		self.linearization_op = op
+		self.stype = stype
+		self.filename = outfile
+
+		nv_1 = len(circ.nodes_dict) - 1
+		self.variables = []
+		self.units = case_insensitive_dict()
+		for index in range(nv_1):
+			varname = ("V" + str(circ.nodes_dict[index + 1])).upper()
+			self.variables += [varname]
+			self.units.update({varname:"V"})
+		for elem in circ.elements:
+			if circuit.is_elem_voltage_defined(elem):
+				varname = ("I("+elem.letter_id.upper()+elem.descr+")").upper()
+				self.variables += [varname]
+				self.units.update({varname:"A"})
+		self.sources = [(elem.letter_id+elem.descr).upper() for elem in sources]
+
+		# one (variables x sources) complex matrix per frequency
+		self.points = 0
+		self.omegas = numpy.zeros((opoints,))
+		self.H = numpy.zeros((opoints, len(self.variables), len(self.sources)), dtype=complex)
+
+	def __str__(self):
+		return "<AC transfer results for %s (netlist %s). %s sweep, from %g to %g rad/s, %d points, %d sources. Run on %s, data filename %s.>" % \
+		(self.netlist_title, self.netlist_file, self.stype, self.omegas[0], self.omegas[self.points-1], \
+		self.points, len(self.sources), self.timestamp, self.filename)
+
+	def add_line(self, omega, X):
+		"""Stores X, the (variables x sources) matrix of the responses at
+		omega."""
+		if self.points == self.omegas.shape[0]:
+			self.omegas = numpy.resize(self.omegas, (2*self.points,))
+			self.H = numpy.resize(self.H, (2*self.points,) + self.H.shape[1:])
+		self.omegas[self.points] = omega
+		self.H[self.points, :, :] = X
+		self.points += 1
+
+	def get_type(self):
+		return "AC_TRANSFER"
+
+	def asarray(self):
+		"""Returns: the (frequencies x variables x sources) complex array
+		of the results."""
+		return self.H[:self.points]
+
+	def get_omegas(self):
+		return self.omegas[:self.points]
+
+	def get_transfer(self, variable, source):
+		"""Returns: the response of variable to a unit excitation of
+		source, at every frequency."""
+		return self.H[:self.points, self._index(self.variables, variable), self._index(self.sources, source)]
+
+	def _index(self, names, name):
+		try:
+			return map(str.upper, names).index(name.upper())
+		except ValueError:
+			raise KeyError, name
+
+	def write_to_file(self, filename=None):
+		"""Saves the results to filename (default: the outfile), in
+		numpy's npz format: the arrays w, H, variables and sources."""
+		if filename is None:
+			filename = self.filename
+		fp = open(filename, "wb")
+		numpy.savez(fp, w=self.get_omegas(), H=self.asarray(), variables=numpy.array(self.variables), \
+			sources=numpy.array(self.sources))
+		fp.close()
+
+	# Access as a dictionary BY VARIABLE NAME:
+	def __len__(self):
+		"""Get the number of variables in the results set."""
+		return len(self.variables)
+
+	def __getitem__(self, name):
+		"""Get the (frequencies x sources) responses of a variable."""
+		return self.H[:self.points, self._index(self.variables, name), :]
+
+	def get(self, name, default=None):
+		"""Get the responses of a variable by name."""
+		try:
+			return self[name]
+		except KeyError:
+			return default
+
+	def has_key(self, name):
+		"""Determine whether the result set contains a variable."""
+		return name.upper() in map(str.upper, self.variables)
+
+	def __contains__(self, name):
+		"""Determine whether the result set contains a variable."""
+		return name.upper() in map(str.upper, self.variables)
+
+	def keys(self):
+		"""Get all of the results set's variables names."""
+		return self.variables
+
+class sens_solution:
+	def __init__(self, circ, output, params, opoints, stype, op, outfile):
+		"""Holds the results of a sensitivity analysis: the derivatives
+		of output with respect to every parameter, in DC and, optionally,
+		over an AC sweep.
+			circ: the circuit instance of the simulated circuit
+			output: the output variable, eg. 'v(out)'
+			params: the sens.sens_parameters of the circuit
+			opoints: the number of AC frequencies (0 if none)
+			stype: the AC sweep type
+			op: the operating point
+			outfile: the file the results are saved to (write_to_file())
+		"""
+		self.timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+		self.netlist_file = circ.filename
+		self.netlist_title = circ.title
+		self.gmin = options.gmin
+		self.temp = constants.T
+		self.linearization_op = op
+		self.stype = stype
+		self.filename = outfile
+		self.output = output.upper()
+		self.names = params.names
+		self.values_dc = params.values_dc
+		self.values_ac = params.values_ac
+
+		self.output_dc = None
+		self.dc = None
+		self.points = 0
+		self.omegas = numpy.zeros((opoints,))
+		self.output_ac = numpy.zeros((opoints,), dtype=complex)
+		self.ac = numpy.zeros((opoints, len(self.names)), dtype=complex)
+
+	def __str__(self):
+		return "<Sensitivity results of %s for %s (netlist %s). %d parameters, %d AC points. Run on %s, data filename %s.>" % \
+		(self.output, self.netlist_title, self.netlist_file, len(self.names), self.points, self.timestamp, \
+		self.filename)
+
+	def set_dc(self, output, derivatives):
+		"""Stores the DC value of the output and its derivatives."""
+		self.output_dc = output
+		self.dc = derivatives
+
+	def add_line(self, omega, output, derivatives):
+		"""Stores the AC value of the output at omega and its derivatives."""
+		if self.points == self.omegas.shape[0]:
+			self.omegas = numpy.resize(self.omegas, (2*self.points,))
+			self.output_ac = numpy.resize(self.output_ac, (2*self.points,))
+			self.ac = numpy.resize(self.ac, (2*self.points, len(self.names)))
+		self.omegas[self.points] = omega
+		self.output_ac[self.points] = output
+		self.ac[self.points, :] = derivatives
+		self.points += 1
+
+	def get_type(self):
+		return "SENS"
+
+	def get_omegas(self):
+		return self.omegas[:self.points]
+
+	def get_ac(self, name=None):
+		"""Returns: the AC derivatives with respect to the parameter of
+		element name, at every frequency (all of them, one column per
+		parameter, if name is None)."""
+		if name is None:
+			return self.ac[:self.points]
+		return self.ac[:self.points, self._index(name)]
+
+	def get_normalized(self, name):
+		"""Returns: the DC normalized sensitivity, p/y * dy/dp."""
+		index = self._index(name)
+		return self.dc[index]*self.values_dc[index]/self.output_dc
+
+	def _index(self, name):
+		try:
+			return map(str.upper, self.names).index(name.upper())
+		except ValueError:
+			raise KeyError, name
+
+	def get_table_array(self):
+		table = [("Parameter", "Value", "Sensitivity", "Normalized")]
+		for index in range(len(self.names)):
+			if self.output_dc != 0:
+				normalized = "%g" % (self.dc[index]*self.values_dc[index]/self.output_dc,)
+			else:
+				normalized = "-"
+			table.append((self.names[index], "%g" % (self.values_dc[index],), "%g" % (self.dc[index],), normalized))
+		return table
+
+	def write_to_file(self, filename=None):
+		"""Saves the results to filename (default: the outfile), in
+		numpy's npz format: the arrays names, values_dc, values_ac, 
+		output_dc, dc, w, output_ac and ac.
+		The DC sensitivities are printed instead if filename is 'stdout'.
+		"""
+		if filename is None:
+			filename = self.filename
+		if filename == 'stdout':
+			print "Sensitivity of %s = %g:" % (self.output, self.output_dc)
+			print printing.table_setup(self.get_table_array())
+			return
+		fp = open(filename, "wb")
+		numpy.savez(fp, names=numpy.array(self.names), values_dc=self.values_dc, values_ac=self.values_ac, \
+			output_dc=self.output_dc, dc=self.dc, w=self.get_omegas(), output_ac=self.output_ac[:self.points], \
+			ac=self.get_ac())
+		fp.close()
+
+	# Access as a dictionary BY PARAMETER (ELEMENT) NAME:
+	def __len__(self):
+		"""Get the number of parameters in the results set."""
+		return len(self.names)
+
+	def __getitem__(self, name):
+		"""Get the DC derivative with respect to a parameter."""
+		return self.dc[self._index(name)]
+
+	def get(self, name, default=None):
+		"""Get the DC derivative by parameter name."""
+		try:
+			return self[name]
+		except KeyError:
+			return default
+
+	def has_key(self, name):
+		"""Determine whether the result set contains a parameter."""
+		return name.upper() in map(str.upper, self.names)
+
+	def __contains__(self, name):
+		"""Determine whether the result set contains a parameter."""
+		return name.upper() in map(str.upper, self.names)
+
+	def keys(self):
+		"""Get all of the results set's parameter names."""
+		return self.names
+
+class noise_solution:
+	def __init__(self, circ, output, names, opoints, stype, op, outfile):
+		"""Holds the results of a noise analysis: the power spectral 
+		density of the noise at output, per device and in total.
+			circ: the circuit instance of the simulated circuit
+			output: the output variable, eg. 'v(out)'
+			names: the names of the noisy elements
+			opoints: the number of frequencies
+			stype: the sweep type
+			op: the operating point
+			outfile: the file the results are saved to (write_to_file())
+		"""
+		self.timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime())
+		self.netlist_file = circ.filename
+		self.netlist_title = circ.title
+		self.gmin = options.gmin
+		self.temp = constants.T
+		self.linearization_op = op
+		self.stype = stype
+		self.filename = outfile
+		self.output = output.upper()
+		self.units = "V^2/Hz" if self.output[0] == 'V' else "A^2/Hz"
+		self.names = names
+
+		self.points = 0
+		self.omegas = numpy.zeros((opoints,))
+		self.densities = numpy.zeros((opoints, len(self.names)))
+
+	def __str__(self):
+		return "<Noise results of %s for %s (netlist %s). %d noise sources, %d points. Run on %s, data filename %s.>" % \
+		(self.output, self.netlist_title, self.netlist_file, len(self.names), self.points, self.timestamp, \
+		self.filename)
+
+	def add_line(self, omega, densities):
+		"""Stores the contributions of the devices at omega."""
+		if self.points == self.omegas.shape[0]:
+			self.omegas = numpy.resize(self.omegas, (2*self.points,))
+			self.densities = numpy.resize(self.densities, (2*self.points, len(self.names)))
+		self.omegas[self.points] = omega
+		self.densities[self.points, :] = densities
+		self.points += 1
+
+	def get_type(self):
+		return "NOISE"
+
+	def get_omegas(self):
+		return self.omegas[:self.points]
+
+	def get_total(self):
+		"""Returns: the total noise density at the output, at every
+		frequency [V^2/Hz or A^2/Hz]."""
+		return self.densities[:self.points].sum(axis=1)
+
+	def get_densities(self):
+		"""Returns: the (frequencies x devices) array of the 
+		contributions of every device."""
+		return self.densities[:self.points]
+
+	def _index(self, name):
+		try:
+			return map(str.upper, self.names).index(name.upper())
+		except ValueError:
+			raise KeyError, name
+
+	def write_to_file(self, filename=None):
+		"""Saves the results to filename (default: the outfile), in
+		numpy's npz format: the arrays names, w, densities and total.
+		The total density is printed instead if filename is 'stdout'.
+		"""
+		if filename is None:
+			filename = self.filename
+		if filename == 'stdout':
+			table = [("w [rad/s]", "noise [%s]" % (self.units,))]
+			for omega, total in zip(self.get_omegas(), self.get_total()):
+				table.append(("%g" % (omega,), "%g" % (total,)))
+			print "Noise at %s:" % (self.output,)
+			print printing.table_setup(table)
+			return
+		fp = open(filename, "wb")
+		numpy.savez(fp, names=numpy.array(self.names), w=self.get_omegas(), densities=self.get_densities(), \
+			total=self.get_total())
+		fp.close()
+
+	# Access as a dictionary BY DEVICE NAME:
+	def __len__(self):
+		"""Get the number of noisy devices in the results set."""
+		return len(self.names)
+
+	def __getitem__(self, name):
+		"""Get the contribution of a device, at every frequency."""
+		return self.densities[:self.points, self._index(name)]
+
+	def get(self, name, default=None):
+		"""Get the contribution of a device by name."""
+		try:
+			return self[name]
+		except KeyError:
+			return default
+
+	def has_key(self, name):
+		"""Determine whether the result set contains a device."""
+		return name.upper() in map(str.upper, self.names)
+
+	def __contains__(self, name):
+		"""Determine whether the result set contains a device."""
+		return name.upper() in map(str.upper, self.names)
+
+	def keys(self):
+		"""Get all of the results set's device names."""
+		return self.names
+
 class dc_solution:
 	def __init__(self, circ, start, stop, sweepvar, stype, outfile):
 		"""Holds a set of DC results.
@@ -439,7 +813,7 @@ class dc_solution:
 		self.stype = stype
 		self.filename = outfile
 
-		self._init_file_done = False
+		self._lock = False
 
 		#We have mixed current and voltage results
 		# per primi vengono tanti valori di tensioni quanti sono i nodi del circuito meno uno,
@@ -468,6 +842,8 @@ class dc_solution:
 				self.variables += [varname]
 				self.units.update({varname:"A"})
 
+		self._writer = _get_writer(self.filename, self.variables, self.units)
+
 	def __str__(self):
 		return "<DC simulation results for %s (netlist %s). %s sweep of %s from %g %s to %g %s. Run on %s, data filename %s.>" % \
 		(self.netlist_title, self.netlist_file, self.stype, self.variables[0].upper(), \
@@ -477,11 +853,18 @@ class dc_solution:
 		"""A DC sweep is made of a set of OP points. This method adds an OP solution and its corresponding 
 		sweep value to the results set.
 		"""
+		if self._lock:
+			printing.print_general_error("Attempting to add values to a complete result set. BUG")
+			return
 		sweepvalue = numpy.mat(numpy.array([sweepvalue]))
 		x = op.asmatrix()
 		data = numpy.concatenate((sweepvalue, x), axis=0)
-		csvlib.write_csv(self.filename, data, copy.copy(self.variables), append=self._init_file_done)
-		self._init_file_done = True
+		self._writer.write(data)
+
+	def lock(self):
+		"""Marks the results set as complete and closes its file."""
+		self._lock = True
+		self._writer.close()
 
 	def get_type(self):
 		return "DC"
@@ -496,12 +879,12 @@ class dc_solution:
 
 	def __getitem__(self, name):
 		"""Get a specific variable, as from a dictionary."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name], nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, [name])
 		return data
 
 	def get(self, name, default=None):
 		try:
-			data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name], nsamples=None, skip=0L)
+			data, headers, pos, EOF = _load_data(self._writer, [name])
 		except KeyError:
 			return default
 		return data
@@ -520,11 +903,11 @@ class dc_solution:
 
 	def values(self):
 		"""Get all of the results set's variables values."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		return data
 
 	def items(self):
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		vlist = []
 		for j in range(data.shape[0]):
 			vlist.append(data[j, :])
@@ -533,7 +916,7 @@ class dc_solution:
 	# iterator methods
 	def __iter__(self):
 		self.iter_index = 0
-		self.iter_data, self.iter_headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[], nsamples=None, skip=0L)
+		self.iter_data, self.iter_headers, pos, EOF = _load_data(self._writer, [])
 		return self
 
 	def next(self):
@@ -593,7 +976,8 @@ class mc_solution:
 			varname = "MCKEY%d" % (i,)
 			self.variables += [varname]
 			self.units.update({varname:""})
-		csvlib.write_headers(self.filename, copy.copy(self.variables))
+		self._lock = False
+		self._writer = _get_writer(self.filename, self.variables, self.units)
 
 	def __str__(self):
 		return "<MONTE CARLO OP simulation results for %s (netlist %s). %s sweep of %s from %g %s to %g %s. Run on %s, data filename %s.>" % \
@@ -604,10 +988,18 @@ class mc_solution:
 		"""A MONTE CARLO OP is made of a set of OP points. This method adds an OP solution and its corresponding 
 		key values to the results set.
 		"""
+		if self._lock:
+			printing.print_general_error("Attempting to add values to a complete result set. BUG")
+			return
 		keys = numpy.mat(numpy.array(keys)).T
 		x = op.asmatrix()
 		data = numpy.concatenate((x, keys), axis=0)
-		csvlib.write_csv(self.filename, data, copy.copy(self.variables), append=True)
+		self._writer.write(data)
+
+	def lock(self):
+		"""Marks the results set as complete and closes its file."""
+		self._lock = True
+		self._writer.close()
 
 	def get_type(self):
 		return "MC"
@@ -622,12 +1014,12 @@ class mc_solution:
 
 	def __getitem__(self, name):
 		"""Get a specific variable, as from a dictionary."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name], nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, [name])
 		return data
 
 	def get(self, name, default=None):
 		try:
-			data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name], nsamples=None, skip=0L)
+			data, headers, pos, EOF = _load_data(self._writer, [name])
 		except KeyError:
 			return default
 		return data
@@ -646,11 +1038,11 @@ class mc_solution:
 
 	def values(self):
 		"""Get all of the results set's variables values."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		return data
 
 	def items(self):
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		vlist = []
 		for j in range(data.shape[0]):
 			vlist.append(data[j, :])
@@ -659,7 +1051,7 @@ class mc_solution:
 	# iterator methods
 	def __iter__(self):
 		self.iter_index = 0
-		self.iter_data, self.iter_headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[], nsamples=None, skip=0L)
+		self.iter_data, self.iter_headers, pos, EOF = _load_data(self._writer, [])
 		return self
 
 	def next(self):
@@ -695,7 +1087,6 @@ class tran_solution:
 		self.filename = outfile
 		self.method = method
 
-		self._init_file_done = False
 		self._lock = False
 
 		#We have mixed current and voltage results
@@ -722,6 +1113,8 @@ class tran_solution:
 				self.variables += [varname]
 				self.units.update({varname:"A"})
 
+		self._writer = _get_writer(self.filename, self.variables, self.units)
+
 	def __str__(self):
 		return "<TRAN simulation results for %s (netlist %s), from %g s to %g s. Diff. method %s. Run on %s, data filename %s.>" % \
 		(self.netlist_title, self.netlist_file, self.tstart, self.tstop, self.method, self.timestamp, self.filename)
@@ -732,17 +1125,27 @@ class tran_solution:
 		if not self._lock:
 			time = numpy.mat(numpy.array([time]))
 			data = numpy.concatenate((time, x), axis=0)
-			csvlib.write_csv(self.filename, data, copy.copy(self.variables), append=self._init_file_done)
-			self._init_file_done = True
+			self._writer.write(data)
 		else:
 			printing.print_general_error("Attempting to add values to a complete result set. BUG")
 
 	def lock(self):
+		"""Marks the results set as complete and closes its file."""
 		self._lock = True
+		self._writer.close()
 
 	def get_type(self):
 		return "TRAN"
 
+	def get_window(self, name, tstart, tstop):
+		"""Get the samples of a variable taken at tstart <= T <= tstop.
+		With binary results files, this is a view of the file.
+		"""
+		t = numpy.asarray(_load_data(self._writer, ["T"])[0]).ravel()
+		first, last = numpy.searchsorted(t, tstart, side='left'), numpy.searchsorted(t, tstop, side='right')
+		data, headers, pos, EOF = _load_data(self._writer, [name.upper()])
+		return data[:, first:last]
+
 	# Access as a dictionary BY VARIABLE NAME:
 	def __len__(self):
 		"""Get the number of variables in the results set."""
@@ -750,12 +1153,12 @@ class tran_solution:
 
 	def __getitem__(self, name):
 		"""Get a specific variable, as from a dictionary."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name.upper()], nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, [name.upper()])
 		return data
 
 	def get(self, name, default=None):
 		try:
-			data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[name.upper()], nsamples=None, skip=0L)
+			data, headers, pos, EOF = _load_data(self._writer, [name.upper()])
 		except KeyError:
 			return default
 		return data
@@ -774,11 +1177,11 @@ class tran_solution:
 
 	def values(self):
 		"""Get all of the results set's variables values."""
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		return data
 
 	def items(self):
-		data, headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=self.variables, nsamples=None, skip=0L)
+		data, headers, pos, EOF = _load_data(self._writer, self.variables)
 		vlist = []
 		for j in range(data.shape[0]):
 			vlist.append(data[j, :])
@@ -787,7 +1190,7 @@ class tran_solution:
 	# iterator methods
 	def __iter__(self):
 		self.iter_index = 0
-		self.iter_data, self.iter_headers, pos, EOF = csvlib.load_csv(self.filename, load_headers=[], nsamples=None, skip=0L)
+		self.iter_data, self.iter_headers, pos, EOF = _load_data(self._writer, [])
 		return self
 
 	def next(self):
@@ -922,6 +1325,29 @@ class pss_solution:
 			self.iter_index += 1
 		return next
 
+def _get_writer(filename, variables, units):
+	"""Returns: the writer of the results file, csvlib.csv_writer or,
+	if options.results_format is 'bin', binlib.bin_writer. The results
+	are always written to stdout as CSV.
+	"""
+	if options.results_format == 'bin' and filename != 'stdout':
+		return binlib.bin_writer(filename, variables, \
+			[units[v] if units.has_key(v) else "" for v in variables], \
+			options.results_buffer_rows, options.results_flush_interval)
+	return csvlib.csv_writer(filename, variables, options.results_buffer_rows, \
+		options.results_flush_interval)
+
+def _load_data(writer, load_headers):
+	"""Loads the variables load_headers (all if empty) from the file
+	written by writer, flushing it first.
+
+	Returns: data, headers, pos, EOF as csvlib.load_csv()
+	"""
+	writer.flush()
+	if isinstance(writer, binlib.bin_writer):
+		return binlib.load_bin(writer.filename, load_headers=load_headers)
+	return csvlib.load_csv(writer.filename, load_headers=load_headers, nsamples=None, skip=0L)
+
 class case_insensitive_dict:
 	def __init__(self):
 		self._dict = {}
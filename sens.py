@@ -0,0 +1,223 @@
+# -*- coding: iso-8859-1 -*-
+# sens.py
+# Sensitivity analysis
+# Copyright 2006-2013 Giuseppe Venturini
+
+# This file is part of the ahkab simulator.
+#
+# Ahkab is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, version 2 of the License.
+#
+# Ahkab is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License v2
+# along with ahkab.  If not, see <http://www.gnu.org/licenses/>.
+
+"""
+DC and AC sensitivity of an output to the parameters of every linear
+element, by the adjoint method.
+
+The circuit equations are F(x, p) = A x + N = 0 (A includes the
+linearized nonlinear elements). For an output y = c^T x:
+
+	dy/dp = - lambda^T (dA/dp x + dN/dp),	 A^T lambda = c
+
+so one (transposed) solve gives the derivatives with respect to every
+parameter, each of them being a dot product involving at most four
+entries of x and lambda. In AC, A = G + j*omega*C and the transposed
+system is solved with the factors of the one giving x.
+
+The parameters are: R (resistors), C (capacitors), L (inductors), the
+gain alpha (VCVS and VCCS) and the value of the independent sources
+(the DC value in DC, the AC magnitude in AC). The operating point is
+kept fixed: the linearization of the nonlinear elements does not depend
+on the parameters in AC.
+"""
+
+import sys
+import numpy, scipy.sparse
+
+import dc_analysis, ac, linsolve, circuit, circuit_plan, devices, options, printing, \
+	results, ticker, utilities
+
+def sens_analysis(circ, output, start=None, stop=None, nsteps=None, step_type=options.ac_log_step, \
+	xop=None, data_filename="stdout", verbose=3):
+	"""Computes the sensitivities of output to the parameters of every
+	linear element, at the operating point and, if start, stop and
+	nsteps are set, over an AC sweep.
+
+	output: 'v(node)', 'v(node1,node2)' or 'i(element)' (the current in
+	a voltage defined element).
+	xop: the operating point, if None an OP analysis is run.
+
+	Returns: a results.sens_solution instance.
+	"""
+	c = get_output_vector(circ, output)
+	params = sens_parameters(circ)
+
+	printing.print_info_line(("Starting sensitivity analysis of %s (%d parameters): " % \
+		(output, len(params.names)), 3), verbose)
+
+	(mna, N) = dc_analysis.generate_mna_and_N(circ)
+	del N
+	mna = utilities.remove_row_and_col(mna)
+	sparse = scipy.sparse.issparse(mna)
+	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose, sparse=sparse)
+
+	if xop is None:
+		printing.print_info_line(("Starting OP analysis...", 3), verbose, print_nl=False)
+		xop = dc_analysis.op_analysis(circ, verbose=0)
+		if xop is None:
+			printing.print_info_line(("failed.", 3), verbose)
+			printing.print_general_error("OP analysis failed, no operating point available. Quitting.")
+			sys.exit(3)
+		printing.print_info_line(("done.", 3), verbose)
+	x = xop.asmatrix()
+	if circ.is_nonlinear():
+		J = ac.generate_J(xop=x, circ=circ, mna=mna, Nac=None, data_filename=data_filename, verbose=verbose)
+	else:
+		J = 0
+	G = mna + J + Gmin_matrix
+
+	omegas = []
+	if start is not None:
+		omegas = ac._get_omegas(start, nsteps, stop, step_type)
+	sol = results.sens_solution(circ, output, params, opoints=len(omegas), stype=step_type, \
+		op=xop, outfile=data_filename)
+
+	# DC: the jacobian at the operating point, which is usually solved
+	# without Gmin in the end (then op.gmin is 0)
+	if xop.gmin:
+		Gdc = G
+	else:
+		Gdc = mna + J
+	try:
+		lam = linsolve.factor(Gdc).solve_transposed(c)
+	except numpy.linalg.linalg.LinAlgError:
+		printing.print_general_error("SENS: the DC system is singular.")
+		return None
+	sol.set_dc((c.T*x)[0, 0], params.derivatives(x, lam))
+
+	if len(omegas):
+		AC = ac.generate_AC(circ, [mna.shape[0], mna.shape[0]], sparse=sparse)
+		AC = utilities.remove_row_and_col(AC)
+		Nac = utilities.remove_row(ac.generate_Nac(circ), rrow=0)
+		# the pattern is the same at every frequency
+		lu = linsolve.lu_cache()
+		j = numpy.complex('j')
+		printing.print_info_line(("Solving... ", 3), verbose, print_nl=False)
+		tick = ticker.ticker(increments_for_step=1)
+		tick.display(verbose > 1)
+		for omega in omegas:
+			try:
+				factors = lu.factor(G + j*omega*AC)
+			except numpy.linalg.linalg.LinAlgError:
+				tick.hide(verbose > 1)
+				printing.print_general_error("SENS: the AC system is singular at w = %g rad/s." % (omega,))
+				return None
+			x = factors.solve(-Nac)
+			lam = factors.solve_transposed(c)
+			sol.add_line(omega, (c.T*x)[0, 0], params.derivatives(x, lam, omega))
+			tick.step(verbose > 1)
+		tick.hide(verbose > 1)
+
+	printing.print_info_line(("done.", 3), verbose)
+	sol.write_to_file()
+	return sol
+
+def get_output_vector(circ, output):
+	"""Returns: c, the REDUCED column vector such that output = c^T x.
+	output: 'v(node)', 'v(node1,node2)' or 'i(element)'.
+	"""
+	plan = circuit_plan.get_plan(circ)
+	c = numpy.mat(numpy.zeros((plan.size - 1, 1)))
+	label = output.strip().lower()
+	if len(label) < 4 or label[1] != '(' or label[-1] != ')' or label[0] not in 'vi':
+		printing.print_general_error("SENS: unknown output %s." % (output,))
+		sys.exit(1)
+	if label[0] == 'v':
+		nodes = label[2:-1].split(',')
+		if len(nodes) > 2:
+			printing.print_general_error("SENS: unknown output %s." % (output,))
+			sys.exit(1)
+		for node, sign in zip(nodes, (1.0, -1.0)):
+			try:
+				int_node = circ.ext_node_to_int(node.strip())
+			except circuit.NodeNotFoundError:
+				printing.print_general_error("SENS: node %s not found." % (node.strip(),))
+				sys.exit(1)
+			if int_node != 0:
+				c[int_node - 1, 0] = sign
+	else:
+		name = label[2:-1].strip().upper()
+		if not name in plan.vde_index:
+			printing.print_general_error("SENS: %s is not a voltage defined element." % (name,))
+			sys.exit(1)
+		c[plan.n_of_nodes - 1 + plan.vde_index[name], 0] = 1.0
+	return c
+
+class sens_parameters:
+	"""The parameters of the linear elements of circ.
+
+	Every derivative has the form:
+		dy/dp = (a + j*omega*b) * (lambda[r1] - lambda[r2]) * (x[c1] - x[c2])
+	the indices referring to x and lambda extended with a zero (ground)
+	at the beginning and a one at the end, so that x[c1] - x[c2] = 1 for
+	the sources, which enter N and not A.
+	"""
+	def __init__(self, circ):
+		plan = circuit_plan.get_plan(circ)
+		one = plan.size
+		vde = lambda elem: plan.n_of_nodes + plan.find_vde_index(elem.letter_id + elem.descr)
+		j = numpy.complex('j')
+		names, values_dc, values_ac, indices, a_dc, a_ac, b = [], [], [], [], [], [], []
+		for elem in circ.elements:
+			if isinstance(elem, devices.resistor):
+				param = (elem.R, elem.R, (elem.n1, elem.n2, elem.n1, elem.n2), 1.0/elem.R**2, 1.0/elem.R**2, 0)
+			elif isinstance(elem, devices.capacitor):
+				param = (elem.C, elem.C, (elem.n1, elem.n2, elem.n1, elem.n2), 0, 0, -1.0)
+			elif isinstance(elem, devices.inductor):
+				param = (elem.L, elem.L, (vde(elem), 0, vde(elem), 0), 0, 0, 1.0)
+			elif isinstance(elem, devices.gisource):
+				param = (elem.alpha, elem.alpha, (elem.n1, elem.n2, elem.sn1, elem.sn2), -1.0, -1.0, 0)
+			elif isinstance(elem, devices.evsource):
+				param = (elem.alpha, elem.alpha, (vde(elem), 0, elem.sn1, elem.sn2), 1.0, 1.0, 0)
+			elif isinstance(elem, devices.vsource):
+				param = (elem.vdc or 0.0, elem.abs_ac or 0.0, (vde(elem), 0, one, 0), \
+					1.0, numpy.exp(j*elem.arg_ac), 0)
+			elif isinstance(elem, devices.isource):
+				param = (elem.idc or 0.0, elem.abs_ac or 0.0, (elem.n1, elem.n2, one, 0), \
+					-1.0, -numpy.exp(j*elem.arg_ac), 0)
+			else:
+				continue
+			names.append((elem.letter_id + elem.descr).upper())
+			values_dc.append(param[0])
+			values_ac.append(param[1])
+			indices.append(param[2])
+			a_dc.append(param[3])
+			a_ac.append(param[4])
+			b.append(param[5])
+		self.names = names
+		self.values_dc = numpy.array(values_dc, dtype=float)
+		self.values_ac = numpy.array(values_ac, dtype=float)
+		self.indices = numpy.array(indices, dtype=int).reshape((-1, 4))
+		self.a_dc = numpy.array(a_dc, dtype=float)
+		self.a_ac = numpy.array(a_ac, dtype=complex)
+		self.b = numpy.array(b, dtype=float)
+
+	def derivatives(self, x, lam, omega=None):
+		"""Returns: the array of the derivatives of the output with
+		respect to every parameter, given the solution x and the adjoint
+		solution lam (both REDUCED). In DC if omega is None.
+		"""
+		x = numpy.concatenate(([0], numpy.asarray(x).ravel(), [1]))
+		lam = numpy.concatenate(([0], numpy.asarray(lam).ravel(), [0]))
+		products = (lam[self.indices[:, 0]] - lam[self.indices[:, 1]])* \
+			(x[self.indices[:, 2]] - x[self.indices[:, 3]])
+		if omega is None:
+			return self.a_dc*products
+		return (self.a_ac + numpy.complex('j')*omega*self.b)*products
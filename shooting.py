@@ -20,9 +20,9 @@
 """Periodic steady state analysis based on the shooting method"""
 
 import sys
-import numpy, numpy.linalg
-import transient, implicit_euler, dc_analysis, ticker, options, circuit, printing, utilities
-import results, devices
+import numpy
+import transient, implicit_euler, dc_analysis, ticker, options, circuit, printing, utilities, linsolve
+import results, devices, circuit_plan
 
 def shooting(circ, period, step=None, mna=None, Tf=None, D=None, points=None, autonomous=False, data_filename='stdout', vector_norm=lambda v: max(abs(v)), verbose=3):
 	"""Performs a periodic steady state analysis based on the algorithm described in
@@ -74,7 +74,7 @@ def shooting(circ, period, step=None, mna=None, Tf=None, D=None, points=None, au
 	printing.print_info_line(("Method: shooting",3), verbose)
 	
 	if mna is None or Tf is None:
-		(mna, Tf) = dc_analysis.generate_mna_and_N(circ)
+		(mna, Tf) = dc_analysis.generate_mna_and_N(circ, sparse=False)
 		mna = utilities.remove_row_and_col(mna)
 		Tf = utilities.remove_row(Tf, rrow=0)
 	elif not mna.shape[0] == Tf.shape[0]:
@@ -138,7 +138,9 @@ def shooting(circ, period, step=None, mna=None, Tf=None, D=None, points=None, au
 			MAass_variable_vector.append(MAass_variable + MAass_static)
 			Tass_variable_vector.append(Tass_variable + Tass_static_vector[index])
 		
-		dxN = compute_dxN(circ, MAass_variable_vector, MBass, Tass_variable_vector, n_of_var, points, verbose=verbose)
+		# each MAass is factored once and used for all the solves that follow
+		MAass_factors = [linsolve.factor(MAass) for MAass in MAass_variable_vector]
+		dxN = compute_dxN(circ, MAass_factors, MBass, Tass_variable_vector, n_of_var, points, verbose=verbose)
 		td = dc_analysis.get_td(dxN, locked_nodes, n=-1)
 		x[points-1] = td * dxN + x[points-1]
 
@@ -147,7 +149,7 @@ def shooting(circ, period, step=None, mna=None, Tf=None, D=None, points=None, au
 				dxi_minus_1 = dxN
 			else:
 				dxi_minus_1 = dx[index-1]
-			dx.append(compute_dx(MAass_variable_vector[index], MBass, Tass_variable_vector[index], dxi_minus_1))
+			dx.append(compute_dx(MAass_factors[index], MBass, Tass_variable_vector[index], dxi_minus_1))
 			td = dc_analysis.get_td(dx[index], locked_nodes, n=-1)
 			x[index] = td*dx[index] + x[index]
 		dx.append(dxN)
@@ -229,28 +231,14 @@ def build_static_MAass_and_MBass(mna, D, step):
 
 def build_Tass_static_vector(circ, Tf, points, step, tick, n_of_var, verbose=3):
         Tass_vector = []
-	nv = len(circ.nodes_dict)
 	printing.print_info_line(("Building Tass...", 5), verbose, print_nl=False)
 
+	plan = circuit_plan.get_plan(circ)
         tick.reset()
         tick.display(verbose > 2)
         for index in xrange(0, points):
-                Tt = numpy.zeros((n_of_var, 1))
-                v_eq = 0
                 time = index * step
-                for elem in circ.elements:
-                        if (isinstance(elem, devices.vsource) or isinstance(elem, devices.isource)) and elem.is_timedependent:
-                                if isinstance(elem, devices.vsource):
-                                        Tt[nv - 1 + v_eq, 0] = -1.0 * elem.V(time)
-                                elif isinstance(elem, devices.isource):
-                                        if elem.n1:
-                                                Tt[elem.n1-1, 0] = \
-                                                Tt[elem.n1-1, 0] + elem.I(time)
-                                        if elem.n2:
-                                                Tt[elem.n2-1, 0] = \
-                                                Tt[elem.n2-1, 0] - elem.I(time)
-                        if circuit.is_elem_voltage_defined(elem):
-                                v_eq = v_eq +1
+                Tt = plan.Tt(time)
                 tick.step(verbose > 2)
                 Tass_vector.append(Tf+Tt)
         tick.hide(verbose > 2)
@@ -302,22 +290,25 @@ def get_variable_MAass_and_Tass(circ, xi, xi_minus_1, M, D, step, n_of_var):
 
 	return (J, Tass)
 
-def compute_dxN(circ, MAass_vector, MBass, Tass_vector, n_of_var, points, verbose=3):
+def compute_dxN(circ, MAass_factors, MBass, Tass_vector, n_of_var, points, verbose=3):
+	"""MAass_factors holds the linsolve factorization handles of the MAass
+	matrices, one for each point.
+	"""
 	temp_mat1 = numpy.mat(numpy.eye(n_of_var))
 	for index in range(points):
-		temp_mat1 = -1*numpy.linalg.inv(MAass_vector[index])*MBass*temp_mat1
+		temp_mat1 = -1*MAass_factors[index].solve_many(MBass*temp_mat1)
+	# temp_mat2 is the sum over index of the products:
+	# (-MAass[points-1]^-1*MBass) ... (-MAass[index+1]^-1*MBass) (-MAass[index]^-1*Tass[index])
+	# we evaluate it Horner-like, one solve per point.
 	temp_mat2 = numpy.mat(numpy.zeros((n_of_var,1)))
 	for index in range(points):
-		temp_mat3 = -1*numpy.linalg.inv(MAass_vector[index])*Tass_vector[index]
-		for index2 in range(index+1, points):
-			temp_mat3 = -1*numpy.linalg.inv(MAass_vector[index2])*MBass*temp_mat3
-		temp_mat2 = temp_mat2 + temp_mat3
+		temp_mat2 = -1*MAass_factors[index].solve(MBass*temp_mat2 + Tass_vector[index])
 
-	dxN = numpy.linalg.inv(numpy.mat(numpy.eye(n_of_var)) - temp_mat1) * temp_mat2
+	dxN = linsolve.solve(numpy.mat(numpy.eye(n_of_var)) - temp_mat1, temp_mat2)
 
 	return dxN
 
-def compute_dx(MAass, MBass, Tass, dxi_minus_1):
-	dxi = -1 * numpy.linalg.inv(MAass) * (MBass * dxi_minus_1 + Tass)
+def compute_dx(MAass_factor, MBass, Tass, dxi_minus_1):
+	dxi = -1 * MAass_factor.solve(MBass * dxi_minus_1 + Tass)
 	return dxi
 
@@ -207,8 +207,16 @@ def generate_mna_and_N(circ, opts, ac=False):
 	"""
 	#print options
 	n_of_nodes = len(circ.nodes_dict)
-	mna = smzeros(n_of_nodes)
-	N = smzeros((n_of_nodes, 1))
+	# the currents of the voltage defined elements follow the node
+	# voltages, in the same order as in circ.elements.
+	vde_elements = [elem for elem in circ.elements if circuit.is_elem_voltage_defined(elem)]
+	vde_index = {}
+	for index in range(len(vde_elements)):
+		elem = vde_elements[index]
+		vde_index.update({(elem.letter_id + elem.descr).upper():index})
+	# allocate the matrices once, instead of growing them
+	mna = smzeros(n_of_nodes + len(vde_elements))
+	N = smzeros((n_of_nodes + len(vde_elements), 1))
 	s = sympy.Symbol("s", complex=True)
 	subs_g = {}
 	#process_elements() 	
@@ -292,52 +300,50 @@ def generate_mna_and_N(circ, opts, ac=False):
 		else:
 			printing.print_warning("Skipped elem %s: not implemented." % (elem.letter_id.upper()+elem.descr,))
 
-	pre_vde = mna.shape[0]
-	for elem in circ.elements:
-		if circuit.is_elem_voltage_defined(elem):
-			index = mna.shape[0] #get_matrix_size(mna)[0]
-			mna = expand_matrix(mna, add_a_row=True, add_a_col=True)
-			N = expand_matrix(N, add_a_row=True, add_a_col=False)
-			# KCL
-			mna[elem.n1, index] = +1
-			mna[elem.n2, index] = -1
-			# KVL
-			mna[index, elem.n1] = +1
-			mna[index, elem.n2] = -1
-			if isinstance(elem, devices.vsource):
-				if elem.is_symbolic:
-					VDC = sympy.Symbol(elem.letter_id.upper() + elem.descr, real=True)
-				else:
-					VDC = elem.vdc
-				N[index, 0] = -VDC
-			elif isinstance(elem, devices.evsource):
+	pre_vde = n_of_nodes
+	for vde in range(len(vde_elements)):
+		elem = vde_elements[vde]
+		index = pre_vde + vde
+		# KCL
+		mna[elem.n1, index] = +1
+		mna[elem.n2, index] = -1
+		# KVL
+		mna[index, elem.n1] = +1
+		mna[index, elem.n2] = -1
+		if isinstance(elem, devices.vsource):
+			if elem.is_symbolic:
+				VDC = sympy.Symbol(elem.letter_id.upper() + elem.descr, real=True)
+			else:
+				VDC = elem.vdc
+			N[index, 0] = -VDC
+		elif isinstance(elem, devices.evsource):
+			if elem.is_symbolic:
+				alpha = sympy.Symbol(elem.letter_id.upper() + elem.descr, real=True)
+			else:
+				alpha = elem.alpha
+			mna[index, elem.sn1] = -alpha
+			mna[index, elem.sn2] = +alpha
+		elif isinstance(elem, devices.inductor):
+			if ac:
 				if elem.is_symbolic:
-					alpha = sympy.Symbol(elem.letter_id.upper() + elem.descr, real=True)
+					L = sympy.Symbol(elem.letter_id.upper() + elem.descr, real=True)
 				else:
-					alpha = elem.alpha
-				mna[index, elem.sn1] = -alpha
-				mna[index, elem.sn2] = +alpha
-			elif isinstance(elem, devices.inductor):
-				if ac:
-					if elem.is_symbolic:
-						L = sympy.Symbol(elem.letter_id.upper() + elem.descr, real=True)
-					else:
-						L = elem.L
-					mna[index, index] = -s*L
-				else: 
-					pass
-					# already so: commented out				
-					# N[index,0] = 0
-			elif isinstance(elem, devices.hvsource):
-				printing.print_warning("symbolic.py: BUG - hvsources are not implemented yet.")
-				sys.exit(33)
+					L = elem.L
+				mna[index, index] = -s*L
+			else: 
+				pass
+				# already so: commented out				
+				# N[index,0] = 0
+		elif isinstance(elem, devices.hvsource):
+			printing.print_warning("symbolic.py: BUG - hvsources are not implemented yet.")
+			sys.exit(33)
 	
 	for elem in circ.elements:
 		if circuit.is_elem_voltage_defined(elem):
 			if isinstance(elem, devices.inductor):
 				if ac:
 					# find its index to know which column corresponds to its current
-					this_index = circ.find_vde_index("L"+elem.descr, verbose=0)
+					this_index = vde_index[("L"+elem.descr).upper()]
 					for cd in elem.coupling_devices:
 						if cd.is_symbolic:
 							M = sympy.Symbol("M" + cd.descr, real=True)
@@ -346,7 +352,7 @@ def generate_mna_and_N(circ, opts, ac=False):
 						# get id+descr of the other inductor (eg. "L32")
 						other_id_wdescr = cd.get_other_inductor("L"+elem.descr)
 						# find its index to know which column corresponds to its current
-						other_index = circ.find_vde_index(other_id_wdescr, verbose=0)
+						other_index = vde_index[other_id_wdescr.upper()]
 						# add the term.
 						#print "other_index: "+str(other_index)
 						#print "this_index: "+str(this_index)
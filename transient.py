@@ -29,10 +29,11 @@ We need:
 	6. a differentiation method to approximate dx/dt
 """
 
-import sys, imp
+import sys, imp, heapq
 import numpy
-import dc_analysis, implicit_euler, ticker, options, circuit, printing, utilities
-import devices, results
+import scipy.sparse
+import dc_analysis, linsolve, implicit_euler, ticker, options, circuit, printing, utilities
+import devices, results, circuit_plan, exponential
 
 
 #methods, add here
@@ -44,6 +45,11 @@ GEAR3 = "GEAR3"
 GEAR4 = "GEAR4"
 GEAR5 = "GEAR5"
 GEAR6 = "GEAR6"
+# linear circuits only, see exponential.py
+EXPONENTIAL = "EXPONENTIAL"
+
+# see breakpoint_queue
+BREAKPOINT_RESOLUTION = 1e-9
 
 def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=None, N=None, \
 	D=None, data_filename="stdout", use_step_control=True, return_req_dict=None, verbose=3):
@@ -98,7 +104,7 @@ def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=Non
 	if D is None:
 		# if you do more than one tran analysis, output streams should be changed...
 		# this needs to be fixed
-		D = generate_D(circ, [mna.shape[0], mna.shape[0]])
+		D = generate_D(circ, [mna.shape[0], mna.shape[0]], sparse=scipy.sparse.issparse(mna))
 		D = utilities.remove_row_and_col(D)
 
 	# setup x0
@@ -118,6 +124,14 @@ def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=Non
 		print "x0:"
 		opsol.print_short()
 	
+	if method == EXPONENTIAL:
+		if circ.is_nonlinear():
+			printing.print_warning("The EXPONENTIAL method requires a linear circuit. Using TRAP.")
+			method = TRAP
+		else:
+			return exponential_transient(circ, tstart, tstep, tstop, x0, mna, N, D, data_filename, \
+				return_req_dict, verbose)
+
 	# setup the df method
 	printing.print_info_line(("Selecting the appropriate DF ("+method+")... ", 5), verbose, print_nl=False)
 	if method == IMPLICIT_EULER:
@@ -193,7 +207,16 @@ def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=Non
 	time = tstart
 	nv = len(circ.nodes_dict)
 
-	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose)
+	Gmin_matrix = dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose, sparse=scipy.sparse.issparse(mna))
+	# the matrix to be factored has the same pattern at every time step
+	lu = linsolve.lu_cache()
+	# linear circuits: no Newton iterations, the system matrix is factored
+	# only when x_coeff (ie the step) changes and every step is a single
+	# back substitution
+	linear_circuit = options.transient_linear_fast_path and not circ.is_nonlinear()
+	if linear_circuit:
+		plan = circuit_plan.get_plan(circ)
+		linear_factors, linear_x_coeff = None, None
 
 	# lo step viene generato automaticamente, ma non superare mai quello fornito.
 	if use_step_control:
@@ -219,86 +242,125 @@ def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=Non
 	rerror[nv-1:, 0] = options.ier
 	
 	iter_n = 0  # contatore d'iterazione
+	# the DF is restarted (from implicit euler) on every breakpoint: 
+	# restart_n counts the steps since the last restart
+	restart_n = 0
+	if use_step_control:
+		breakpoints = get_breakpoints(circ, tstart, tstop)
+	else:
+		# fixed step: the time points are tstart + k*tstep
+		breakpoints = None
 	lte = None
 	sol = results.tran_solution(circ, tstart, tstop, op=x0, method=method, outfile=data_filename)
 	printing.print_info_line(("Solving... ", 3), verbose, print_nl=False)
 	tick = ticker.ticker(increments_for_step=1)
 	tick.display(verbose > 1)
-	while time < tstop:
-		if iter_n < max(max_x, max_dx_plus_1):
-			x_coeff, const, x_lte_coeff, prediction, pred_lte_coeff = \
-			implicit_euler.get_df((thebuffer.get_df_vector()[0],), tstep, \
-			predict=(use_step_control and (iter_n >= max(pmax_x, pmax_dx_plus_1))))
+	try:
+		while time < tstop:
+			if breakpoints is not None:
+				# land exactly on the next breakpoint
+				breakpoint = breakpoints.next_after(time)
+				saved_step = tstep
+				tstep = check_step(tstep, time, tstop, HMAX, breakpoint)
+				on_breakpoint = breakpoint is not None and tstep == breakpoint - time
+			if restart_n < max(max_x, max_dx_plus_1):
+				x_coeff, const, x_lte_coeff, prediction, pred_lte_coeff = \
+				implicit_euler.get_df((thebuffer.get_df_vector()[0],), tstep, \
+				predict=(use_step_control and (restart_n >= max(pmax_x, pmax_dx_plus_1))))
 			
-		else:
-			[x_coeff, const, x_lte_coeff, prediction, pred_lte_coeff] = \
-			df.get_df(thebuffer.get_df_vector(), tstep, predict=use_step_control)
+			else:
+				[x_coeff, const, x_lte_coeff, prediction, pred_lte_coeff] = \
+				df.get_df(thebuffer.get_df_vector(), tstep, predict=use_step_control)
 		
-		if options.transient_prediction_as_x0 and use_step_control and prediction is not None:
-			x0 = prediction
-		elif x is not None:
-			x0 = x
+			if options.transient_prediction_as_x0 and use_step_control and prediction is not None:
+				x0 = prediction
+			elif x is not None:
+				x0 = x
 		
-		(x1, error, solved, n_iter) = dc_analysis.dc_solve(mna=(mna + numpy.multiply(x_coeff, D)) , Ndc=N,  Ntran=D*const, circ=circ, Gmin=Gmin_matrix, x0=x0, time=(time + tstep), locked_nodes=locked_nodes, MAXIT=options.transient_max_nr_iter, verbose=0)
+			solved = False
+			if linear_circuit:
+				try:
+					if linear_factors is None or x_coeff != linear_x_coeff:
+						linear_factors = lu.factor(mna + x_coeff*D + Gmin_matrix)
+						linear_x_coeff = x_coeff
+					x1 = linear_factors.solve(-(N + plan.Tt(time + tstep) + D*const))
+					solved = True
+				except numpy.linalg.linalg.LinAlgError:
+					# singular: let dc_solve try harder
+					linear_factors = None
+			if not solved:
+				(x1, error, solved, n_iter) = dc_analysis.dc_solve(mna=(mna + x_coeff*D) , Ndc=N,  Ntran=D*const, circ=circ, Gmin=Gmin_matrix, x0=x0, time=(time + tstep), locked_nodes=locked_nodes, MAXIT=options.transient_max_nr_iter, lu=lu, verbose=0)
 		
-		if solved:
-			old_step = tstep #we will modify it, if we're using step control otherwise it's the same
-			# step control (yeah)
-			if use_step_control:
-				if x_lte_coeff is not None and pred_lte_coeff is not None and prediction is not None:
-					# this is the Local Truncation Error :)
-					lte = abs((x_lte_coeff / (pred_lte_coeff - x_lte_coeff)) * (prediction - x1))
-					# it should NEVER happen that new_step > 2*tstep, for stability
-					new_step_coeff = 2 
-					for index in xrange(x.shape[0]):
-						if lte[index, 0] != 0:
-							new_value = ((aerror[index, 0] + rerror[index, 0]*abs(x[index, 0])) / lte[index, 0]) \
-							** (1.0 / (df.order+1))
-							if new_value < new_step_coeff:
-								new_step_coeff = new_value
-							#print new_value
-					new_step = tstep * new_step_coeff
-					if options.transient_use_aposteriori_step_control and new_step < options.transient_aposteriori_step_threshold * tstep: 
-						#don't recalculate a x for a small change
-						tstep = check_step(new_step, time, tstop, HMAX)
-						#print "Apost. (reducing) step = "+str(tstep)
-						continue
-					tstep = check_step(new_step, time, tstop, HMAX) # used in the next iteration
-					#print "Apriori tstep = "+str(tstep)
+			if solved:
+				old_step = tstep #we will modify it, if we're using step control otherwise it's the same
+				# step control (yeah)
+				if use_step_control:
+					if x_lte_coeff is not None and pred_lte_coeff is not None and prediction is not None:
+						# this is the Local Truncation Error :)
+						lte = abs((x_lte_coeff / (pred_lte_coeff - x_lte_coeff)) * (prediction - x1))
+						# it should NEVER happen that new_step > 2*tstep, for stability
+						new_step_coeff = 2 
+						for index in xrange(x.shape[0]):
+							if lte[index, 0] != 0:
+								new_value = ((aerror[index, 0] + rerror[index, 0]*abs(x[index, 0])) / lte[index, 0]) \
+								** (1.0 / (df.order+1))
+								if new_value < new_step_coeff:
+									new_step_coeff = new_value
+								#print new_value
+						new_step = tstep * new_step_coeff
+						if options.transient_use_aposteriori_step_control and new_step < options.transient_aposteriori_step_threshold * tstep: 
+							#don't recalculate a x for a small change
+							tstep = check_step(new_step, time, tstop, HMAX)
+							#print "Apost. (reducing) step = "+str(tstep)
+							continue
+						tstep = check_step(new_step, time, tstop, HMAX) # used in the next iteration
+						#print "Apriori tstep = "+str(tstep)
+					else:
+						#print "LTE not calculated."
+						lte = None
+				if print_step_and_lte and lte is not None: 
+					#if you wish to look at the step. We print just a lte
+					flte.write(str(time)+"\t"+str(old_step)+"\t"+str(lte.max())+"\n")
+				# if we get here, either aposteriori_step_control is 
+				# disabled, or it's enabled and the error is small
+				# enough. Anyway, the result is GOOD, STORE IT.
+				x = x1
+				iter_n = iter_n + 1
+				restart_n = restart_n + 1
+				if breakpoints is not None and on_breakpoint:
+					time = breakpoint
+					# the waveforms have a corner: the past values are 
+					# not used and the step is set back
+					restart_n = 0
+					tstep = min(tstep, saved_step*options.transient_breakpoint_step_factor)
 				else:
-					#print "LTE not calculated."
-					lte = None
-			if print_step_and_lte and lte is not None: 
-				#if you wish to look at the step. We print just a lte
-				flte.write(str(time)+"\t"+str(old_step)+"\t"+str(lte.max())+"\n")
-			# if we get here, either aposteriori_step_control is 
-			# disabled, or it's enabled and the error is small
-			# enough. Anyway, the result is GOOD, STORE IT.
-			time = time + old_step
-			x = x1
-			iter_n = iter_n + 1
-			sol.add_line(time, x)
+					time = time + old_step
+				sol.add_line(time, x)
 			
-			dxdt = numpy.multiply(x_coeff, x) + const
-			thebuffer.add((time, x, dxdt))
-			if output_buffer is not None:
-				output_buffer.add((x, ))
-			tick.step(verbose > 1)
-		else:
-			# If we get here, Newton failed to converge. We need to reduce the step...
-			if use_step_control:
-				tstep = tstep/5.0
-				tstep = check_step(tstep, time, tstop, HMAX)
-				printing.print_info_line(("At %g s reducing step: %g s (convergence failed)" % (time, tstep), 5), verbose)
-			else: #we can't reduce the step
-				printing.print_general_error("Can't converge with step "+str(tstep)+".")
-				printing.print_general_error("Try setting --t-max-nr to a higher value or set step to a lower one.")
+				dxdt = numpy.multiply(x_coeff, x) + const
+				thebuffer.add((time, x, dxdt))
+				if output_buffer is not None:
+					output_buffer.add((x, ))
+				tick.step(verbose > 1)
+			else:
+				# If we get here, Newton failed to converge. We need to reduce the step...
+				if use_step_control:
+					tstep = tstep/5.0
+					tstep = check_step(tstep, time, tstop, HMAX)
+					printing.print_info_line(("At %g s reducing step: %g s (convergence failed)" % (time, tstep), 5), verbose)
+				else: #we can't reduce the step
+					printing.print_general_error("Can't converge with step "+str(tstep)+".")
+					printing.print_general_error("Try setting --t-max-nr to a higher value or set step to a lower one.")
+					solved = False
+					break
+			if options.transient_max_time_iter and iter_n == options.transient_max_time_iter:
+				printing.print_general_error("MAX_TIME_ITER exceeded ("+str(options.transient_max_time_iter)+"), iteration halted.")
 				solved = False
 				break
-		if options.transient_max_time_iter and iter_n == options.transient_max_time_iter:
-			printing.print_general_error("MAX_TIME_ITER exceeded ("+str(options.transient_max_time_iter)+"), iteration halted.")
-			solved = False
-			break
+	finally:
+		# an exception (eg Step size too small) leaves the results
+		# found so far in the file
+		sol.lock()
 	
 	if print_step_and_lte:
 		flte.close()
@@ -308,6 +370,7 @@ def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=Non
 	if solved:
 		printing.print_info_line(("done.", 3), verbose)
 		printing.print_info_line(("Average time step: %g" % ((tstop - tstart)/iter_n,), 3), verbose)
+		printing.print_info_line(("LU: %s" % (str(lu),), 5), verbose)
 
 		if output_buffer:
 			ret_value = output_buffer.get_as_matrix()
@@ -319,16 +382,112 @@ def transient_analysis(circ, tstart, tstep, tstop, method=TRAP, x0=None, mna=Non
 	
 	return ret_value
 
-def check_step(tstep, time, tstop, HMAX):
+def exponential_transient(circ, tstart, tstep, tstop, x0, mna, N, D, data_filename="stdout", \
+	return_req_dict=None, verbose=3):
+	"""Transient analysis of a linear circuit with the exponential 
+	propagator (see exponential.py), with the fixed step tstep.
+
+	The propagator is exact only if the sources are linear within
+	every step: the steps are shortened to end on the breakpoints of
+	the sources (see get_breakpoints()). One propagator is computed 
+	for every distinct step.
+	
+	mna, N and D are REDUCED, x0 is a column matrix. The other parameters
+	are the same as transient_analysis().
+
+	Returns: the same as transient_analysis().
+	"""
+	plan = circuit_plan.get_plan(circ)
+	G = mna + dc_analysis.build_gmin_matrix(circ, options.gmin, mna.shape[0], verbose, \
+		sparse=scipy.sparse.issparse(mna))
+	sources = lambda t: N + plan.Tt(t)
+	try:
+		G_factors = linsolve.factor(G)
+	except numpy.linalg.linalg.LinAlgError:
+		printing.print_general_error("EXPONENTIAL: the MNA matrix is singular.")
+		return None
+	# the propagators, by step: the steps that differ by less than
+	# resolution share the same one
+	propagators = {}
+	resolution = max((tstop - tstart)*BREAKPOINT_RESOLUTION, options.hmin)
+	breakpoints = get_breakpoints(circ, tstart, tstop)
+	
+	if return_req_dict:
+		output_buffer = dfbuffer(length=return_req_dict["points"], width=1)
+		output_buffer.add((x0,))
+	else:
+		output_buffer = None
+	
+	sol = results.tran_solution(circ, tstart, tstop, op=x0, method=EXPONENTIAL, outfile=data_filename)
+	printing.print_info_line(("Solving... ", 3), verbose, print_nl=False)
+	tick = ticker.ticker(increments_for_step=1)
+	tick.display(verbose > 1)
+	time = tstart
+	x = x0
+	b0 = sources(time)
+	iter_n = 0
+	solved = True
+	try:
+		while time < tstop:
+			step = check_step(tstep, time, tstop, tstep)
+			new_time = time + step
+			if breakpoints is not None:
+				breakpoint = breakpoints.next_after(time)
+				if breakpoint is not None and breakpoint <= new_time:
+					step = breakpoint - time
+					new_time = breakpoint
+			key = int(round(step/resolution))
+			if not key in propagators:
+				try:
+					propagators[key] = exponential.propagator(G, D, step, G_factors)
+				except numpy.linalg.linalg.LinAlgError:
+					printing.print_general_error("EXPONENTIAL: D + h*G is singular, h = %g s." % (step,))
+					solved = False
+					break
+			b1 = sources(new_time)
+			x = propagators[key].step(x, b0, b1)
+			b0 = b1
+			time = new_time
+			iter_n = iter_n + 1
+			sol.add_line(time, x)
+			if output_buffer is not None:
+				output_buffer.add((x, ))
+			tick.step(verbose > 1)
+			if options.transient_max_time_iter and iter_n == options.transient_max_time_iter:
+				printing.print_general_error("MAX_TIME_ITER exceeded ("+str(options.transient_max_time_iter)+"), iteration halted.")
+				solved = False
+				break
+	finally:
+		sol.lock()
+	tick.hide(verbose > 1)
+	
+	if not solved:
+		print "failed."
+		return None
+	printing.print_info_line(("done.", 3), verbose)
+	printing.print_info_line(("Propagators: %d" % (len(propagators),), 5), verbose)
+	if output_buffer:
+		return output_buffer.get_as_matrix()
+	return sol
+
+def check_step(tstep, time, tstop, HMAX, breakpoint=None):
 	"""Checks the step for the following problems:
 	- the step must be shorter than HMAX (that usually is the tstep provided by the user)
 	- the step must be shorter than the simulation time left (ie tstop - time)
+	- the step must not go past the next breakpoint, if any. If the
+	  breakpoint is closer than two steps, it is reached in two equal
+	  steps, rather than leaving a very short one,
 	- the step must be longer than options.hmin, if not halt the simulation.
 	
 	Returns: the step provided if it's ok, a shortened step otherwise.
 	"""
 	if tstep > HMAX:
 		tstep = HMAX
+	if breakpoint is not None and breakpoint < tstop:
+		if breakpoint - time <= tstep:
+			tstep = breakpoint - time
+		elif breakpoint - time < 2*tstep:
+			tstep = (breakpoint - time)/2.0
 	if tstop - time < tstep:
 		tstep = tstop - time
 	elif tstep < options.hmin:
@@ -336,7 +495,7 @@ def check_step(tstep, time, tstop, HMAX):
 		raise Exception, "Step size too small"
 	return tstep
 
-def generate_D(circ, shape):
+def generate_D(circ, shape, sparse=False):
 	"""Generates the derivate coefficients. Shape is the REDUCED MNA shape, D will be of the same shape.
 	It's easy to set up the voltage lines, we know that line 2 refers to node 2, etc... 
 	So everything's fine with capacitors. 
@@ -355,99 +514,134 @@ def generate_D(circ, shape):
 	
 	D*dx/dt + MNA*x + N + T(x) = 0
 	
+	If sparse is set, D is built as a scipy.sparse matrix.
+
 	Returns: the UNREDUCED D matrix
 	"""
-	D = numpy.matrix(numpy.zeros((shape[0]+1, shape[1]+1)))
-	nv = len(circ.nodes_dict)# - 1
-	i_eq = 0 #each time we find a vsource or vcvs or ccvs, we'll add one to this.
-	for elem in circ.elements:
-		if isinstance(elem, devices.vsource) or isinstance(elem, devices.evsource) or \
-		isinstance(elem, devices.hvsource):
-			#notice that hvsources aren't yet implemented now!
-			i_eq = i_eq + 1
-		elif isinstance(elem, devices.capacitor):
-			n1 = elem.n1
-			n2 = elem.n2
-			D[n1, n1] = D[n1, n1] + elem.C
-			D[n1, n2] = D[n1, n2] - elem.C
-			D[n2, n2] = D[n2, n2] + elem.C
-			D[n2, n1] = D[n2, n1] - elem.C
-		elif isinstance(elem, devices.inductor):
-			D[ nv + i_eq, nv + i_eq ] = -1 * elem.L
-			# Mutual inductors (coupled inductors)
-			# need to add a -M dI/dt where I is the current in the OTHER inductor.
-			if len(elem.coupling_devices):
-				for cd in elem.coupling_devices:
-					# get id+descr of the other inductor (eg. "L32")
-					other_id_wdescr = cd.get_other_inductor("L"+elem.descr)
-					# find its index to know which column corresponds to its current
-					other_index = circ.find_vde_index(other_id_wdescr, verbose=0)
-					# add the term.
-					D[ nv + i_eq, nv + other_index ] += -1 * cd.M
-			# carry on as usual
-			i_eq = i_eq + 1
-		
-	if options.cmin > 0:
-		cmin_mat = numpy.matrix(numpy.eye(shape[0]+1-i_eq))
+	plan = circuit_plan.get_plan(circ)
+	D = plan.reactive_matrix(sparse)
+	if options.cmin > 0 and sparse:
+		D = D + options.cmin*utilities.sparse_cmin_matrix(plan.n_of_nodes, plan.size)
+	elif options.cmin > 0:
+		cmin_mat = numpy.matrix(numpy.eye(plan.n_of_nodes))
 		cmin_mat[0, 1:] = 1
 		cmin_mat[1:, 0] = 1
 		cmin_mat[0, 0] = cmin_mat.shape[0]-1
-		D[:-i_eq, :-i_eq] += options.cmin*cmin_mat
+		D[:plan.n_of_nodes, :plan.n_of_nodes] += options.cmin*cmin_mat
 
 	return D
 
+def get_breakpoints(circ, tstart, tstop):
+	"""Returns: the breakpoint_queue of circ in [tstart, tstop], or None
+	if options.transient_use_breakpoints is not set.
+	"""
+	if not options.transient_use_breakpoints:
+		return None
+	return breakpoint_queue(circ, tstart, tstop)
+
+class breakpoint_queue:
+	"""The breakpoints of the time dependent sources of circ, in 
+	[tstart, tstop], merged in increasing order (see 
+	devices.pulse.breakpoints()).
+
+	Breakpoints closer than (tstop - tstart)*BREAKPOINT_RESOLUTION 
+	are merged.
+	"""
+	def __init__(self, circ, tstart, tstop):
+		self._queue = heapq.merge(*[elem.breakpoints(tstart, tstop) for elem in circ.elements \
+			if hasattr(elem, "breakpoints")])
+		self._resolution = max((tstop - tstart)*BREAKPOINT_RESOLUTION, options.hmin)
+		self._next = tstart
+
+	def next_after(self, time):
+		"""Returns: the first breakpoint after time, or None if there are
+		no more of them.
+		"""
+		while self._next is not None and self._next <= time + self._resolution:
+			self._next = next(self._queue, None)
+		return self._next
+
 class dfbuffer:
 	"""This is a LIFO buffer with a method to read it all without deleting the elements.
 	Newer entries are added on top of the buffer.
 	It checks the size of the added elements, to be sure they are of the same size.
+
+	Every element is a tuple of width values (eg. time, x, dx/dt), each of
+	them is stored in a preallocated ring of 2*length entries, written 
+	twice (at i and i + length): the last length entries are always 
+	contiguous, so they are read as views, without copying them.
 	"""
-	_the_real_buffer = None
 	_length = 0
 	_width  = 0
 	
 	def __init__(self, length, width):
-		self._the_real_buffer = []
 		self._length = length
 		self._width = width
+		# the rings are allocated when the shape of the values is known
+		self._rings = [None]*width
+		# the entries of the rings of arrays, as views (matrices if 2D),
+		# built once
+		self._views = [None]*width
+		# _valid[k][i] is False if the k-th value of the i-th entry is None
+		self._valid = [[False]*(2*length) for k in range(width)]
+		# the last entry is at _last + length, in the upper half
+		self._last = -1
+		self._count = 0
 	
 	def add(self, atuple):
 		if not len(atuple) == self._width:
 			printing.print_warning("Attempted to add a element of wrong size to LIFO buffer. BUG?")
 			return False
 		else:
-			self._the_real_buffer.insert(0, atuple)
-			if len(self._the_real_buffer) > self._length:
-				self._the_real_buffer = self._the_real_buffer[:self._length]
+			self._last = (self._last + 1) % self._length
+			for k in range(self._width):
+				value = atuple[k]
+				valid = value is not None
+				if valid:
+					if self._rings[k] is None:
+						self._rings[k] = numpy.zeros((2*self._length,) + numpy.shape(value))
+					self._rings[k][self._last] = value
+					self._rings[k][self._last + self._length] = value
+				self._valid[k][self._last] = valid
+				self._valid[k][self._last + self._length] = valid
+			self._count = min(self._count + 1, self._length)
 			return True
 	
 	def get_df_vector(self):
 		"""Returns a vector conforming to the specification of the df formulae. 
 		That is [[time(n), x(n), dx(n)], [time(n-1), x(n-1), dx(n-1)], ...]
 		"""
-		return self._the_real_buffer
+		for k in range(self._width):
+			if self._views[k] is None and self._rings[k] is not None:
+				if self._rings[k].ndim == 1:
+					# scalars, read from the ring
+					self._views[k] = self._rings[k]
+				else:
+					self._views[k] = [numpy.asmatrix(v) if v.ndim == 2 else v for v in self._rings[k]]
+		positions = range(self._last + self._length, self._last + self._length - self._count, -1)
+		return [tuple([self._views[k][i] if self._valid[k][i] else None for k in range(self._width)]) \
+			for i in positions]
 	
 	def isready(self):
 		"""This shouldn't be used to determine if the buffer has enough points to 
 		use the df _if_ you use the step control.
 		In that case, it holds even the points required for the FF.
 		"""
-		if len(self._the_real_buffer) == self._length:
+		if self._count == self._length:
 			return True
 		else:
 			return False
 	
 	def get_as_matrix(self):
-		for vindex in range(self._width):
-			for index in range(len(self._the_real_buffer)):
-				if index == 0:
-					single_matrix = self._the_real_buffer[index][vindex]
-				else:
-					single_matrix = numpy.concatenate((self._the_real_buffer[index][vindex], single_matrix), axis=0)
-			if vindex == 0:
-				complete_matrix = single_matrix
-			else:
-				complete_matrix = numpy.concatenate((complete_matrix, single_matrix), axis=1)
-		return complete_matrix
+		"""Returns the (column) matrix of the values in the buffer, the 
+		oldest first, the values in the same tuple side by side. 
+		A view of the buffer if its width is 1.
+		"""
+		stop = self._last + self._length + 1
+		columns = [self._rings[k][stop - self._count:stop].reshape((-1, 1)) for k in range(self._width)]
+		if self._width == 1:
+			return numpy.asmatrix(columns[0])
+		return numpy.mat(numpy.concatenate(columns, axis=1))
 
 def import_custom_df_module(method, print_out):
 	"""Imports a module that implements differentiation formula through imp.load_module
@@ -22,7 +22,7 @@ This file implements the TRAP DF and a second order prediction formula.
 """
 
 import numpy
-from numpy.linalg import inv
+import df_coeff
 
 order = 2
 
@@ -82,23 +82,8 @@ def get_df(pv_array, suggested_step, predict=True):
 	
 	if predict and len(pv_array) > 2 and pv_array[0][1] is not None and pv_array[1][1] is not None and \
 	pv_array[2][1] is not None:
-		A = numpy.mat(numpy.zeros((len(pv_array[0]), len(pv_array[0]))))
-		A[0, :] = 0
-		A[:, 0] = 1
-		for row in range(1, A.shape[0]):
-			for col in range(1, A.shape[0]):
-				A[row, col] = (pv_array[row][0] - pv_array[0][0])**(col)
-		Ainv = inv(A)
-		
-		predict_x = numpy.mat(numpy.zeros(pv_array[0][1].shape))
-		z = numpy.mat(numpy.zeros( (3, 1) ))
-		for var in range(pv_array[0][1].shape[0]):
-			
-			for index in range(z.shape[0]):
-				z[index, 0] = pv_array[index][1][var, 0]
-			alpha = Ainv*z
-			predict_x[var, 0] = alpha[2, 0] * (suggested_step**2) + alpha[1, 0] * suggested_step + alpha[0, 0]
-		predict_lte_coeff = (-1.0 / 6.0) * suggested_step * (pv_array[0][0] + suggested_step - pv_array[1][0]) * (pv_array[0][0] + suggested_step - pv_array[2][0])
+		# the parabola through x(n), x(n-1), x(n-2)
+		predict_x, predict_lte_coeff = df_coeff.predictor(pv_array, suggested_step, 3)
 	else:
 		predict_x, predict_lte_coeff = (None, None)
 	return [ C1, C0, x_lte_coeff, predict_x, predict_lte_coeff ]
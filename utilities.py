@@ -26,12 +26,20 @@ import os.path
 import operator
 
 import numpy
+import scipy.sparse
 
-import printing
+import printing, options
 
 # this is the machine precision on my Intel x86
 EPS = 2.22044604925e-16
 
+def use_sparse(size):
+	"""Returns True if a system of size unknowns (reduced MNA size)
+	should be assembled and solved as a sparse matrix.
+	See options.use_sparse and options.sparse_threshold.
+	"""
+	return options.use_sparse and size >= options.sparse_threshold
+
 def expand_matrix(matrix, add_a_row, add_a_col):
 	"""Adds a  row and/or a column to the given matrix.
 	Args:
@@ -62,10 +70,28 @@ def remove_row_and_col(matrix, rrow=0, rcol=0):
 	"""
 	if rrow < 0 or rcol < 0: 
 		return_matrix =  None
+	elif scipy.sparse.issparse(matrix):
+		rows = numpy.arange(matrix.shape[0])
+		cols = numpy.arange(matrix.shape[1])
+		rows, cols = rows[rows != rrow], cols[cols != rcol]
+		return_matrix = matrix.tocsr()[rows, :].tocsc()[:, cols]
 	else:
 		return_matrix = numpy.vstack((numpy.hstack((matrix[0:rrow, 0:rcol], matrix[0:rrow, rcol+1:])), numpy.hstack((matrix[rrow+1:, 0:rcol], matrix[rrow+1:, rcol+1:]))))
 	return return_matrix
 
+def sparse_cmin_matrix(n_of_nodes, size):
+	"""Returns the (UNREDUCED) stamp of the cmin capacitors, as a 
+	size x size scipy.sparse matrix. It's the same stamp generate_D and 
+	generate_AC add to their dense matrices: the first n_of_nodes rows 
+	and columns refer to the node voltages.
+	"""
+	nodes = numpy.arange(1, n_of_nodes)
+	ones = numpy.ones((n_of_nodes - 1,))
+	rows = numpy.concatenate(([0], nodes, numpy.zeros(nodes.shape, dtype=int), nodes))
+	cols = numpy.concatenate(([0], nodes, nodes, numpy.zeros(nodes.shape, dtype=int)))
+	values = numpy.concatenate(([n_of_nodes - 1], ones, ones, ones))
+	return scipy.sparse.coo_matrix((values, (rows, cols)), shape=(size, size)).tocsc()
+
 def remove_row(matrix, rrow=0):
 	"""Removes a row from a matrix.
 	rrow is the index of the row to be removed.